@@ -5,6 +5,7 @@ from . import cmns
 from .efa_row import EFARow 
 from .frb_exchangerates import FRBExchangeRates
 from . import fetch_fred_api
+from . import fred_vintages
 from .fof import FoF
 from .fomc_dates import FOMCdates
 from .fred import FREDcleaned
@@ -22,6 +23,7 @@ __all__ = [
     'EFARow',
     'FRBExchangeRates',
     'fetch_fred_api',
+    'fred_vintages',
     'FoF',
     'FOMCdates',
     'FREDcleaned',
@@ -0,0 +1,122 @@
+"""
+Local cache utilities for pysfo.pulldata.
+Caches live in a `_cache` directory next to the raw files they are built from,
+and are invalidated whenever the source files change (mtime or size).
+"""
+
+import os
+import json
+from pathlib import Path
+
+CACHE_DIRNAME = "_cache"
+
+#%%========== helper functions ==========%%#
+
+def cache_dir(source_dir) -> Path:
+    """
+    Return the cache directory associated with a raw data directory,
+    creating it if it does not exist yet.
+
+    Parameters
+    ----------
+    source_dir : str | Path
+        Directory where the raw source files are stored.
+    """
+
+    p = Path(source_dir) / CACHE_DIRNAME
+    p.mkdir(parents = True, exist_ok = True)
+
+    return p
+
+def source_signature(paths):
+    """
+    Return a JSON-serializable signature (mtime and size) of the source files.
+
+    Parameters
+    ----------
+    paths : str | Path | list
+        File, or list of files, the cached object is built from.
+
+    Raises
+    ------
+    FileNotFoundError
+        If any of the source files does not exist.
+    """
+
+    paths = [paths] if isinstance(paths, (str, Path)) else paths
+
+    signature = {}
+    for path in paths:
+        st = os.stat(path)
+        signature[Path(path).name] = [st.st_mtime_ns, st.st_size]
+
+    return signature
+
+def manifest_path(cache_file) -> Path:
+
+    cache_file = Path(cache_file)
+
+    return cache_file.with_name(cache_file.name + ".json")
+
+def is_fresh(cache_file, signature, **params):
+    """
+    Check whether `cache_file` exists and was built from sources matching
+    `signature` (and, optionally, the same build parameters).
+    """
+
+    cache_file = Path(cache_file)
+    manifest_file = manifest_path(cache_file)
+
+    if not (cache_file.exists() and manifest_file.exists()):
+        return False
+
+    try:
+        with open(manifest_file, "r", encoding = "utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return False
+
+    return (
+        manifest.get("signature") == signature
+        and manifest.get("params", {}) == params
+    )
+
+def write_manifest(cache_file, signature, **params):
+
+    manifest = {
+        "signature" : signature,
+        "params" : params
+    }
+
+    _atomic_write_text(manifest_path(cache_file), json.dumps(manifest, indent = 2))
+
+def atomic_path(target):
+    """Temporary sibling path used to write `target` before an atomic replace."""
+
+    target = Path(target)
+
+    return target.with_name(f".{target.name}.{os.getpid()}.tmp")
+
+def _atomic_write_text(target, text):
+
+    tmp = atomic_path(target)
+    with open(tmp, "w", encoding = "utf-8") as f:
+        f.write(text)
+    os.replace(tmp, target)
+
+def clear_cache(source_dir):
+    """Remove every cached file associated with a raw data directory."""
+
+    import shutil
+
+    p = Path(source_dir) / CACHE_DIRNAME
+    if p.exists():
+        shutil.rmtree(p)
+
+__all__ = [
+    "cache_dir",
+    "source_signature",
+    "is_fresh",
+    "write_manifest",
+    "clear_cache"
+]
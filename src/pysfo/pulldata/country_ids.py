@@ -0,0 +1,168 @@
+"""
+Country identifier resolution for pysfo.pulldata.
+Country names are converted with country_converter once per unique name, kept in a
+persistent name -> ISO2/ISO3/name_short lookup table (stored in the `_cache` directory
+of the global data path), and mapped back to the data with a categorical join.
+"""
+
+# identifiers stored in the lookup table (country_converter classifications)
+LOOKUP_COLUMNS = ["ISO2", "ISO3", "name_short"]
+
+# in-memory copy of the lookup table: DataFrame indexed by country name
+_LOOKUP = None
+
+#%%========== helper functions ==========%%#
+
+def _lookup_file():
+
+    from .config import get_data_path
+    from .cache import cache_dir
+
+    try:
+        return cache_dir(get_data_path()) / "country_ids.parquet"
+    except RuntimeError:
+        # data path not set: keep the lookup table in memory only
+        return None
+
+def _coco_signature():
+
+    import country_converter as coco
+
+    return {"country_converter" : coco.__version__}
+
+def _load_lookup():
+
+    import pandas as pd
+    from .cache import is_fresh
+
+    global _LOOKUP
+
+    if _LOOKUP is not None:
+        return _LOOKUP
+
+    lookup_file = _lookup_file()
+
+    if lookup_file is not None and is_fresh(lookup_file, _coco_signature()):
+        _LOOKUP = pd.read_parquet(lookup_file).set_index("name")
+    else:
+        _LOOKUP = pd.DataFrame(columns = LOOKUP_COLUMNS, index = pd.Index([], name = "name"), dtype = object)
+
+    return _LOOKUP
+
+def _save_lookup(lookup):
+
+    import os
+    from .cache import atomic_path, write_manifest
+
+    lookup_file = _lookup_file()
+
+    if lookup_file is None:
+        return
+
+    tmp = atomic_path(lookup_file)
+    lookup.reset_index().to_parquet(tmp, index = False)
+    os.replace(tmp, lookup_file)
+    write_manifest(lookup_file, _coco_signature())
+
+def _convert_new_names(names, silent):
+
+    import pandas as pd
+    import country_converter as coco
+    from pysfo.basic import silent_call
+
+    cc = coco.CountryConverter()
+    names = pd.Series(names, dtype = object)
+
+    converted = pd.DataFrame(index = pd.Index(names, name = "name"))
+    for i, to in enumerate(LOOKUP_COLUMNS):
+        # print 'not found' warnings only once per name
+        ids = silent_call(cc.pandas_convert, series = names, to = to, verbose = (not silent) and i == 0)
+        converted[to] = [id_ if isinstance(id_, str) else str(id_) for id_ in ids]
+
+    return converted
+
+#%%========== main functions ==========%%#
+
+def country_lookup(names, silent = False):
+    """
+    Return the lookup table (ISO2, ISO3, name_short) for the unique values in `names`.
+
+    Names not yet in the persistent lookup table are converted with country_converter
+    and added to it.
+    """
+
+    import pandas as pd
+
+    global _LOOKUP
+
+    lookup = _load_lookup()
+
+    unique_names = pd.unique(pd.Series(names, dtype = object).dropna())
+    new_names = [name for name in unique_names if name not in lookup.index]
+
+    if len(new_names) > 0:
+        lookup = pd.concat([lookup, _convert_new_names(new_names, silent)], axis = 0)
+        lookup = lookup[~lookup.index.duplicated(keep = "last")]
+        _LOOKUP = lookup
+        _save_lookup(lookup)
+
+    return lookup.reindex(unique_names)
+
+def resolve_country_ids(names, to = "ISO3", overrides = None, silent = False):
+    """
+    Convert a Series of country names to country identifiers.
+
+    Each unique name is resolved once (see `country_lookup`) and results are mapped back
+    to the rows with a categorical join, instead of running country_converter per row.
+
+    Parameters
+    ----------
+    names : pd.Series
+        Country names.
+    to : str | list, default "ISO3"
+        Identifier(s) to return: any of "ISO2", "ISO3", "name_short", or "name" (the
+        name itself, only useful together with `overrides`).
+    overrides : dict, optional
+        Mapping {identifier : {name : value}} of manual fixes, applied to the
+        unique-name table before mapping back.
+    silent : bool, default False
+        If True, do not print country_converter 'not found' warnings.
+
+    Returns
+    -------
+    pd.Series | pd.DataFrame
+        Series if `to` is a str, DataFrame with one column per identifier otherwise.
+        Names that cannot be resolved (and missing names) are set to "not found"
+        (missing names stay missing for "name").
+    """
+
+    import numpy as np
+    import pandas as pd
+
+    overrides = {} if overrides is None else overrides
+    to_list = [to] if isinstance(to, str) else list(to)
+
+    names = pd.Series(names)
+    codes, uniques = pd.factorize(names)
+
+    lookup = country_lookup(uniques, silent = silent)
+    lookup["name"] = lookup.index
+
+    out = {}
+    for to_ in to_list:
+        table = lookup[to_].copy()
+        for old, new in overrides.get(to_, {}).items():
+            table.loc[table.index == old] = new
+        not_found = np.nan if to_ == "name" else "not found"
+        values = np.append(table.to_numpy(dtype = object), not_found)
+        out[to_] = pd.Series(values[codes], index = names.index, name = to_)
+
+    if isinstance(to, str):
+        return out[to]
+
+    return pd.DataFrame(out)
+
+__all__ = [
+    "country_lookup",
+    "resolve_country_ids"
+]
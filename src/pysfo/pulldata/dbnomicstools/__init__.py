@@ -1,5 +1,7 @@
-from pysfo.pulldata.dbnomicstools.config import get_filters
+from pysfo.pulldata.dbnomicstools.config import get_filters, customization_file
+from pysfo.pulldata.dbnomicstools.storage import read_subdata, subdata_file, write_subdata
 from pysfo.pulldata.dbnomicstools.check_timeseries_reporting.create_report import checkReporting
+from pysfo.pulldata.dbnomicstools.check_timeseries_reporting.scan import scan_reporting
 
 class dbTools:
 
@@ -39,6 +41,21 @@ class dbTools:
 
         return check_reporter.create_report_tables()
 
+    @staticmethod
+    def scan_reporting(
+        provider,
+        dataset,
+        subdata = None,
+        freq = None,
+        start_date = None,
+        end_date = None,
+        n_jobs = -1,
+        use_cache = True,
+        silent = False
+    ):
+
+        return scan_reporting(provider, dataset, subdata, freq, start_date, end_date, n_jobs, use_cache, silent)
+
 __all__ = [
     'dbTools'
 ]
\ No newline at end of file
@@ -0,0 +1,294 @@
+"""
+Asynchronous fetch engine for dbnomics series.
+Requests run concurrently in an asyncio event loop over one pooled HTTP session, with
+bounded concurrency and retries with exponential backoff. Results are the DataFrames
+`dbnomics.fetch_series` returns for the same request.
+"""
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RETRIES = 3
+BACKOFF_SECONDS = 1
+MAX_BACKOFF_SECONDS = 60
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+#%%========== helper functions ==========%%#
+
+def _make_session(pool_size):
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+def series_api_link(provider_code, dataset_code, dimensions = None, series_code = None, series_ids = None, api_base_url = None):
+    """
+    Return the dbnomics series endpoint (with observations) for a request, as built by
+    `dbnomics.fetch_series`.
+    """
+
+    import json
+    import urllib.parse
+    import dbnomics as db
+
+    api_base_url = db.default_api_base_url if api_base_url is None else api_base_url
+    if not api_base_url.endswith("/"):
+        api_base_url += "/"
+
+    series_base_url = urllib.parse.urljoin(api_base_url, "series")
+
+    if series_ids is not None:
+        return series_base_url + "?observations=1&series_ids={}".format(",".join(map(urllib.parse.quote, series_ids)))
+
+    if dimensions is not None:
+        return series_base_url + f"/{provider_code}/{dataset_code}?observations=1&dimensions={json.dumps(dimensions)}"
+
+    if series_code is not None:
+        return series_base_url + f"/{provider_code}/{dataset_code}/{series_code}?observations=1"
+
+    return series_base_url + f"/{provider_code}/{dataset_code}?observations=1"
+
+def _series_dataframe(docs, datasets_dimensions):
+
+    # same flattening and column layout as dbnomics.fetch_series_by_api_link
+
+    import pandas as pd
+    from dbnomics import flatten_dbnomics_series
+
+    if len(docs) == 0:
+        return pd.DataFrame()
+
+    common_columns = [
+        "@frequency",
+        "provider_code",
+        "dataset_code",
+        "dataset_name",
+        "series_code",
+        "series_name",
+        "original_period",
+        "period",
+        "original_value",
+        "value",
+    ]
+
+    flat_series_list = []
+    for series in docs:
+        flat_series = flatten_dbnomics_series(series)
+        dataset_dimensions = datasets_dimensions[flat_series["provider_code"] + "/" + flat_series["dataset_code"]]
+        dimensions_labels = dataset_dimensions.get("dimensions_labels") or {
+            dim : f"{dim} (label)" for dim in dataset_dimensions["dimensions_codes_order"]
+        }
+        if "dimensions_values_labels" in dataset_dimensions:
+            for dim, dim_value in (series.get("dimensions") or {}).items():
+                dim_value_label = dict(dataset_dimensions["dimensions_values_labels"][dim]).get(dim_value)
+                if dim_value_label:
+                    flat_series[dimensions_labels[dim]] = dim_value_label
+        flat_series_list.append(flat_series)
+
+    dimensions_codes_columns = []
+    dimensions_labels_columns = []
+    for dataset_dimensions in datasets_dimensions.values():
+        for dim in dataset_dimensions["dimensions_codes_order"]:
+            dimensions_codes_columns.append(dim)
+            if "dimensions_labels" in dataset_dimensions and "dimensions_values_labels" in dataset_dimensions:
+                dimensions_labels_columns.append(dataset_dimensions["dimensions_labels"][dim])
+            elif "dimensions_values_labels" in dataset_dimensions:
+                dimensions_labels_columns.append(f"{dim} (label)")
+
+    columns = common_columns + dimensions_codes_columns + dimensions_labels_columns
+
+    return pd.concat([pd.DataFrame(data = series, columns = columns) for series in flat_series_list], sort = False)
+
+async def _get_json(session, url, semaphore, executor, timeout, retries):
+
+    import random
+    import asyncio
+    import requests
+
+    loop = asyncio.get_running_loop()
+
+    for attempt in range(retries + 1):
+
+        async with semaphore:
+            try:
+                response = await loop.run_in_executor(executor, lambda : session.get(url, allow_redirects = True, timeout = timeout))
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+                error = requests.HTTPError(f"{response.status_code} Server Error for url: {url}", response = response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+        if attempt == retries:
+            raise error
+
+        # exponential backoff with jitter, outside the semaphore so other requests proceed
+
+        await asyncio.sleep(min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** attempt) * random.uniform(0.5, 1))
+
+async def _fetch_api_link(session, api_link, max_nb_series, semaphore, executor, timeout, retries):
+
+    import dbnomics as db
+
+    docs = []
+    datasets_dimensions = None
+
+    while True:
+
+        page = await _get_json(
+            session,
+            "{}{}offset={}".format(api_link, "&" if "?" in api_link else "?", len(docs)),
+            semaphore, executor, timeout, retries
+        )
+
+        series_page = page["series"]
+        num_found = series_page["num_found"]
+
+        if max_nb_series is None and num_found > db.default_max_nb_series:
+            raise db.TooManySeries(num_found, max_nb_series)
+
+        if datasets_dimensions is None and len(series_page["docs"]) > 0:
+            first = series_page["docs"][0]
+            datasets_dimensions = (
+                page["datasets"] if "datasets" in page
+                else {first["provider_code"] + "/" + first["dataset_code"] : page["dataset"]}
+            )
+
+        docs += series_page["docs"]
+        nb_series = num_found if max_nb_series is None else min(num_found, max_nb_series)
+
+        if len(docs) >= nb_series or len(series_page["docs"]) == 0:
+            break
+
+    return _series_dataframe(docs[:nb_series], datasets_dimensions)
+
+def _run(coro):
+
+    # asyncio.run cannot be nested in a running event loop (e.g. in Jupyter): use a separate thread
+
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers = 1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+#%%========== main class ==========%%#
+
+class AsyncFetcher:
+    """
+    Fetch many dbnomics requests of a dataset concurrently over a pooled HTTP session.
+
+    Parameters
+    ----------
+    provider_code, dataset_code : str
+        dbnomics provider and dataset.
+    concurrency : int, default DEFAULT_CONCURRENCY
+        Maximum number of requests in flight (and size of the connection pool).
+    timeout : int, default 60
+        Timeout of each HTTP request, in seconds.
+    retries : int, default DEFAULT_RETRIES
+        Retries of a request failing with a connection error or a 429/5xx status.
+    api_base_url : str, optional
+        dbnomics API url. Defaults to the one used by the dbnomics package.
+
+    Examples
+    --------
+    fetcher = AsyncFetcher("IMF", "IFS")
+    dfs = fetcher.fetch_many([
+        {"dimensions" : {"INDICATOR" : ["PCPI_IX"]}, "max_nb_series" : 1000},
+        {"series_code" : "M.US.PCPI_IX"},
+    ])
+    """
+
+    def __init__(self, provider_code, dataset_code, concurrency = DEFAULT_CONCURRENCY, timeout = 60, retries = DEFAULT_RETRIES, api_base_url = None):
+
+        self.provider_code = provider_code
+        self.dataset_code = dataset_code
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.api_base_url = api_base_url
+
+    def _api_link(self, request):
+
+        return series_api_link(
+            self.provider_code,
+            self.dataset_code,
+            dimensions = request.get("dimensions"),
+            series_code = request.get("series_code"),
+            series_ids = request.get("series_ids"),
+            api_base_url = self.api_base_url
+        )
+
+    async def _fetch_many(self, requests_, on_result):
+
+        import time
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        session = _make_session(self.concurrency)
+        executor = ThreadPoolExecutor(max_workers = self.concurrency)
+
+        async def _fetch_one(i, request):
+            start = time.perf_counter()
+            try:
+                result = await _fetch_api_link(
+                    session, self._api_link(request), request.get("max_nb_series"),
+                    semaphore, executor, self.timeout, self.retries
+                )
+            except Exception as e:
+                result = e
+            if on_result is not None:
+                on_result(i, result, time.perf_counter() - start)
+            return result
+
+        try:
+            return await asyncio.gather(*[_fetch_one(i, request) for i, request in enumerate(requests_)])
+        finally:
+            executor.shutdown(wait = False)
+            session.close()
+
+    def fetch_many(self, requests_, on_result = None):
+        """
+        Fetch a list of requests concurrently.
+
+        Parameters
+        ----------
+        requests_ : list
+            List of dicts with `dimensions`, `series_code` or `series_ids`, and optionally
+            `max_nb_series` (same meaning as in `dbnomics.fetch_series`).
+        on_result : callable, optional
+            Called as on_result(i, result, seconds) as soon as request `i` completes.
+
+        Returns
+        -------
+        list
+            For each request, its DataFrame or the exception it raised.
+        """
+
+        return _run(self._fetch_many(requests_, on_result))
+
+    def __call__(self, dimensions = None, series_code = None, series_ids = None, max_nb_series = None):
+
+        request = {"dimensions" : dimensions, "series_code" : series_code, "series_ids" : series_ids, "max_nb_series" : max_nb_series}
+        result = self.fetch_many([request])[0]
+
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+__all__ = [
+    "AsyncFetcher",
+    "series_api_link"
+]
@@ -0,0 +1,131 @@
+"""
+Batch loading of several (subdata, INDICATOR, FREQ) requests of a dbnomics dataset.
+Requests are grouped by subdata file (and frequency set) so each file is read and
+cleaned once for all the indicators requested from it, and the per-file work runs in a
+process pool.
+"""
+
+#%%========== helper functions ==========%%#
+
+def _as_list(x):
+
+    return [x] if isinstance(x, str) else list(x)
+
+def _request_key(request):
+
+    subdata, INDICATOR, FREQ = request
+
+    return (
+        subdata,
+        INDICATOR if isinstance(INDICATOR, str) else tuple(INDICATOR),
+        FREQ if isinstance(FREQ, str) else tuple(FREQ)
+    )
+
+def _group_requests_by_file(requests):
+
+    # requests sharing a subdata file and FREQ list are served by a single `get` call;
+    # frequencies are not merged since `get` checks duplicates on (period, ref_area, indicator)
+
+    groups = {}
+
+    for request in requests:
+
+        if len(request) != 3:
+            raise ValueError(f"Each request must be a tuple (subdata, INDICATOR, FREQ). Got: {request}")
+
+        subdata, INDICATOR, FREQ = request
+        group_key = (subdata.replace(" ", "_"), tuple(sorted(set(_as_list(FREQ)))))
+
+        group = groups.setdefault(group_key, {"INDICATOR" : [], "requests" : []})
+        group["INDICATOR"] += [ind for ind in _as_list(INDICATOR) if ind not in group["INDICATOR"]]
+        group["requests"].append(request)
+
+    return groups
+
+def _get_in_worker(get_fn, data_path, *args):
+
+    # worker processes do not share the global data path of the parent process
+
+    from pysfo.pulldata.config import set_data_path
+
+    set_data_path(data_path)
+
+    return get_fn(*args)
+
+#%%========== main function ==========%%#
+
+def get_many(get_fn, requests, as_dict = False, n_jobs = -1, silent = False, use_cache = True):
+    """
+    Load several (subdata, INDICATOR, FREQ) requests with `get_fn`, with one read per subdata file and FREQ list.
+
+    Requests for the same subdata file and FREQ are merged into a single `get_fn` call
+    (with the union of their indicators) and the calls run in parallel worker processes.
+
+    Parameters
+    ----------
+    get_fn : callable
+        Module-level retriever with signature get_fn(subdata, INDICATOR, FREQ, silent, use_cache),
+        e.g. `imf_ifs.master_upload.get`.
+    requests : list
+        List of (subdata, INDICATOR, FREQ) tuples. INDICATOR and FREQ may be str or lists.
+    as_dict : bool, default False
+        If True, return a dict {request : DataFrame}, with list arguments of each request
+        converted to tuples. Otherwise return one long DataFrame with a `subdata` column, where
+        series requested more than once appear once.
+    n_jobs : int, default -1
+        Number of worker processes used for the per-file reads (joblib convention).
+    silent : bool, default False
+        If True, suppress progress and country converter messages.
+    use_cache : bool, default True
+        Passed to `get_fn`.
+    """
+
+    import pandas as pd
+    from joblib import Parallel, delayed
+    from pysfo.pulldata.config import get_data_path
+
+    groups = _group_requests_by_file(requests)
+
+    if len(groups) == 0:
+        raise ValueError("No requests provided.")
+
+    n_jobs = 1 if len(groups) == 1 else n_jobs
+
+    if not silent:
+        print(f"Loading {len(requests)} requests with {len(groups)} subdata reads.")
+
+    results = Parallel(n_jobs = n_jobs, verbose = 0 if silent else 10)(
+        delayed(_get_in_worker)(get_fn, get_data_path(), file_key, group["INDICATOR"], list(FREQ), True, use_cache)
+        for (file_key, FREQ), group in groups.items()
+    )
+
+    results = dict(zip(groups.keys(), results))
+
+    if as_dict:
+        request_groups = {
+            _request_key(request) : group_key
+            for group_key, group in groups.items()
+            for request in group["requests"]
+        }
+        return {
+            _request_key(request) : (
+                results[request_groups[_request_key(request)]]
+                .loc[lambda df : df["indicator"].isin(_as_list(request[1])), :]
+                .reset_index(drop = True)
+            )
+            for request in requests
+        }
+
+    df_list = []
+
+    for group_key, group in groups.items():
+
+        df = results[group_key].copy()
+        df.insert(0, "subdata", group["requests"][0][0])
+        df_list.append(df)
+
+    return pd.concat(df_list, axis = 0, ignore_index = True)
+
+__all__ = [
+    "get_many"
+]
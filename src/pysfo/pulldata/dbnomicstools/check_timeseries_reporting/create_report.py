@@ -1,3 +1,33 @@
+#%%========== module parameters ==========%%#
+
+from collections import OrderedDict
+
+# WDI indicator used to order countries by size
+GDP_INDICATOR = "NY.GDP.MKTP.CD"
+
+# process-wide caches: {key : (source signature, frame)}
+_SIZE_ORDERER_CACHE = {}
+_SKELETON_CACHE = OrderedDict()
+
+# skeletons kept in memory (least recently used are dropped first)
+MAX_SKELETON_CACHE_ENTRIES = 32
+
+#%%========== helper functions ==========%%#
+
+def _missing_gdp_error():
+
+    import textwrap
+
+    _message = textwrap.dedent(f"""\
+    Need to pull indicator '{GDP_INDICATOR}' from wbWDI before creating counrty report check. 
+    For more info, please see the documentation on wbWDI
+                            
+    instructions = pysfo_pull.wbWDI.print_instructions()
+    print(instructions)
+    """)
+
+    return ValueError(_message)
+
 #%%========== Reporting Handler ==========%%#
 
 class checkReporting:
@@ -33,6 +63,8 @@ class checkReporting:
             self.get_series_fn
         ) = get_dataset_keys(provider, dataset)
 
+        self.provider = provider
+        self.dataset = dataset
         self.subdata = subdata
         self.series = series
         self.freq = freq
@@ -42,50 +74,41 @@ class checkReporting:
         self.end_date = end_date
         self.REF_AREA_all = REF_AREA_all
 
-    def _generate_gdp_skeleton(self, all_periods):
+    def _gdp_sources(self):
+
+        # files the skeleton is built from: REF_AREA metadata and the WDI GDP download
 
         import pysfo.pulldata as pysfo_pull
-        import os
-        import re
-        import pandas as pd
-        import textwrap
-        import numpy as np
+        from pysfo.pulldata.cache import source_signature
+        from pysfo.pulldata.dbnomicstools.storage import subdata_file
 
-        #  self = checkReporting(provider, dataset, subdata, series, freq, summarized, report_percen, start_date, end_date, REF_AREA_all)
+        json_metadata_path = pysfo_pull.dbnomicstools.customization_file(self.metadata_path)
+        gdp_path = subdata_file(pysfo_pull.get_data_path() / "wb_wdi", GDP_INDICATOR)
+
+        try :
+            signature = source_signature([json_metadata_path, gdp_path])
+        except FileNotFoundError as e:
+            raise _missing_gdp_error()
+
+        return json_metadata_path, str(gdp_path.resolve()), signature
 
-        file = [file for file in os.listdir(self.metadata_path) if re.findall(".customization", file)][0]
-        json_metadata_path = os.path.join(self.metadata_path, file)
+    def _build_size_orderer(self, json_metadata_path):
+
+        import pysfo.pulldata as pysfo_pull
+        import textwrap
+        import numpy as np
 
         all_country_keys = pysfo_pull.dbnomicstools.get_filters(json_metadata_path, filter = "REF_AREA")
 
         all_country_keys = all_country_keys[["VALUE", "DESCRIPTION_TEXT"]]
         all_country_keys.columns = [self.country_key, self.country_key_desc]
 
-        skeleton = (
-            pd.MultiIndex.from_product(
-                [all_country_keys[self.country_key], all_periods],
-                names=[self.country_key, self.period_key]
-            )
-            .to_frame(index=False)
-            .merge(all_country_keys, on=self.country_key, how="left")
-            .sort_values([self.country_key, self.period_key])
-            .reset_index(drop=True)
-        )
-        skeleton = skeleton[[self.country_key, self.country_key_desc, self.period_key]]
-
         # merge size
 
         try :
-            size_orderer = pysfo_pull.wbWDI.get(indicator = "NY.GDP.MKTP.CD", silent = True)
+            size_orderer = pysfo_pull.wbWDI.get(indicator = GDP_INDICATOR, silent = True)
         except FileNotFoundError as e:
-            _message = textwrap.dedent("""\
-            Need to pull indicator 'NY.GDP.MKTP.CD' from wbWDI before creating counrty report check. 
-            For more info, please see the documentation on wbWDI
-                                    
-            instructions = pysfo_pull.wbWDI.print_instructions()
-            print(instructions)
-            """)
-            raise ValueError(_message)
+            raise _missing_gdp_error()
 
         size_orderer = size_orderer[
             (size_orderer["cty_iso2"] != "not found")
@@ -137,7 +160,43 @@ class checkReporting:
         
         size_orderer["gdp_available"] = np.where(size_orderer["_merge"] == "left_only", 0, 1)
         size_orderer.drop(columns = "_merge", inplace = True)
-        
+
+        return size_orderer
+
+    def _generate_gdp_skeleton(self, all_periods):
+        """
+        Country x period skeleton with the last GDP of each country, used to order reports.
+
+        The GDP size orderer is cached per (provider, dataset) and the skeleton per
+        (provider, dataset, freq, periods), both invalidated when the REF_AREA metadata or
+        the stored WDI GDP file change. Callers receive a copy.
+        """
+
+        import pandas as pd
+
+        #  self = checkReporting(provider, dataset, subdata, series, freq, summarized, report_percen, start_date, end_date, REF_AREA_all)
+
+        json_metadata_path, gdp_path, signature = self._gdp_sources()
+        all_periods = pd.DatetimeIndex(all_periods)
+
+        orderer_key = (self.provider, self.dataset, gdp_path)
+        cached = _SIZE_ORDERER_CACHE.get(orderer_key)
+
+        if cached is not None and cached[0] == signature:
+            size_orderer = cached[1]
+        else:
+            size_orderer = self._build_size_orderer(json_metadata_path)
+            _SIZE_ORDERER_CACHE[orderer_key] = (signature, size_orderer)
+
+        # the same period range is shared by every indicator of a subdata and frequency
+
+        skeleton_key = orderer_key + (self.freq, len(all_periods), all_periods.min(), all_periods.max(), hash(all_periods.asi8.tobytes()))
+        cached = _SKELETON_CACHE.get(skeleton_key)
+
+        if cached is not None and cached[0] == signature:
+            _SKELETON_CACHE.move_to_end(skeleton_key)
+            return cached[1].copy()
+
         skeleton_w_gdp = (
             pd.MultiIndex.from_product(
                 [size_orderer[self.country_key], all_periods],
@@ -151,183 +210,163 @@ class checkReporting:
         
         skeleton_w_gdp["last_gdp"] = skeleton_w_gdp["last_gdp"].fillna(0)
 
-        return skeleton_w_gdp
+        _SKELETON_CACHE[skeleton_key] = (signature, skeleton_w_gdp)
+        while len(_SKELETON_CACHE) > MAX_SKELETON_CACHE_ENTRIES:
+            _SKELETON_CACHE.popitem(last = False)
+
+        return skeleton_w_gdp.copy()
     
-    def _check_reporting_for_individual_indicator(self, df_series, skeleton_w_gdp):
+    def _check_reporting_for_all_indicators(self, df, skeleton_w_gdp):
+        """
+        Reporting tables of every indicator in `df`, computed in one pass.
+
+        Observations are counted in an (indicator, country, decade) cube with a single
+        numpy reduction, and the columns shared by all indicators (GDP, iso codes, names)
+        are built once. Returns {indicator : table or summary}.
+        """
 
         import pandas as pd
-        from pysfo.basic import statatab, silent_call
         import numpy as np
         import textwrap
+        from pysfo.basic import silent_call
         import country_converter as coco
 
         cc = coco.CountryConverter()
 
-        #  self = checkReporting(provider, dataset, subdata, series, freq, summarized, report_percen, start_date, end_date, REF_AREA_all)
-        # df_series = df[df[self.series_key] == df[self.series_key].unique()[0]]
+        to_year = {"A" : 1, "Q" : 4, "M" : 12}[self.freq]
 
-        SERIES = df_series[self.series_key].unique()
+        # check country ids (from full-sized skeleton) are non-missing
 
-        if len(SERIES) > 1:
-            raise ValueError(f"df_series should only contain one series. Please check construction.")
+        if True in ((skeleton_w_gdp[self.country_key].isna()) | (skeleton_w_gdp[self.period_key].isna())).values:
+            raise ValueError(f"Error constructing reporter_check for {self.series} ({self.freq}). Please check construction.")
 
-        # merge df_series and skeleton_w_gdp
+        #---- country metadata, in the (sorted) order of the skeleton
 
-        try:
-            h_df = df_series.merge(skeleton_w_gdp, how = "outer", on = [self.period_key, self.country_key], indicator = True, validate = "1:1")
-        except pd.errors.MergeError as e:
-            raise pd.errors.MergeError(
-                f"MergeError in subdata={self.subdata}, {self.series_key}={SERIES}, {self.freq_key}={self.freq}: \n {e}"
-            ) from e
+        not_to_pivot = ["gdp_last_available_period", "last_gdp", "gdp_available"]
+        meta = (
+            skeleton_w_gdp[[self.country_key, self.country_key_desc] + not_to_pivot]
+            .drop_duplicates(subset = self.country_key)
+            .reset_index(drop = True)
+        )
 
-        _merge_results = statatab(h_df["_merge"])
-        if "left_only" in [col["Value"] for _, col in _merge_results.iterrows() if col["Count"] != 0]:
-            raise ValueError(f"Error constructing reporter_check for {SERIES} ({self.freq}). Please check construction.")
-        
-        h_df["_merge"] = np.where(h_df["_merge"] == "both", 1, 0)
-        h_df["decade"] = (h_df[self.period_key].dt.year // 10) * 10
-        h_df = h_df.sort_values(by = [self.country_key, self.period_key])
-        
-        if self.freq == "A":
-            to_year = 1
-        elif self.freq == "Q":
-            to_year = 4
-        elif self.freq == "M":
-            to_year = 12
+        countries = pd.Index(meta[self.country_key])
+        periods = pd.Index(skeleton_w_gdp[self.period_key].unique()).sort_values()
+        decades, period_decade = np.unique((periods.year // 10) * 10, return_inverse = True)
+
+        #---- locate observations in the skeleton
 
-        # check country ids (from full-sized skeleton) are non-missing before collapsing
+        codes, indicators = pd.factorize(df[self.series_key], sort = True)
+        country_idx = countries.get_indexer(df[self.country_key])
+        period_idx = periods.get_indexer(df[self.period_key])
 
-        if True in ((h_df[self.country_key].isna()) | (h_df[self.period_key].isna())):
+        not_in_skeleton = (country_idx < 0) | (period_idx < 0)
+        if not_in_skeleton.any():
+            SERIES = [indicators[codes[not_in_skeleton][0]]]
             raise ValueError(f"Error constructing reporter_check for {SERIES} ({self.freq}). Please check construction.")
-        
-        # collapse at decade and find number of years reporting
 
-        not_to_pivot = ["gdp_last_available_period", "last_gdp", "gdp_available"]
-        meta = h_df[[self.country_key, self.country_key_desc] + not_to_pivot].drop_duplicates()
-        
-        h_df = (
-            h_df
-            .groupby([self.country_key, self.country_key_desc, "decade"])
-            .agg(
-                merged_years = ("_merge", lambda x : x.sum() / to_year),
-                gdp_last_available_period = ("gdp_last_available_period", "first"),
-                last_gdp = ("last_gdp", "first"),
+        n_ind, n_cty, n_per = len(indicators), len(countries), len(periods)
+
+        cell = (codes.astype(np.int64) * n_cty + country_idx) * n_per + period_idx
+        unique_cells, counts = np.unique(cell, return_counts = True)
+        if (counts > 1).any():
+            SERIES = [indicators[unique_cells[counts > 1][0] // (n_cty * n_per)]]
+            raise pd.errors.MergeError(
+                f"MergeError in subdata={self.subdata}, {self.series_key}={SERIES}, {self.freq_key}={self.freq}: \n "
+                "Merge keys are not unique in left dataset; not a one-to-one merge"
             )
-            .reset_index()
-            .pivot_table(
-                index = [self.country_key, self.country_key_desc],
-                columns = "decade",
-                values = "merged_years",
-            ).reset_index()
-        )
-        h_df = h_df.merge(meta, on = [self.country_key, self.country_key_desc], how = "outer", validate = "1:1", indicator = True)
 
-        _merge_results = statatab(h_df["_merge"])
-        h_df["drop_for_table"] = (h_df["_merge"] == "right_only").astype(int)
-        h_df.drop(columns = "_merge", inplace = True)
-        
-        # _checker = (
-        #     _merge_results
-        #     .loc[_merge_results["Value"] == "both", "Percentage"]
-        #     .loc[0]
-        # )
-        # if _checker != 100:
-        #     raise ValueError(f"Error constructing reporter_check for {SERIES} ({self.freq}). Please check construction.")
+        #---- (indicator, country, decade) cube of years reported
 
-        decadevars = h_df.filter(regex = r"^\d{4}$").columns
-        h_df = h_df[list(h_df.drop(columns = decadevars).columns) + list(decadevars)]
+        cube = np.bincount(
+            (codes.astype(np.int64) * n_cty + country_idx) * len(decades) + period_decade[period_idx],
+            minlength = n_ind * n_cty * len(decades)
+        ).reshape(n_ind, n_cty, len(decades))
 
-        h_df[decadevars] = h_df[decadevars].apply(lambda x : x.fillna(0))
-        h_df[decadevars] = h_df[decadevars].round(2)
+        # countries without REF_AREA description (only in WDI) are not counted
 
-        h_df["perc_reported"] = h_df[decadevars].sum(axis=1) / h_df[decadevars].sum(axis=1).max()
-        h_df = pd.concat([
-            h_df.drop(columns = decadevars),
-            h_df[decadevars]
-        ], axis = 1)
-        h_df["perc_reported"] = h_df["perc_reported"].round(2)
+        cube[:, meta[self.country_key_desc].isna().to_numpy(), :] = 0
 
-        if self.report_percen is not None:
-            drop = h_df["perc_reported"] > self.report_percen
-            h_df = h_df[~drop]
+        merged_years = np.round(cube / to_year, 2)
+        periods_reported = merged_years.sum(axis = 2)
 
-        # merge iso3 if available, and cty_name for missing if available
+        with np.errstate(invalid = "ignore", divide = "ignore"):
+            perc_reported = np.round(periods_reported / periods_reported.max(axis = 1, keepdims = True), 2)
 
-        all_country_keys = h_df[self.country_key].unique()
+        #---- columns shared by all indicators
 
         to_iso = "ISO2" if self.country_key_iso == "ISO3" else "ISO3"
         to_iso_label = "cty_iso2" if self.country_key_iso == "ISO3" else "cty_iso3"
 
-        add_iso = silent_call(cc.convert, all_country_keys, src = self.country_key_iso, to = to_iso, verbose = False) 
-        add_iso = pd.DataFrame({self.country_key : all_country_keys, to_iso_label : add_iso})
+        add_iso = silent_call(cc.convert, countries.to_list(), src = self.country_key_iso, to = to_iso, verbose = False)
+        cty_name = silent_call(cc.convert, countries.to_list(), src = self.country_key_iso, to = "name_short", verbose = False)
 
-        cty_name = silent_call(cc.convert, all_country_keys, src = self.country_key_iso, to = "name_short", verbose = False)
-        cty_name = pd.DataFrame({self.country_key : all_country_keys, "cty_name" : cty_name})
+        base = pd.DataFrame({to_iso_label : add_iso})
+        base[self.country_key] = meta[self.country_key]
+        base[self.country_key_desc] = np.where(meta[self.country_key_desc].isna(), pd.Series(cty_name), meta[self.country_key_desc])
+        base["GDP Last Reporting Year"] = meta["gdp_last_available_period"].dt.year
+        base["Last GDP Reported (USD Billion)"] = (meta["last_gdp"] / 1e9).round(2)
+        base["gdp_available"] = meta["gdp_available"]
 
-        h_df = h_df.merge(add_iso, on = self.country_key, how = "left", validate = "1:1")
-        h_df = h_df[["cty_iso3"] + list(h_df.drop(columns = "cty_iso3").columns)]
-        h_df[self.country_key_desc] = np.where(h_df[self.country_key_desc].isna(), cty_name["cty_name"], h_df[self.country_key_desc])
-        
-        # final formats
+        # countries are ordered by raw GDP (before rounding), as in the single-indicator report
 
-        h_df = h_df.sort_values(by = "last_gdp", ascending = False).reset_index(drop = True)
-        h_df.columns.name = None
-        h_df["last_gdp"] = h_df["last_gdp"] / 1e9
-        h_df["last_gdp"] = h_df["last_gdp"].round(2)
-        h_df["gdp_last_available_period"] = h_df["gdp_last_available_period"].dt.year
+        last_gdp = meta["last_gdp"].rename("_last_gdp")
 
-        # rename and output
-        
-        h_df.rename(columns = {
-            "gdp_last_available_period" : "GDP Last Reporting Year",
-            "last_gdp" : "Last GDP Reported (USD Billion)",
-            "perc_reported" : "Percentage of Periods Reported"
-        }, inplace = True)
+        #---- summarized: GDP-weighted share of periods reported
 
-        # drop countries that don't report to the IMF, regardless of whether they have GDP available in WB-WDI
-        # (At the end I decide not to use it bc there are interesting countries with GDP that don't report to the IMF, as the UAE)
+        if self.summarized:
 
-        h_df.drop(columns = "drop_for_table", inplace = True)
+            total_last_gdp_bn = skeleton_w_gdp.groupby(self.country_key).agg({"last_gdp" : "max"})["last_gdp"].sum() / 1e9
 
-        # if summarized = False, print final sample selection
+            order = last_gdp.sort_values(ascending = False).index.to_numpy()
+            w = (base["Last GDP Reported (USD Billion)"].to_numpy() / total_last_gdp_bn)[order]
 
-        if not self.summarized:
+            # report_percen = 1 when summarized: no country is dropped
 
-            if self.REF_AREA_all == False:
-                _message = textwrap.dedent("""\
-                \n Reporting REF_AREA with GDP available in WB WDI. To see all possible 
-                REF_AREA, please set flag REF_AREA_all = True.
-                """)
-                print(_message)
-                h_df = h_df.loc[h_df["gdp_available"] == 1, :]
+            return {
+                ind : {
+                    "mean_report" : float(np.dot(perc_reported[i][order], w)),
+                    "n_countries_summarized" : n_cty,
+                    "n_countries_reporting" : int((perc_reported[i] > 0).sum())
+                }
+                for i, ind in enumerate(indicators)
+            }
 
-            h_df = h_df.drop(columns = "gdp_available")
+        #---- full tables
 
-            return h_df
-        
-        # if summarized = True, give sufficient stat on world reporting
+        if self.REF_AREA_all == False and n_ind == 1:
+            _message = textwrap.dedent("""\
+            \n Reporting REF_AREA with GDP available in WB WDI. To see all possible 
+            REF_AREA, please set flag REF_AREA_all = True.
+            """)
+            print(_message)
 
-        if self.summarized:
-            
-            size_orderer = skeleton_w_gdp.groupby(self.country_key).agg({"last_gdp" : "max"})
+        report_list = {}
 
-            total_last_gdp_bn = size_orderer["last_gdp"].sum() / 1e9
+        for i, ind in enumerate(indicators):
 
-            avail_percen = h_df["Percentage of Periods Reported"]
-            
-            w = h_df["Last GDP Reported (USD Billion)"] / total_last_gdp_bn
+            h_df = pd.concat([
+                base,
+                last_gdp,
+                pd.Series(perc_reported[i], name = "Percentage of Periods Reported"),
+                pd.DataFrame(merged_years[i], columns = decades.tolist())
+            ], axis = 1)
 
-            report_summary = {
-                "mean_report" : float(np.dot(avail_percen, w)),
-                "n_countries_summarized" : len(h_df)
-            }
-            
-            return report_summary
+            if self.report_percen is not None:
+                h_df = h_df[~(h_df["Percentage of Periods Reported"] > self.report_percen)]
+
+            h_df = h_df.sort_values(by = "_last_gdp", ascending = False).reset_index(drop = True).drop(columns = "_last_gdp")
+
+            if self.REF_AREA_all == False:
+                h_df = h_df.loc[h_df["gdp_available"] == 1, :]
+
+            report_list[ind] = h_df.drop(columns = "gdp_available")
+
+        return report_list
+
+    def _report_list(self):
+
+        # ({indicator : table or summary, None if not found}, number of indicators found)
 
-    def create_report_tables(self):
-        
-        from pysfo.pulldata.imf_bop.master_upload import get
-        from pysfo.basic import silent_call
         from pysfo.pulldata.exceptions import SeriesNotFoundError
 
         # self = checkReporting(provider, dataset, subdata, series, freq, summarized, report_percen, start_date, end_date, REF_AREA_all)
@@ -343,7 +382,7 @@ class checkReporting:
                 print(f"{e.not_found_list} not found. Skipping...")
                 not_found_list = e.not_found_list
                 cleaned_indicators = [ind for ind in series_list if ind not in not_found_list]    
-                df = get(self.subdata, cleaned_indicators, self.freq, silent = True)
+                df = self.get_series_fn(self.subdata, cleaned_indicators, self.freq, silent = True)
 
         if self.start_date is not None:
             df = df[df[self.period_key] >= self.start_date]
@@ -356,24 +395,25 @@ class checkReporting:
 
         skeleton_w_gdp = self._generate_gdp_skeleton(all_periods)
         
-        # generate reports for each indicator
-
-        verbose = True if df[self.series_key].nunique() == 1 else False
+        # generate reports for all indicators at once
 
-        report_list = {
-            ind : silent_call(self._check_reporting_for_individual_indicator, ind_df, skeleton_w_gdp, verbose = verbose)
-            for ind, ind_df in df.groupby(self.series_key)
-        }
+        report_list = self._check_reporting_for_all_indicators(df, skeleton_w_gdp)
         
         report_list = {
             ind: report_list.get(ind)
             for ind in series_list
         }
 
-        if df[self.series_key].nunique() == 1:
+        return report_list, df[self.series_key].nunique()
+
+    def create_report_tables(self):
+
+        report_list, n_found = self._report_list()
+
+        if n_found == 1:
 
             return next(iter(report_list.values()))
         
         else:
             
-            return report_list
\ No newline at end of file
+            return report_list
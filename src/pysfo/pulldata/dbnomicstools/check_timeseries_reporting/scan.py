@@ -0,0 +1,193 @@
+"""
+Bulk reporting scan over the stored subdata of a dbnomics dataset.
+Each subdata is scanned in a worker process with the all-indicators reporting engine
+(summarized, for every frequency), and its coverage rows are persisted in the `_cache`
+directory of the dataset, keyed by the files they are built from, so that later
+selections are lookups.
+"""
+
+# cache subdirectory (in the dataset `_cache` directory) of the persisted coverage rows
+COVERAGE_DIRNAME = "reporting_coverage"
+
+# frequencies handled by the reporting engine
+REPORTING_FREQS = ["A", "Q", "M"]
+
+#%%========== helper functions ==========%%#
+
+def _dataset_dir(provider, dataset):
+
+    # raw files of a dataset are stored under the name of its package directory
+
+    from pathlib import Path
+    from pysfo.pulldata.config import get_data_path
+    from pysfo.pulldata.dbnomicstools.check_timeseries_reporting.get_dataset_keys import get_dataset_keys
+
+    metadata_path = get_dataset_keys(provider, dataset)[6]
+
+    return get_data_path() / Path(metadata_path).name
+
+def _stored_subdata(data_dir):
+
+    from pathlib import Path
+
+    return sorted({
+        path.stem for path in Path(data_dir).iterdir()
+        if path.suffix in (".parquet", ".csv") and not path.stem.endswith("_ERROR")
+    })
+
+def _coverage_file(data_dir, subdata):
+
+    from pysfo.pulldata.cache import cache_dir
+
+    p = cache_dir(data_dir) / COVERAGE_DIRNAME
+    p.mkdir(exist_ok = True)
+
+    return p / f"{subdata}.parquet"
+
+def _coverage_signature(provider, dataset, data_dir, subdata):
+
+    from pysfo.pulldata.cache import source_signature
+    from pysfo.pulldata.dbnomicstools.storage import subdata_file
+    from pysfo.pulldata.dbnomicstools.check_timeseries_reporting.create_report import checkReporting
+
+    # reporting depends on the subdata, the REF_AREA metadata and the WDI GDP download
+
+    reporter = checkReporting(provider, dataset, subdata, None, None, True, 1, None, None, False)
+    _, _, signature = reporter._gdp_sources()
+
+    return {**signature, **source_signature(subdata_file(data_dir, subdata))}
+
+def _scan_subdata(provider, dataset, subdata, FREQ, start_date, end_date, data_path):
+
+    import pandas as pd
+    from pysfo.pulldata.config import set_data_path
+    from pysfo.pulldata.dbnomicstools.storage import read_subdata, subdata_file
+    from pysfo.pulldata.dbnomicstools.check_timeseries_reporting.create_report import checkReporting
+
+    # worker processes do not share the global data path of the parent process
+
+    set_data_path(data_path)
+
+    pairs = read_subdata(
+        subdata_file(_dataset_dir(provider, dataset), subdata),
+        partition_cols = ["INDICATOR", "FREQ"],
+        silent = True,
+        columns = ["INDICATOR", "FREQ"]
+    ).drop_duplicates()
+
+    rows = []
+
+    for freq, freq_pairs in pairs.groupby("FREQ"):
+
+        if freq not in FREQ:
+            continue
+
+        reporter = checkReporting(provider, dataset, subdata, sorted(freq_pairs["INDICATOR"]), freq, True, 1, start_date, end_date, False)
+        report_list, _ = reporter._report_list()
+
+        rows += [
+            {"subdata" : subdata, "indicator" : ind, "freq" : freq, **summary}
+            for ind, summary in report_list.items() if summary is not None
+        ]
+
+    return pd.DataFrame(rows, columns = ["subdata", "indicator", "freq", "mean_report", "n_countries_summarized", "n_countries_reporting"])
+
+#%%========== main function ==========%%#
+
+def scan_reporting(provider, dataset, subdata = None, FREQ = None, start_date = None, end_date = None, n_jobs = -1, use_cache = True, silent = False):
+    """
+    GDP-weighted reporting coverage of every indicator and frequency of a dataset.
+
+    Every stored subdata (or the ones requested) is scanned with `check_reporting(summarized = True)`
+    for all its indicators at once, one subdata per worker process. Results are persisted
+    per subdata and reused until the subdata file, the REF_AREA metadata or the WDI GDP
+    download change.
+
+    Parameters
+    ----------
+    provider, dataset : str
+        dbnomics provider and dataset (e.g. "IMF", "IFS").
+    subdata : str | list, optional
+        Subdata to scan. Defaults to every subdata stored locally.
+    FREQ : str | list, optional
+        Frequencies to scan, among "A", "Q" and "M". Defaults to all of them.
+    start_date, end_date : str, optional
+        Period window of the reporting check.
+    n_jobs : int, default -1
+        Number of worker processes (joblib convention).
+    use_cache : bool, default True
+        If False, rescan every subdata and overwrite the persisted coverage.
+    silent : bool, default False
+        If True, suppress progress messages.
+
+    Returns
+    -------
+    pd.DataFrame
+        Coverage matrix indexed by (subdata, indicator), with columns
+        (measure, freq) for measures `mean_report` (GDP-weighted share of periods
+        reported), `n_countries_reporting` and `n_countries_summarized`.
+    """
+
+    import pandas as pd
+    from joblib import Parallel, delayed
+    from pysfo.pulldata.config import get_data_path
+    from pysfo.pulldata.cache import is_fresh, write_manifest, atomic_path
+    import os
+
+    data_dir = _dataset_dir(provider, dataset)
+
+    subdata_list = _stored_subdata(data_dir) if subdata is None else [subdata] if isinstance(subdata, str) else list(subdata)
+    subdata_list = [sd.replace(" ", "_") for sd in subdata_list]
+    FREQ = REPORTING_FREQS if FREQ is None else [FREQ] if isinstance(FREQ, str) else list(FREQ)
+
+    if len(subdata_list) == 0:
+        raise FileNotFoundError(f"No subdata stored in {data_dir}.")
+
+    params = {"FREQ" : sorted(FREQ), "start_date" : None if start_date is None else str(start_date), "end_date" : None if end_date is None else str(end_date)}
+
+    coverage = {}
+    to_scan = {}
+
+    for sd in subdata_list:
+
+        coverage_file = _coverage_file(data_dir, sd)
+        signature = _coverage_signature(provider, dataset, data_dir, sd)
+
+        if use_cache and is_fresh(coverage_file, signature, **params):
+            coverage[sd] = pd.read_parquet(coverage_file)
+        else:
+            to_scan[sd] = (coverage_file, signature)
+
+    if not silent:
+        print(f"Scanning reporting of {len(to_scan)} subdata ({len(coverage)} read from cache).")
+
+    if len(to_scan):
+
+        results = Parallel(n_jobs = 1 if len(to_scan) == 1 else n_jobs, verbose = 0 if silent else 10)(
+            delayed(_scan_subdata)(provider, dataset, sd, FREQ, start_date, end_date, get_data_path())
+            for sd in to_scan
+        )
+
+        for (sd, (coverage_file, signature)), df in zip(to_scan.items(), results):
+
+            tmp = atomic_path(coverage_file)
+            df.to_parquet(tmp, index = False)
+            os.replace(tmp, coverage_file)
+            write_manifest(coverage_file, signature, **params)
+
+            coverage[sd] = df
+
+    coverage = pd.concat([coverage[sd] for sd in subdata_list], axis = 0, ignore_index = True)
+
+    coverage = coverage.pivot(
+        index = ["subdata", "indicator"],
+        columns = "freq",
+        values = ["mean_report", "n_countries_reporting", "n_countries_summarized"]
+    )
+    coverage.columns.names = ["measure", "freq"]
+
+    return coverage
+
+__all__ = [
+    "scan_reporting"
+]
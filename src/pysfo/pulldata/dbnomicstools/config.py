@@ -1,3 +1,13 @@
+#%%========== module parameters ==========%%#
+
+# process-wide cache of parsed .customization files: {abs path : (signature, metadata, metadata_by_dim)}
+_FILTERS_CACHE = {}
+
+# suffix of the compiled (pickled) metadata index stored next to each .customization file
+COMPILED_INDEX_SUFFIX = ".index.pkl"
+
+#%%========== helper functions ==========%%#
+
 def _load_json(file_path):
 
     import json
@@ -21,14 +31,14 @@ def _extract_filters_from_json(json_metadata_path):
 
     dim_codes = metadata["dimensions_codes_order"]
     dim_values = metadata["dimensions_values_labels"]
-    
+
     df_list = []
 
     for dim in dim_codes:
-        
+
         elems = [
             [
-                dim, 
+                dim,
                 key,
                 val
             ] for key, val in dim_values[dim].items()
@@ -45,16 +55,102 @@ def _extract_filters_from_json(json_metadata_path):
 
     return df
 
+def _read_compiled_index(json_metadata_path, signature):
+
+    import pickle
+    import pandas as pd
+
+    index_path = str(json_metadata_path) + COMPILED_INDEX_SUFFIX
+
+    try:
+        with open(index_path, "rb") as f:
+            compiled = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError):
+        return None
+
+    # pickled frames are only reused by the pandas version that wrote them
+
+    if compiled.get("signature") != signature or compiled.get("pandas") != pd.__version__:
+        return None
+
+    return compiled["metadata"]
+
+def _write_compiled_index(json_metadata_path, signature, metadata):
+
+    import os
+    import pickle
+    import pandas as pd
+    from pysfo.pulldata.cache import atomic_path
+
+    index_path = str(json_metadata_path) + COMPILED_INDEX_SUFFIX
+    tmp = atomic_path(index_path)
+
+    # the compiled index is optional: skip it if the package directory is not writable
+
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump({"signature" : signature, "pandas" : pd.__version__, "metadata" : metadata}, f, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, index_path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def _load_filters(json_metadata_path):
+
+    import os
+    from pysfo.pulldata.cache import source_signature
+
+    key = os.path.abspath(json_metadata_path)
+    signature = source_signature(json_metadata_path)
+
+    cached = _FILTERS_CACHE.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached
+
+    metadata = _read_compiled_index(json_metadata_path, signature)
+
+    if metadata is None:
+        metadata = _extract_filters_from_json(json_metadata_path)
+        _write_compiled_index(json_metadata_path, signature, metadata)
+
+    metadata_by_dim = {dim : df for dim, df in metadata.groupby("ID", sort = False)}
+
+    _FILTERS_CACHE[key] = (signature, metadata, metadata_by_dim)
+
+    return _FILTERS_CACHE[key]
+
+#%%========== main functions ==========%%#
+
+def customization_file(metadata_dir):
+    """
+    Return the path to the dbnomics `.customization` metadata file stored in `metadata_dir`.
+    """
+
+    import os
+
+    file = [file for file in sorted(os.listdir(metadata_dir)) if file.endswith(".customization")][0]
+
+    return os.path.join(metadata_dir, file)
+
 def get_filters(json_metadata_path, filter = None):
+    """
+    Return the dimensions (ID, VALUE, DESCRIPTION_TEXT) of a dbnomics dataset.
+
+    Parsed metadata is memoized per process, keyed by the file path, mtime and size, and
+    compiled to a pickled index next to the `.customization` file so new processes skip
+    the JSON parsing. Callers receive a copy they are free to modify.
+    """
 
-    metadata = _extract_filters_from_json(json_metadata_path)
+    _, metadata, metadata_by_dim = _load_filters(json_metadata_path)
 
     if filter is not None:
-        return metadata.loc[metadata["ID"] == f"{filter}", :]
+        if f"{filter}" in metadata_by_dim:
+            return metadata_by_dim[f"{filter}"].copy()
+        return metadata.iloc[0:0].copy()
+
+    return metadata.copy()
 
-    return metadata
-    
 __all__ = [
+    "customization_file",
     "get_filters"
 ]
-
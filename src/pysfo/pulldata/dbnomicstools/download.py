@@ -0,0 +1,565 @@
+"""
+Checkpointed batch downloads of dbnomics series.
+Each batch of dimensions is fetched in a joblib pool and persisted as a shard under
+`<save_dir>/_checkpoints/<dataname>/` as soon as it completes. Reruns only fetch the
+batches without a shard, and the final dataset is assembled from the shards.
+
+Stored datasets can also be refreshed incrementally: the last-update stamp (`indexed_at`)
+of every series is compared against a local manifest `<save_dir>/<dataname>.stamps.json`
+and only new or changed series are fetched and merged into the stored file.
+
+Batches are sized by `plan_batches` from the number of series each dimension value
+expands to, and from the per-series latency measured in previous runs.
+"""
+
+CHECKPOINT_DIRNAME = "_checkpoints"
+
+STAMPS_SUFFIX = ".stamps.json"
+
+# series ids per request when fetching changed series (ids are sent in the url)
+SERIES_IDS_CHUNK_SIZE = 50
+
+# batch planner: series per request are capped by the largest single request used so far,
+# and not split below one API page (1000 series)
+MAX_NB_SERIES_PER_BATCH = 40_000
+MIN_NB_SERIES_PER_BATCH = 1_000
+BATCHES_PER_WORKER = 4
+TARGET_BATCH_SECONDS = 300
+
+#%%========== helper functions ==========%%#
+
+def checkpoint_dir(save_dir, dataname):
+
+    from pathlib import Path
+
+    return Path(save_dir) / CHECKPOINT_DIRNAME / dataname
+
+def batch_key(batch):
+    """
+    Stable identifier of a batch of dimensions, used to name its checkpoint shard.
+    """
+
+    import json
+    import hashlib
+
+    return hashlib.sha1(json.dumps(batch, sort_keys = True).encode("utf-8")).hexdigest()[:16]
+
+def _shard_path(ckpt_dir, key):
+
+    return ckpt_dir / f"{key}.pkl"
+
+def _error_path(ckpt_dir, key):
+
+    return ckpt_dir / f"{key}.error"
+
+def _plan_path(ckpt_dir):
+
+    return ckpt_dir / "plan.json"
+
+def _latency_path(save_dir, dataname):
+
+    from pathlib import Path
+
+    return Path(save_dir) / CHECKPOINT_DIRNAME / f"{dataname}.latency.json"
+
+def _store_batch_result(ckpt_dir, key, result, seconds):
+
+    # write the shard of a completed batch, or its error
+
+    import os
+    from pysfo.pulldata.cache import atomic_path
+
+    if isinstance(result, Exception):
+        _error_path(ckpt_dir, key).write_text(repr(result), encoding = "utf-8")
+        return key, repr(result), seconds, 0
+
+    shard = _shard_path(ckpt_dir, key)
+    nb_series = result["series_code"].nunique() if "series_code" in result.columns else 0
+
+    tmp = atomic_path(shard)
+    result.to_pickle(tmp)
+    os.replace(tmp, shard)
+
+    if _error_path(ckpt_dir, key).exists():
+        os.remove(_error_path(ckpt_dir, key))
+
+    return key, None, seconds, nb_series
+
+def _fetch_batch_to_shard(fetch_fn, batch, max_nb_series, ckpt_dir, key):
+
+    # runs in the worker: the shard is written there so completed batches survive a crash of the run
+
+    import time
+
+    start = time.perf_counter()
+
+    try:
+        result = fetch_fn(dimensions = batch, max_nb_series = max_nb_series)
+    except Exception as e:
+        result = e
+
+    return _store_batch_result(ckpt_dir, key, result, time.perf_counter() - start)
+
+def _check_backend(backend):
+
+    if backend not in ("joblib", "async"):
+        raise ValueError(f"backend must be 'joblib' or 'async'. Got: {backend}")
+
+def _write_json(path, obj):
+
+    import os
+    import json
+    from pysfo.pulldata.cache import atomic_path
+
+    tmp = atomic_path(path)
+
+    with open(tmp, "w", encoding = "utf-8") as f:
+        json.dump(obj, f)
+
+    os.replace(tmp, path)
+
+def report_latency(latencies, label = "batch"):
+    """
+    Print a summary of per-batch latencies and return the seconds spent per series.
+
+    Parameters
+    ----------
+    latencies : list
+        List of (batch id, seconds, number of series) of completed batches.
+    """
+
+    import numpy as np
+
+    if len(latencies) == 0:
+        return None
+
+    seconds = np.array([lat[1] for lat in latencies])
+    nb_series = sum(lat[2] for lat in latencies)
+    slowest = latencies[int(seconds.argmax())]
+
+    print(
+        f". {label} latency (s): min {seconds.min():.1f}, median {np.median(seconds):.1f}, max {seconds.max():.1f} "
+        f"(slowest: {slowest[0]}, {slowest[2]} series)"
+    )
+
+    return float(seconds.sum() / nb_series) if nb_series > 0 else None
+
+def _series_stamps(provider_code, dataset_code, dimensions, max_nb_series, timeout = 60):
+
+    # series metadata only (observations=0): series_code and last-update stamp
+
+    import json
+    import pandas as pd
+    import dbnomics as db
+    from urllib.parse import urljoin
+
+    api_link = (
+        urljoin(db.default_api_base_url, "series")
+        + f"/{provider_code}/{dataset_code}?observations=0&dimensions={json.dumps(dimensions)}"
+    )
+
+    stamps = [
+        (infos["series"]["series_code"], infos["series"].get("indexed_at"))
+        for infos in db.iter_series_infos(api_link, max_nb_series = max_nb_series, timeout = timeout)
+    ]
+
+    return pd.DataFrame(stamps, columns = ["series_code", "indexed_at"])
+
+def _fetch_series_ids(series_ids, timeout = 60):
+
+    import dbnomics as db
+
+    return db.fetch_series(series_ids = series_ids, max_nb_series = len(series_ids), timeout = timeout)
+
+def stamps_path(save_dir, dataname):
+
+    from pathlib import Path
+
+    return Path(save_dir) / f"{dataname}{STAMPS_SUFFIX}"
+
+def read_stamps(save_dir, dataname):
+
+    import json
+
+    try:
+        with open(stamps_path(save_dir, dataname), "r", encoding = "utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_stamps(save_dir, dataname, stamps):
+
+    _write_json(stamps_path(save_dir, dataname), dict(zip(stamps["series_code"], stamps["indexed_at"])))
+
+def read_plan(save_dir, dataname):
+    """
+    Return the (batches, max_nb_series) of an interrupted checkpointed download, or None.
+    """
+
+    import json
+
+    try:
+        with open(_plan_path(checkpoint_dir(save_dir, dataname)), "r", encoding = "utf-8") as f:
+            plan = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    return plan["batches"], plan["max_nb_series"]
+
+def read_latency(save_dir, dataname):
+    """
+    Return the seconds per series measured in the last download of `dataname`, or None.
+    """
+
+    import json
+
+    try:
+        with open(_latency_path(save_dir, dataname), "r", encoding = "utf-8") as f:
+            return json.load(f)["seconds_per_series"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+#%%========== main functions ==========%%#
+
+def plan_batches(values, series_per_value = 1, max_nb_series = MAX_NB_SERIES_PER_BATCH, min_nb_series = MIN_NB_SERIES_PER_BATCH, n_jobs = -1, seconds_per_series = None):
+    """
+    Split `values` of the batched dimension into evenly sized batches.
+
+    The batch size is the largest one that keeps the estimated number of series per
+    batch (`len(batch) * series_per_value`) under `max_nb_series` and, when a latency
+    estimate is available, the estimated batch duration under `TARGET_BATCH_SECONDS`.
+    Batches are made small enough to give every worker several of them (so joblib can
+    rebalance work between workers), but not below `min_nb_series` series.
+
+    Parameters
+    ----------
+    values : list
+        Values of the batched dimension (e.g. indicators).
+    series_per_value : int, default 1
+        Maximum number of series each value expands to (product of the other dimensions).
+    max_nb_series : int
+        Maximum number of series fetched per batch.
+    min_nb_series : int
+        Minimum number of series fetched per batch.
+    n_jobs : int, default -1
+        Number of joblib workers (joblib convention).
+    seconds_per_series : float, optional
+        Latency per series measured in a previous run (see `read_latency`).
+
+    Returns
+    -------
+    list
+        List of batches (lists of values).
+    """
+
+    import math
+    from joblib import effective_n_jobs
+
+    if len(values) == 0:
+        return []
+
+    series_per_value = max(1, series_per_value)
+
+    size_cap = max(1, max_nb_series // series_per_value)
+    if seconds_per_series:
+        size_cap = min(size_cap, max(1, int(TARGET_BATCH_SECONDS / (series_per_value * seconds_per_series))))
+
+    size_floor = max(1, math.ceil(min_nb_series / series_per_value))
+    size_balance = math.ceil(len(values) / (BATCHES_PER_WORKER * effective_n_jobs(n_jobs)))
+
+    size = max(1, min(size_cap, max(size_floor, size_balance)))
+    n_batches = math.ceil(len(values) / size)
+
+    # even split: batch sizes differ by at most one value
+
+    q, r = divmod(len(values), n_batches)
+    bounds = [i * q + min(i, r) for i in range(n_batches + 1)]
+
+    return [list(values[bounds[i]:bounds[i + 1]]) for i in range(n_batches)]
+
+def fetch_batches_checkpointed(fetch_fn, batches, max_nb_series, save_dir, dataname, n_jobs = -1, resume = True, backend = "joblib"):
+    """
+    Fetch `batches` of dimensions with `fetch_fn`, checkpointing each batch to disk.
+
+    Parameters
+    ----------
+    fetch_fn : callable | AsyncFetcher
+        Picklable fetcher called as fetch_fn(dimensions = batch, max_nb_series = n), e.g. a
+        `functools.partial` of `dbnomics.fetch_series` with provider and dataset codes.
+        With backend = "async", an `AsyncFetcher` of the dataset.
+    batches : list
+        List of dimension dicts.
+    max_nb_series : list
+        Maximum number of series of each batch.
+    save_dir : str | Path
+        Directory where the dataset is stored. Shards go to `<save_dir>/_checkpoints/<dataname>`.
+    dataname : str
+        Name of the dataset.
+    n_jobs : int, default -1
+        Number of joblib workers.
+    resume : bool, default True
+        If False, discard existing shards and fetch every batch.
+    backend : str, default "joblib"
+        "joblib" fetches batches in worker processes, "async" fetches them concurrently
+        over a pooled HTTP session (see `async_fetch.AsyncFetcher`).
+
+    Returns
+    -------
+    tuple
+        (df, errors): the assembled DataFrame (None if any batch failed) and a DataFrame with
+        the dimensions and error message of the failed batches.
+    """
+
+    import os
+    import shutil
+    import pandas as pd
+    from joblib import Parallel, delayed
+
+    _check_backend(backend)
+
+    if not os.path.isdir(save_dir):
+        raise FileNotFoundError(f"Directory to save data does not exist: {save_dir}")
+
+    ckpt_dir = checkpoint_dir(save_dir, dataname)
+
+    if not resume and ckpt_dir.exists():
+        shutil.rmtree(ckpt_dir)
+
+    ckpt_dir.mkdir(parents = True, exist_ok = True)
+
+    keys = [batch_key(batch) for batch in batches]
+    _write_json(_plan_path(ckpt_dir), {"batches" : batches, "max_nb_series" : max_nb_series})
+    # largest batches first, so the long ones do not end up last on a single worker
+
+    pending = sorted(
+        [
+            (batch, max_nb_s, key)
+            for batch, max_nb_s, key in zip(batches, max_nb_series, keys)
+            if not _shard_path(ckpt_dir, key).exists()
+        ],
+        key = lambda x : -x[1]
+    )
+
+    print(f". Batches: {len(batches)} in total, {len(batches) - len(pending)} already checkpointed, {len(pending)} to fetch")
+
+    if backend == "async":
+
+        results = [None] * len(pending)
+
+        def _on_result(i, result, seconds):
+            results[i] = _store_batch_result(ckpt_dir, pending[i][2], result, seconds)
+
+        fetch_fn.fetch_many(
+            [{"dimensions" : batch, "max_nb_series" : max_nb_s} for batch, max_nb_s, _ in pending],
+            on_result = _on_result
+        )
+
+    else:
+
+        results = Parallel(n_jobs = n_jobs, verbose = 10)(
+            delayed(_fetch_batch_to_shard)(fetch_fn, batch, max_nb_s, ckpt_dir, key)
+            for batch, max_nb_s, key in pending
+        )
+
+    failed = {key : error for key, error, *_ in results if error is not None}
+
+    seconds_per_series = report_latency([(key, seconds, nb_s) for key, error, seconds, nb_s in results if error is None])
+    if seconds_per_series is not None:
+        _write_json(_latency_path(save_dir, dataname), {"seconds_per_series" : seconds_per_series})
+
+    errors = pd.DataFrame(
+        [
+            {"batch" : key, "dimensions" : batch, "error" : failed[key]}
+            for batch, key in zip(batches, keys) if key in failed
+        ],
+        columns = ["batch", "dimensions", "error"]
+    )
+
+    if len(failed) > 0:
+        return None, errors
+
+    df = pd.concat([pd.read_pickle(_shard_path(ckpt_dir, key)) for key in keys], axis = 0)
+
+    return df, errors
+
+def fetch_series_stamps(provider_code, dataset_code, batches, max_nb_series, n_jobs = -1):
+    """
+    Return the last-update stamp of the series in `batches` of dimensions.
+
+    Only series metadata is requested (no observations), so this is cheap compared to
+    fetching the data.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns `series_code` and `indexed_at`.
+    """
+
+    import pandas as pd
+    from joblib import Parallel, delayed
+
+    results = Parallel(n_jobs = n_jobs)(
+        delayed(_series_stamps)(provider_code, dataset_code, batch, max_nb_s)
+        for batch, max_nb_s in zip(batches, max_nb_series)
+    )
+
+    return pd.concat(results, axis = 0, ignore_index = True).drop_duplicates("series_code")
+
+def record_series_stamps(provider_code, dataset_code, save_dir, dataname, batches, max_nb_series, stamps = None, n_jobs = -1):
+    """
+    Store the last-update stamps of a completed full download, best-effort.
+
+    `stamps` already fetched (e.g. for an update) are written as they are; otherwise they
+    are fetched now. A failure only leaves the dataset without stamps (the next update
+    asks for a full fetch): it never discards the downloaded data.
+
+    Returns
+    -------
+    pd.DataFrame | None
+        The stamps written, or None if they could not be fetched.
+    """
+
+    if stamps is None:
+        try:
+            stamps = fetch_series_stamps(provider_code, dataset_code, batches, max_nb_series, n_jobs = n_jobs)
+        except Exception as e:
+            print(f". Could not fetch the series stamps of {dataname} ({e}). The next update will need a full fetch.")
+            return None
+
+    write_stamps(save_dir, dataname, stamps)
+
+    return stamps
+
+def update_stored_series(provider_code, dataset_code, save_dir, dataname, stamps, n_jobs = -1, values_as_str = False, backend = "joblib", partition_cols = None):
+    """
+    Refresh the stored `<save_dir>/<dataname>` file with the series whose stamp changed.
+
+    Series that are new or whose `indexed_at` differs from the local manifest are fetched
+    by series id and replace their rows in the stored file. Series no longer in `stamps`
+    are dropped.
+
+    Parameters
+    ----------
+    provider_code, dataset_code : str
+        dbnomics provider and dataset.
+    save_dir : str | Path
+        Directory where the dataset is stored.
+    dataname : str
+        Name of the stored dataset.
+    stamps : pd.DataFrame
+        Current stamps (see `fetch_series_stamps`).
+    n_jobs : int, default -1
+        Number of joblib workers.
+    values_as_str : bool, default False
+        Cast fetched data to str before storing in a legacy `.csv` file.
+    backend : str, default "joblib"
+        "joblib" or "async" (see `fetch_batches_checkpointed`).
+    partition_cols : list, optional
+        Row-group columns of the stored `.parquet` file (see `write_subdata`).
+
+    Returns
+    -------
+    bool
+        False if there is no local manifest to compare against (a full fetch is needed).
+    """
+
+    import pandas as pd
+    from joblib import Parallel, delayed
+    from pysfo.pulldata.dbnomicstools.async_fetch import AsyncFetcher
+    from pysfo.pulldata.dbnomicstools.storage import subdata_file, write_subdata
+
+    _check_backend(backend)
+
+    local_stamps = read_stamps(save_dir, dataname)
+
+    if local_stamps is None:
+        print(f". No series stamps stored for {dataname}. A full fetch is needed before updates.")
+        return False
+
+    current_stamps = dict(zip(stamps["series_code"], stamps["indexed_at"]))
+
+    changed = [code for code, stamp in current_stamps.items() if local_stamps.get(code) != stamp]
+    removed = [code for code in local_stamps if code not in current_stamps]
+
+    print(f". {len(changed)} series new or updated, {len(removed)} removed, {len(current_stamps) - len(changed)} unchanged")
+
+    if len(changed) + len(removed) == 0:
+        return True
+
+    series_ids = [f"{provider_code}/{dataset_code}/{code}" for code in changed]
+    chunks = [series_ids[i:i + SERIES_IDS_CHUNK_SIZE] for i in range(0, len(series_ids), SERIES_IDS_CHUNK_SIZE)]
+
+    if backend == "async":
+
+        results = AsyncFetcher(provider_code, dataset_code, timeout = 60).fetch_many(
+            [{"series_ids" : chunk, "max_nb_series" : len(chunk)} for chunk in chunks]
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    else:
+
+        results = Parallel(n_jobs = n_jobs, verbose = 10)(
+            delayed(_fetch_series_ids)(chunk)
+            for chunk in chunks
+        )
+
+    stored_path = subdata_file(save_dir, dataname)
+
+    if stored_path.suffix == ".parquet":
+
+        stored = pd.read_parquet(stored_path)
+        stored = stored.loc[~stored["series_code"].isin(changed + removed), :]
+
+        fetched = [df for df in results if len(df) > 0]
+
+        # categoricals are rebuilt by the writer from the concatenated columns
+
+        stored = stored.astype({col : "object" for col in stored.columns if isinstance(stored[col].dtype, pd.CategoricalDtype)})
+
+        df = pd.concat([stored] + fetched, axis = 0, ignore_index = True)
+        write_subdata(df, stored_path, partition_cols = partition_cols)
+
+    else:
+
+        # legacy files: stored rows are kept as written, read as text with no NA conversion
+
+        stored = pd.read_csv(stored_path, index_col = 0, dtype = str, keep_default_na = False)
+        stored = stored.loc[~stored["series_code"].isin(changed + removed), :]
+
+        fetched = [df.astype(str) if values_as_str else df for df in results if len(df) > 0]
+
+        df = pd.concat([stored] + fetched, axis = 0, ignore_index = True)
+        df.to_csv(stored_path)
+
+    write_stamps(save_dir, dataname, stamps)
+
+    return True
+
+def clear_checkpoints(save_dir, dataname):
+    """
+    Remove the checkpoint shards of `dataname`.
+    """
+
+    import shutil
+
+    ckpt_dir = checkpoint_dir(save_dir, dataname)
+
+    if ckpt_dir.exists():
+        shutil.rmtree(ckpt_dir)
+
+    if ckpt_dir.parent.exists() and not any(ckpt_dir.parent.iterdir()):
+        ckpt_dir.parent.rmdir()
+
+__all__ = [
+    "plan_batches",
+    "read_plan",
+    "read_latency",
+    "report_latency",
+    "fetch_batches_checkpointed",
+    "fetch_series_stamps",
+    "record_series_stamps",
+    "update_stored_series",
+    "clear_checkpoints"
+]
@@ -0,0 +1,310 @@
+"""
+Local storage of dbnomics subdata files.
+The downloaders write `<subdata>.parquet` files: typed (categorical dimensions, float64
+values, datetime periods), compressed, sorted and split in row groups by the partition
+columns, so that later reads only touch the row groups of the requested series.
+Legacy `<subdata>.csv` files are transparently converted to a Parquet cache with the
+same layout.
+"""
+
+# minimum number of rows per parquet row group (consecutive partitions are coalesced)
+MIN_ROW_GROUP_SIZE = 50_000
+
+# bytes of CSV parsed per block when streaming a file without cache
+STREAM_BLOCK_SIZE = 16 << 20
+
+# strings read as missing when streaming (same defaults as pd.read_csv)
+CSV_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+]
+
+#%%========== helper functions ==========%%#
+
+def _normalize_filters(filters):
+
+    if filters is None:
+        return {}
+
+    return {
+        col : [vals] if isinstance(vals, str) else list(vals)
+        for col, vals in filters.items()
+        if vals is not None
+    }
+
+def _decode_dictionaries(table):
+
+    # categorical (dictionary) columns are returned as plain strings
+
+    import pyarrow as pa
+
+    schema = pa.schema(
+        [pa.field(f.name, f.type.value_type) if pa.types.is_dictionary(f.type) else f for f in table.schema],
+        metadata = table.schema.metadata
+    )
+
+    return table.cast(schema)
+
+def _typed_frame(df):
+
+    import pandas as pd
+
+    df = df.drop(columns = [col for col in df.columns if str(col).startswith("Unnamed:")])
+
+    if "value" in df.columns:
+        df["value"] = pd.to_numeric(df["value"], errors = "coerce").astype("float64")
+    if "period" in df.columns:
+        df["period"] = pd.to_datetime(df["period"], errors = "coerce")
+
+    return df
+
+def _normalize_period(period):
+
+    import pandas as pd
+
+    if period is None:
+        return None, None
+
+    if isinstance(period, (str, pd.Timestamp)) or not hasattr(period, "__len__"):
+        period = (period, None)
+
+    start, end = period
+
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+
+    return start, end
+
+def _apply_period(df, start, end):
+
+    if start is not None:
+        df = df.loc[df["period"] >= start, :]
+    if end is not None:
+        df = df.loc[df["period"] <= end, :]
+
+    return df
+
+def _stream_csv(source_path, filters):
+
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    import pyarrow.compute as pc
+
+    # take column names from pandas so the index column keeps its 'Unnamed: 0' name
+
+    column_names = pd.read_csv(source_path, nrows = 0).columns.to_list()
+
+    reader = pv.open_csv(
+        source_path,
+        read_options = pv.ReadOptions(column_names = column_names, skip_rows = 1, block_size = STREAM_BLOCK_SIZE),
+        parse_options = pv.ParseOptions(newlines_in_values = True),
+        convert_options = pv.ConvertOptions(
+            column_types = {col : pa.string() for col in column_names},
+            null_values = CSV_NA_VALUES,
+            strings_can_be_null = True
+        )
+    )
+
+    value_sets = {col : pa.array(vals, type = pa.string()) for col, vals in filters.items()}
+
+    batches = []
+    for batch in reader:
+        mask = None
+        for col, value_set in value_sets.items():
+            col_mask = pc.is_in(batch.column(col), value_set = value_set)
+            mask = col_mask if mask is None else pc.and_(mask, col_mask)
+        if mask is not None:
+            batch = batch.filter(mask)
+        if batch.num_rows > 0:
+            batches.append(batch)
+
+    table = pa.Table.from_batches(batches, schema = reader.schema)
+
+    return table.to_pandas()
+
+def _row_group_bounds(df, partition_cols):
+
+    import numpy as np
+
+    if len(df) == 0 or len(partition_cols) == 0:
+        return [(0, len(df))]
+
+    group_ids = df.groupby(partition_cols, sort = False, dropna = False, observed = True).ngroup().to_numpy()
+    starts = np.r_[0, np.flatnonzero(np.diff(group_ids)) + 1]
+    stops = np.r_[starts[1:], len(df)]
+
+    # coalesce consecutive partitions into row groups of at least MIN_ROW_GROUP_SIZE rows
+
+    bounds = []
+    current_start = 0
+    for start, stop in zip(starts, stops):
+        if stop - current_start >= MIN_ROW_GROUP_SIZE:
+            bounds.append((current_start, stop))
+            current_start = stop
+    if current_start < len(df):
+        bounds.append((current_start, len(df)))
+
+    return bounds
+
+def _compact_frame(df):
+
+    # float64 values, datetime periods, every other column as categorical strings
+
+    import pandas as pd
+
+    df = _typed_frame(df)
+
+    for col in df.columns:
+        if col in ("value", "period") or not (pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])):
+            continue
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str)).astype("category")
+
+    return df
+
+def _write_parquet(df, target_path, partition_cols):
+
+    import os
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from pysfo.pulldata.cache import atomic_path
+
+    if len(partition_cols) > 0:
+        df = df.sort_values(by = partition_cols, kind = "stable").reset_index(drop = True)
+
+    table = pa.Table.from_pandas(df, preserve_index = False)
+
+    tmp = atomic_path(target_path)
+    with pq.ParquetWriter(tmp, table.schema, compression = "zstd") as writer:
+        for start, stop in _row_group_bounds(df, partition_cols):
+            writer.write_table(table.slice(start, stop - start))
+    os.replace(tmp, target_path)
+
+def _read_parquet(path, filters, columns, start, end):
+
+    import pyarrow.parquet as pq
+
+    pq_filters = [(col, "in", vals) for col, vals in filters.items()]
+    if start is not None:
+        pq_filters.append(("period", ">=", start))
+    if end is not None:
+        pq_filters.append(("period", "<=", end))
+
+    table = pq.read_table(path, columns = columns, filters = pq_filters or None)
+
+    return _decode_dictionaries(table).to_pandas()
+
+def _build_subdata_cache(source_path, cache_file, partition_cols):
+
+    import pandas as pd
+
+    df = pd.read_csv(source_path, dtype = str)
+    df = _typed_frame(df)
+
+    _write_parquet(df, cache_file, partition_cols)
+
+#%%========== data writer ==========%%#
+
+def subdata_file(base_dir, name):
+    """
+    Path of the stored subdata `name` in `base_dir`: the `.parquet` file written by the
+    downloaders if it exists, the legacy `.csv` file otherwise.
+    """
+
+    from pathlib import Path
+
+    parquet_path = Path(base_dir) / f"{name}.parquet"
+
+    return parquet_path if parquet_path.exists() else Path(base_dir) / f"{name}.csv"
+
+def write_subdata(df, target_path, partition_cols = None):
+    """
+    Write downloaded dbnomics data to a compact, typed Parquet file.
+
+    Dimension and label columns are stored as categoricals, `value` as float64 and
+    `period` as datetime, with zstd compression. Rows are sorted by `partition_cols`
+    and split in row groups along them, so `read_subdata` filters skip whole row groups.
+    """
+
+    partition_cols = [] if partition_cols is None else list(partition_cols)
+
+    _write_parquet(_compact_frame(df.reset_index(drop = True)), target_path, partition_cols)
+
+#%%========== data reader ==========%%#
+
+def read_subdata(
+    source_path,
+    filters = None,
+    partition_cols = None,
+    use_cache = True,
+    silent = False,
+    period = None,
+    columns = None
+):
+    """
+    Read a subdata file downloaded from dbnomics, keeping only rows that match `filters`.
+
+    Filters are applied while reading, so memory scales with the selected rows rather
+    than with the file.
+
+    Parameters
+    ----------
+    source_path : str | Path
+        Path to the `<subdata>.parquet` file written by the downloaders (read directly),
+        or to a legacy raw `<subdata>.csv` file (see `subdata_file`).
+    filters : dict, optional
+        Mapping {raw column name : value or list of values} of rows to keep.
+    partition_cols : list, optional
+        Raw columns used to sort and split the cache in row groups. Defaults to
+        the columns in `filters`.
+    use_cache : bool, default True
+        If True, read from (and build if needed) the Parquet cache of `source_path`.
+        The cache is rebuilt whenever the source file mtime or size changes.
+        If False, stream the CSV in blocks and keep only the matching rows.
+    silent : bool, default False
+        If True, do not print cache building messages.
+    period : tuple, optional
+        (start, end) date range of `period` to keep. Either bound can be None. A single
+        date is taken as the start of the range.
+    columns : list, optional
+        Columns to read. Defaults to all columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        Raw columns as strings, with `value` as float64 and `period` as datetime.
+    """
+
+    from pathlib import Path
+    from pysfo.pulldata.cache import cache_dir, source_signature, is_fresh, write_manifest
+
+    source_path = Path(source_path)
+    filters = _normalize_filters(filters)
+    partition_cols = list(filters.keys()) if partition_cols is None else list(partition_cols)
+    start, end = _normalize_period(period)
+
+    if source_path.suffix == ".parquet":
+        return _read_parquet(source_path, filters, columns, start, end)
+
+    if not use_cache:
+        df = _stream_csv(source_path, filters)
+        df = _apply_period(_typed_frame(df), start, end)
+        df = df if columns is None else df[list(columns)]
+        return df.reset_index(drop = True)
+
+    signature = source_signature(source_path)
+    cache_file = cache_dir(source_path.parent) / f"{source_path.stem}.parquet"
+
+    if not is_fresh(cache_file, signature, partition_cols = partition_cols):
+        if not silent:
+            print(f"Building parquet cache for '{source_path.name}'. This is only done once per file version.")
+        _build_subdata_cache(source_path, cache_file, partition_cols)
+        write_manifest(cache_file, signature, partition_cols = partition_cols)
+
+    return _read_parquet(cache_file, filters, columns, start, end)
+
+__all__ = [
+    "subdata_file",
+    "write_subdata",
+    "read_subdata"
+]
@@ -43,227 +43,340 @@ efa_tables = {
 
 }
 
-#%%========== EFARow class retriever ==========%%#
+#%%========== module parameters ==========%%#
 
-import textwrap
+EFA_LEVELS = ["agg", "regions", "disagg"]
 
-class EFARow:
-    @staticmethod
-    def about():
+# manual ISO3 fixes of the country names country_converter does not resolve
+ISO3_OVERRIDES = {
+    "Eurozone": "EMU",
+    "Non-Eurozone": "NOT_EMU",
+    "French West Indies": "MTQ",
+    "Netherlands Antilles": "ANT",
+}
 
-        return textwrap.dedent("""\
-            Enhanced Financial Accounts of the USA (Rest of the World). Provide monthly,
-            country-level detail on international portfolio investment holdings of long-term
-            securities, complementing the aggregated quarterly data in table L.133 (“Rest of 
-            the World”) of the main Financial Accounts."""
-        )
+# process-wide memo of the typed store: {efa_row dir : (signature, store, countries)}
+_EFA_CACHE = {}
 
-    @staticmethod
-    def print_instructions():
+# process-wide memo of the zone labels: {efa_row dir : (signature, zone_labels)}
+_ZONE_LABELS_CACHE = {}
 
-        from .config import get_data_path
+#%%========== helper functions ==========%%#
 
-        efa_row_dir = get_data_path() / "efa_row"
+def _efa_files(efa_row_dir):
 
-        return textwrap.dedent(f"""\
-            To use this dataset, download the EFA Rest of the World data from the FRB. You should manually download each of the following individual tables:
-                        
-            international-portfolio-investment-table1-historical.csv
-            international-portfolio-investment-table1a-historical.csv
-            international-portfolio-investment-table1b-historical.csv
-            international-portfolio-investment-table1c-historical.csv
-            international-portfolio-investment-table1d-historical.csv
-            international-portfolio-investment-table1e-historical.csv
-            international-portfolio-investment-table2-historical.csv
-            international-portfolio-investment-table2a-historical.csv
-            international-portfolio-investment-table2b-historical.csv
-                        
-            And store them in the following directory:
-                        
-            "{efa_row_dir}"
+    import os
 
-        """) 
+    # Check if the directory exists
+    if not os.path.exists(efa_row_dir):
+        raise FileNotFoundError(f"The required path '{efa_row_dir}' does not exist. Please check the instructions for downloading the data.'")
 
-    def get(level = "agg"):
+    # List all required CSV file paths
+    required_files = [
+        efa_row_dir / f"international-portfolio-investment-{tab}-historical.csv"
+        for tab in efa_tables.keys()
+    ]
 
-        from .config import get_data_path
-        import pandas as pd
-        import country_converter as coco
-        import warnings
-        import os
-        import numpy as np
-        
-        cc = coco.CountryConverter()
+    # Check for missing files
+    missing_files = [str(file) for file in required_files if not os.path.exists(file)]
 
-        if level not in ["agg", "regions", "disagg"]:
-            raise ValueError("level must be one of 'agg', 'regions', 'disagg'")
+    if missing_files:
+        raise FileNotFoundError(f"The following required files are missing in '{efa_row_dir}': {', '.join(missing_files)}")
 
-        # Define the file path
-        efa_row_dir = get_data_path() / "efa_row"
-    
-        # Check if the file exists
-        if not os.path.exists(efa_row_dir):
-            raise FileNotFoundError(f"The required path '{efa_row_dir}' does not exist. Please check the instructions for downloading the data.'")
-        
-        # List all required CSV file paths
-        required_files = [
-            efa_row_dir / f"international-portfolio-investment-{tab}-historical.csv"
-            for tab in efa_tables.keys()
-        ]
+    return required_files
+
+def _resolve_efa_countries(countries):
+
+    # one row per unique "region; country; country" string of the table headers, with
+    # its region and ISO3 code
+
+    import numpy as np
+    import pandas as pd
+    from .country_ids import resolve_country_ids
+
+    df = pd.DataFrame({"country" : pd.Series(countries, dtype = object)})
+
+    parts = df["country"].str.split(";", expand = True).reindex(columns = range(3))
+    parts = parts.apply(lambda x : x.str.strip())
+
+    df["region"] = parts[0]
+
+    iso3_2 = resolve_country_ids(parts[1], to = "ISO3", overrides = {"ISO3" : ISO3_OVERRIDES}, silent = True)
+    iso3_3 = resolve_country_ids(parts[2], to = "ISO3", silent = True)
+
+    # prefer the ISO3 of the last name, unless it is not found
+
+    cty_iso3 = np.where((iso3_2 == iso3_3) | (iso3_3 == "not found"), iso3_2, iso3_3)
+    cty_iso3 = np.where(df["region"] == "International/Regional Organizations", "INT_ORG", cty_iso3)
+    cty_iso3 = np.where(df["region"] == "Country Unknown", "UNKNOWN", cty_iso3)
+    df["cty_iso3"] = np.where(cty_iso3 == "not found", "", cty_iso3)
+
+    return df.set_index("country")
+
+def _read_efa_table(file_path, tab):
+
+    import numpy as np
+    import pandas as pd
+
+    df = pd.read_csv(file_path, dtype = str)
+
+    dates = pd.to_datetime(df.iloc[:, 0], errors = "coerce").dt.to_period("M").array
+    values = df.iloc[:, 1:].apply(lambda x : pd.to_numeric(x, errors = "coerce")).to_numpy(dtype = "float64")
+    countries = df.columns[1:].to_numpy(dtype = object)
+
+    # long layout of DataFrame.melt: all months of the first country, then the next one
+
+    n_dates, n_countries = values.shape
+
+    return pd.DataFrame({
+        "monthly" : np.tile(dates, n_countries),
+        "country" : np.repeat(countries, n_dates),
+        "series_key" : efa_tables[tab]["short"],
+        "series_name" : efa_tables[tab]["long"],
+        "value" : values.ravel(order = "F") * 1e9
+    })
+
+def _build_efa_store(files):
+
+    import pandas as pd
+
+    store = pd.concat(
+        [_read_efa_table(file, tab) for file, tab in zip(files, efa_tables.keys())],
+        ignore_index = True
+    )
 
-        # Check for missing files
-        missing_files = [file for file in required_files if not os.path.exists(file)]
+    for col in ["country", "series_key", "series_name"]:
+        store[col] = store[col].astype("category")
 
-        if missing_files:
-            raise FileNotFoundError(f"The following required files are missing in '{efa_row_dir}': {', '.join(missing_files)}")
+    # country strings are resolved once per unique value, not per row
 
+    countries = _resolve_efa_countries(store["country"].cat.categories)
 
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
+    return store, countries
 
-            all_data = []
+def _load_efa_store(efa_row_dir, use_cache):
 
-            for tab, seriesname in efa_tables.items():
+    import os
+    import pandas as pd
+    from .cache import cache_dir, source_signature, is_fresh, write_manifest, atomic_path
 
-                df = pd.read_csv(f"{efa_row_dir}/international-portfolio-investment-{tab}-historical.csv", dtype = str)
-                df.iloc[:,1:] = df.iloc[:,1:].apply(lambda x : pd.to_numeric(x, errors = "coerce"))
+    files = _efa_files(efa_row_dir)
+    signature = source_signature(files)
 
-                df.iloc[:, 0] = pd.to_datetime(df.iloc[:, 0], errors="coerce")
+    key = os.path.abspath(efa_row_dir)
+    cached = _EFA_CACHE.get(key)
+    if use_cache and cached is not None and cached[0] == signature:
+        return cached[1], cached[2]
 
-                df_long = df.melt(id_vars=[df.columns[0]], 
-                                var_name="country", 
-                                value_name="value")
-                
-                df.columns = df.columns.str.lower()
+    cache_file = cache_dir(efa_row_dir) / "efa_row.parquet"
+    countries_file = cache_dir(efa_row_dir) / "efa_row_countries.parquet"
 
-                df_long["series_key"] = seriesname["short"]
-                df_long["series_name"] = seriesname["long"]
-                
-                all_data.append(df_long)
+    if use_cache and is_fresh(cache_file, signature) and is_fresh(countries_file, signature):
+        store = pd.read_parquet(cache_file)
+        countries = pd.read_parquet(countries_file)
+    else:
+        store, countries = _build_efa_store(files)
+        for df, target in [(store, cache_file), (countries, countries_file)]:
+            tmp = atomic_path(target)
+            df.to_parquet(tmp, compression = "zstd")
+            os.replace(tmp, target)
+            write_manifest(target, signature)
 
-            df_all = pd.concat(all_data, ignore_index=True)
-            df_all.columns = df_all.columns.str.lower()
+    _EFA_CACHE[key] = (signature, store, countries)
 
-            # get country ISO3 codes
+    return store, countries
 
-            df_all[["country_1", "country_2", "country_3"]] = df_all["country"].str.split(";", expand = True)
-            df_all[["country_1", "country_2", "country_3"]] = df_all[["country_1", "country_2", "country_3"]].apply(lambda x : x.str.strip())
+def _efa_labels(countries, level):
 
-            df_all = df_all.rename(columns = {"country_1" : "region"})
+    # selection and country/region labels of `level`, one entry per unique country string
 
-            df_all["cty_iso3_2"] = cc.pandas_convert(series = df_all["country_2"], to='ISO3')  
-            df_all["cty_iso3_3"] = cc.pandas_convert(series = df_all["country_3"], to='ISO3')  
+    import numpy as np
 
-            rename_map = {
-                "Eurozone": "EMU",
-                "Non-Eurozone": "NOT_EMU",
-                "French West Indies": "MTQ",
-                "Netherlands Antilles": "ANT",
-            }
+    names = countries.index.to_series()
+    label = names.to_numpy(dtype = object)
+    region = countries["region"].to_numpy(dtype = object)
+    cty_iso3 = countries["cty_iso3"].to_numpy(dtype = object)
 
-            for old, new in rename_map.items():
-                df_all["cty_iso3_2"] = np.where(df_all["country_2"] == old, new, df_all["cty_iso3_2"])
+    if level == "agg":
+        keep = names.str.contains("Worldwide").to_numpy()
 
-            # check mistakes
+    if level == "regions":
+        keep = (cty_iso3 == "") | (cty_iso3 == "INT_ORG")
 
-            check = df_all["cty_iso3_2"] != df_all["cty_iso3_3"]
-            df_all.loc[check, ["cty_iso3_3", "cty_iso3_2"]].sort_values(by = ["cty_iso3_3", "cty_iso3_2"]).drop_duplicates()
+    if level == "disagg":
+        keep = cty_iso3 != ""
+        label = np.where(keep, names.str.split(";").str[1].str.strip(), label)
+        label = np.where(cty_iso3 == "UNKNOWN", "Unknown", label)
+        region = np.where(cty_iso3 == "UNKNOWN", "Unknown", region)
 
-            df_all["cty_iso3"] = ""
+    if level in ["regions", "disagg"]:
+        label = np.where(cty_iso3 == "INT_ORG", "Int. Org.", label)
+        region = np.where(cty_iso3 == "INT_ORG", "Int. Org.", region)
 
-            mask = (df_all["cty_iso3_2"] == df_all["cty_iso3_3"])
-            df_all["cty_iso3"] = np.where(mask, df_all["cty_iso3_2"], df_all["cty_iso3"])
+    return keep, label, region, cty_iso3
 
-            mask = check & (df_all["cty_iso3_3"] == "not found")
-            df_all["cty_iso3"] = np.where(mask, df_all["cty_iso3_2"], df_all["cty_iso3"])
+def _efa_view(store, countries, level):
 
-            mask = check & (df_all["cty_iso3_3"] != "not found")
-            df_all["cty_iso3"] = np.where(mask, df_all["cty_iso3_3"], df_all["cty_iso3"])
+    # rows of `level`: selection and labels are computed on the unique countries and
+    # mapped to rows through the categorical codes
 
-            mask = (df_all["region"] == "International/Regional Organizations")
-            df_all["cty_iso3"] = np.where(mask, "INT_ORG", df_all["cty_iso3"])
+    import numpy as np
+    import pandas as pd
 
-            mask = (df_all["region"] == "Country Unknown")
-            df_all["cty_iso3"] = np.where(mask, "UNKNOWN", df_all["cty_iso3"])
+    keep, label, region, cty_iso3 = _efa_labels(countries.reindex(store["country"].cat.categories), level)
 
-            df_all["cty_iso3"] = np.where(df_all["cty_iso3"] == "not found", "", df_all["cty_iso3"])
+    codes = store["country"].cat.codes.to_numpy()
+    rows = np.flatnonzero(keep[codes])
+    codes = codes[rows]
 
-            # Leave this as future check.
-            # df_all[["country", "region", "cty_iso3"]].drop_duplicates().sort_values(by = ["cty_iso3"]).to_csv(f"{temp}/check.csv")
+    return pd.DataFrame({
+        "monthly" : store["monthly"].array.take(rows),
+        "country" : label[codes],
+        "region" : region[codes],
+        "cty_iso3" : cty_iso3[codes],
+        "series_key" : store["series_key"].to_numpy(dtype = object)[rows],
+        "series_name" : store["series_name"].to_numpy(dtype = object)[rows],
+        "value" : store["value"].to_numpy()[rows]
+    }, index = store.index[rows])
 
-            df_all = df_all[["date", "country", "region", "cty_iso3", "series_key", "series_name", "value"]]
+def _build_zone_labels(store, countries):
 
-            # set final formats
+    # {cty_iso3 : {"label", "region"}} of the disaggregated level, in order of first
+    # appearance in the data (the last country string of an ISO3 sets its labels)
 
-            df_all = df_all.rename(columns = {"value" : "value_bn"})
-            df_all["value_bn"] = pd.to_numeric(df_all["value_bn"])
-            df_all["value"] = df_all["value_bn"] * 1e9
-            df_all.drop(columns = "value_bn", inplace = True)
+    import pandas as pd
 
-            df_all["monthly"] = df_all["date"].dt.to_period("M")
-            df_all = df_all[["monthly"] + list(df_all.drop(columns = ["date", "monthly"]).columns)] 
+    categories = store["country"].cat.categories
+    keep, label, region, cty_iso3 = _efa_labels(countries.reindex(categories), "disagg")
 
-            # return data
+    zone_labels = {}
+    for code in pd.unique(store["country"].cat.codes.to_numpy()):
+        if keep[code]:
+            zone_labels[cty_iso3[code]] = {"label" : label[code], "region" : region[code]}
 
-            if level == "agg":
+    return zone_labels
 
-                mask = df_all["country"].str.contains("Worldwide")
-                df_all = df_all.loc[mask, :]
-                return df_all
-            
-            if level == "regions":
-                
-                mask = (df_all["cty_iso3"] == "") | (df_all["cty_iso3"] == "INT_ORG")
-                df_all = df_all[mask]
+def _load_zone_labels(efa_row_dir):
 
-                mask = (df_all["cty_iso3"] == "INT_ORG")
-                df_all["country"] = np.where(mask, "Int. Org.",df_all["country"])
-                df_all["region"] = np.where(mask, "Int. Org.",df_all["region"])
+    # zone labels are materialized next to the EFA store and memoized per process
 
-                return df_all
-            
-            if level == "disagg":
+    import os
+    import json
+    from .cache import cache_dir, source_signature, is_fresh, write_manifest, atomic_path
 
-                mask = (df_all["cty_iso3"] != "")
-                df_all = df_all[mask]
-                df_all["country"] = df_all["country"].str.split(";").str[1].str.strip()
+    files = _efa_files(efa_row_dir)
+    signature = source_signature(files)
 
-                mask = (df_all["cty_iso3"] == "UNKNOWN") 
-                df_all["country"] = np.where(mask, "Unknown",df_all["country"])
-                df_all["region"] = np.where(mask, "Unknown",df_all["region"])
+    key = os.path.abspath(efa_row_dir)
+    cached = _ZONE_LABELS_CACHE.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
 
-                mask = (df_all["cty_iso3"] == "INT_ORG")
-                df_all["country"] = np.where(mask, "Int. Org.",df_all["country"])
-                df_all["region"] = np.where(mask, "Int. Org.",df_all["region"])
+    labels_file = cache_dir(efa_row_dir) / "efa_row_zone_labels.json"
 
-                return df_all
-    
+    if is_fresh(labels_file, signature):
+        with open(labels_file, "r", encoding = "utf-8") as f:
+            zone_labels = json.load(f)
+    else:
+        store, countries = _load_efa_store(efa_row_dir, use_cache = True)
+        zone_labels = _build_zone_labels(store, countries)
+        tmp = atomic_path(labels_file)
+        with open(tmp, "w", encoding = "utf-8") as f:
+            json.dump(zone_labels, f, indent = 2)
+        os.replace(tmp, labels_file)
+        write_manifest(labels_file, signature)
+
+    _ZONE_LABELS_CACHE[key] = (signature, zone_labels)
+
+    return zone_labels
+
+#%%========== EFARow class retriever ==========%%#
+
+import textwrap
+
+class EFARow:
+    @staticmethod
+    def about():
+
+        return textwrap.dedent("""\
+            Enhanced Financial Accounts of the USA (Rest of the World). Provide monthly,
+            country-level detail on international portfolio investment holdings of long-term
+            securities, complementing the aggregated quarterly data in table L.133 (“Rest of 
+            the World”) of the main Financial Accounts."""
+        )
+
+    @staticmethod
+    def print_instructions():
+
+        from .config import get_data_path
+
+        efa_row_dir = get_data_path() / "efa_row"
+
+        return textwrap.dedent(f"""\
+            To use this dataset, download the EFA Rest of the World data from the FRB. You should manually download each of the following individual tables:
+                        
+            international-portfolio-investment-table1-historical.csv
+            international-portfolio-investment-table1a-historical.csv
+            international-portfolio-investment-table1b-historical.csv
+            international-portfolio-investment-table1c-historical.csv
+            international-portfolio-investment-table1d-historical.csv
+            international-portfolio-investment-table1e-historical.csv
+            international-portfolio-investment-table2-historical.csv
+            international-portfolio-investment-table2a-historical.csv
+            international-portfolio-investment-table2b-historical.csv
+                        
+            And store them in the following directory:
+                        
+            "{efa_row_dir}"
+
+        """) 
+
+    @staticmethod
+    def get(level = "agg", use_cache = True):
+        """
+        EFA Rest of the World holdings in long format, one row per (month, country, table).
+
+        All tables are parsed once into a typed store (cached as parquet in the `_cache`
+        directory until any CSV changes, and memoized per process); each level is a view
+        over that store.
+
+        Parameters
+        ----------
+        level : str, default "agg"
+            "agg" (worldwide totals), "regions" (regional aggregates and international
+            organizations) or "disagg" (individual countries).
+        use_cache : bool, default True
+            If False, rebuild the store from the CSV files.
+        """
+
+        from .config import get_data_path
+
+        if level not in EFA_LEVELS:
+            raise ValueError("level must be one of 'agg', 'regions', 'disagg'")
+
+        efa_row_dir = get_data_path() / "efa_row"
+
+        store, countries = _load_efa_store(efa_row_dir, use_cache)
+
+        return _efa_view(store, countries, level)
 
     @staticmethod
     def efa_zone_labels(level = "disagg"):
+        """
+        Labels of the disaggregated zones: {cty_iso3 : {"label" : country, "region" : region}}.
 
-        import io
-        from contextlib import redirect_stdout
-        import warnings
+        The table is built once from the EFA store, saved next to its cache and memoized,
+        so repeated calls only check the CSV signatures and copy a small dict.
+        """
 
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
+        from .config import get_data_path
 
-            if level in ["regions", "agg"]:
-                return "Column 'region' already has its values as labels."
+        if level not in ["agg", "regions", "disagg"]:
+            raise ValueError("level must be one of 'agg', 'regions', 'disagg'")
 
-            f = io.StringIO()
-            with redirect_stdout(f):
-                efa = EFARow.get(level)
-        
-            efa = efa[["cty_iso3", "country", "region"]].drop_duplicates()
+        if level in ["regions", "agg"]:
+            return "Column 'region' already has its values as labels."
 
-            zone_labels = {
-                row["cty_iso3"] : {
-                    "label"  : row["country"],
-                    "region" : row["region"]
-                }
-                for _, row in efa.iterrows()
-            }
+        zone_labels = _load_zone_labels(get_data_path() / "efa_row")
 
-            return zone_labels  
+        return {cty : dict(labels) for cty, labels in zone_labels.items()}
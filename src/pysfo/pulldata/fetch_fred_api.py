@@ -1,3 +1,132 @@
+#%%========== module parameters ==========%%#
+
+# FRED API limit: 120 requests per minute per API key
+FRED_REQUESTS_PER_MINUTE = 120
+DEFAULT_WORKERS = 8
+DEFAULT_RETRIES = 3
+BACKOFF_SECONDS = 2
+
+# bytes read from the end of a stored file to find its last date
+TAIL_BYTES = 4096
+
+#%%========== helper functions ==========%%#
+
+class _RateLimiter:
+    """Thread-safe limiter spacing request starts at `requests_per_minute`."""
+
+    def __init__(self, requests_per_minute):
+
+        import threading
+
+        self.interval = 60 / requests_per_minute if requests_per_minute else 0
+        self.next_slot = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+
+        import time
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+def _http_status(error):
+
+    # HTTP status of an error or of the error it was raised from: fredapi re-raises
+    # urllib HTTPErrors as ValueError(<API message>)
+
+    import urllib.error
+
+    while error is not None:
+        if isinstance(error, urllib.error.HTTPError):
+            return error.code
+        error = error.__cause__ or error.__context__
+
+    return None
+
+def _is_retryable(error):
+
+    # rate limit (429) and server error (5xx) responses, and connection errors; other
+    # HTTP errors (e.g. 400 for bad series ids) are not retried
+
+    status = _http_status(error)
+
+    if status is not None:
+        return status == 429 or status >= 500
+
+    return isinstance(error, OSError)
+
+def _last_stored_date(file_path):
+
+    # last date of a stored <series>.csv, read from the end of the file
+
+    import os
+    import pandas as pd
+
+    if not os.path.exists(file_path):
+        return None
+
+    with open(file_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - TAIL_BYTES))
+        lines = f.read().decode("utf-8").strip().splitlines()
+
+    if len(lines) == 0:
+        return None
+
+    last_date = pd.to_datetime(lines[-1].split(",")[0], errors = "coerce")
+
+    return None if pd.isna(last_date) else last_date
+
+def _fetch_one(client, series, save_dir, full, limiter, retries):
+
+    import os
+    import time
+    import pandas as pd
+
+    file_path = os.path.join(save_dir, f"{series}.csv")
+    last_date = None if full else _last_stored_date(file_path)
+
+    kwargs = {} if last_date is None else {"observation_start" : (last_date + pd.Timedelta(days = 1)).strftime("%Y-%m-%d")}
+
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            data = client.get_series(series, **kwargs)
+            break
+        except Exception as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            time.sleep(BACKOFF_SECONDS * 2 ** attempt)
+
+    data = pd.Series(data, dtype = "float64")
+    data = pd.DataFrame({"date" : pd.to_datetime(data.index), series : data.to_numpy()})
+
+    if last_date is not None:
+        data = data[data["date"] > last_date]
+
+    if last_date is None:
+        status = "created"
+        data.to_csv(file_path, index = False, date_format = "%Y-%m-%d")
+    elif len(data) > 0:
+        status = "appended"
+        data.to_csv(file_path, mode = "a", header = False, index = False, date_format = "%Y-%m-%d")
+    else:
+        status = "up to date"
+
+    return {
+        "series" : series,
+        "status" : status,
+        "n_new" : len(data),
+        "last_date" : data["date"].max() if len(data) > 0 else last_date
+    }
+
+#%%========== main functions ==========%%#
+
 def get_client():
 
     from fredapi import Fred
@@ -8,16 +137,71 @@ def get_client():
         raise EnvironmentError("FRED_API_KEY environment variable is not set. Please set it before using FRED API features.")
     return Fred(api_key = api_key)
 
-def fetch_fred_series_list(series_list: list, save_dir: str):
-    
+def fetch_fred_series_list(series_list: list, save_dir: str, client = None, full = False, max_workers = DEFAULT_WORKERS, requests_per_minute = FRED_REQUESTS_PER_MINUTE, retries = DEFAULT_RETRIES, silent = False):
+    """
+    Download FRED series to `save_dir/<series>.csv`, only fetching what is not stored yet.
+
+    Series without a stored file are downloaded in full. For the others, only the
+    observations after their last stored date are requested (`observation_start`) and
+    appended to the file. Requests run concurrently in a thread pool, spaced to respect
+    the FRED API rate limit.
+
+    Parameters
+    ----------
+    series_list : str | list
+        FRED series ids.
+    save_dir : str
+        Directory of the <series>.csv files (columns date, <series>).
+    client : object, optional
+        Client with a fredapi-like `get_series(series_id, observation_start = None)`
+        returning a Series indexed by date. Defaults to `get_client()`.
+    full : bool, default False
+        If True, re-download the full history and overwrite the files.
+    max_workers : int, default DEFAULT_WORKERS
+        Number of concurrent requests.
+    requests_per_minute : int, default FRED_REQUESTS_PER_MINUTE
+        Rate limit shared by all workers (None to disable).
+    retries : int, default DEFAULT_RETRIES
+        Retries of a request failing with a rate limit or connection error.
+    silent : bool, default False
+        If True, do not print progress.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per series: status ("created", "appended", "up to date" or "failed"),
+        number of new observations, last stored date and error message.
+    """
+
     import pandas as pd
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    series_list = [series_list] if isinstance(series_list, str) else list(series_list)
+    client = get_client() if client is None else client
+    limiter = _RateLimiter(requests_per_minute)
+
+    results = {}
+
+    with ThreadPoolExecutor(max_workers = max_workers) as pool:
+
+        futures = {
+            pool.submit(_fetch_one, client, series, save_dir, full, limiter, retries) : series
+            for series in dict.fromkeys(series_list)
+        }
+
+        for future in as_completed(futures):
+            series = futures[future]
+            try:
+                results[series] = future.result()
+            except Exception as e:
+                results[series] = {"series" : series, "status" : "failed", "n_new" : 0, "last_date" : None, "error" : str(e)}
+            if not silent:
+                print(f"{series}: {results[series]['status']} ({results[series]['n_new']} new observations)")
 
-    fred = get_client()
+    summary = pd.DataFrame([results[series] for series in dict.fromkeys(series_list)], columns = ["series", "status", "n_new", "last_date", "error"])
 
-    for series in series_list:
+    failed = summary.loc[summary["status"] == "failed", "series"].tolist()
+    if failed and not silent:
+        print(f"-> Failed series: {', '.join(failed)}")
 
-        print(series)
-        data = fred.get_series(series)
-        data = pd.DataFrame(data).reset_index()
-        data.columns = ["date", series]
-        data.to_csv(f'{save_dir}/{series}.csv', index = False)
+    return summary
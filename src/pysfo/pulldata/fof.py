@@ -56,6 +56,290 @@ def fof_upload_dict():
 
     return upload_dict
 
+#%%========== module parameters ==========%%#
+
+# columns of the data_dictionary/<table>.txt files
+DATA_DICTIONARY_COLUMNS = ["series", "description", "line", "table_name", "unitnotes"]
+
+# scale of the values, read from the unit notes (series in other units are not scaled)
+UNIT_FACTORS = {"millions" : 1e6, "billions" : 1e9, "trillions" : 1e12}
+
+# frequency suffix of the series names -> pandas frequency
+SERIES_FREQUENCIES = {"D" : "D", "W" : "W", "M" : "M", "Q" : "Q", "A" : "Y"}
+
+FREQ_ORDER = ["D", "W", "M", "Q", "Y"]
+
+# process-wide memo of the series catalog: {fred_flowoffunds dir : (signature, catalog, search text)}
+_FOF_CATALOG_CACHE = {}
+
+# process-wide memo of the parsed date columns: {(table csv, frequency) : (signature, periods)}
+_FOF_DATES_CACHE = {}
+
+# catalog columns stored as categoricals
+CATALOG_CATEGORIES = ["frequency", "table", "table_name", "unitnotes"]
+
+#%%========== helper functions ==========%%#
+
+def _fof_dir():
+
+    from .config import get_data_path
+
+    return get_data_path() / "fred_flowoffunds"
+
+def _data_dictionary_files(fred_flowoffunds_dir):
+
+    import os
+
+    datadict_dir = fred_flowoffunds_dir / "data_dictionary"
+
+    if not os.path.exists(datadict_dir):
+        raise FileNotFoundError(f"The required path '{datadict_dir}' does not exist. Please check the instructions for downloading the data.")
+
+    return sorted(datadict_dir.glob("*.txt"))
+
+def _read_data_dictionary(path):
+
+    import numpy as np
+    import pandas as pd
+
+    datadict = pd.read_table(path, header = None, names = DATA_DICTIONARY_COLUMNS, dtype = str)
+    datadict = datadict.dropna(subset = ["series"]).drop_duplicates(subset = ["series"])
+
+    datadict.insert(1, "table", path.stem)
+
+    series = datadict["series"].str.rsplit(".", n = 1)
+    datadict.insert(1, "code", series.str[0])
+    datadict.insert(2, "frequency", series.str[1].map(SERIES_FREQUENCIES).fillna("Q"))
+
+    # largest scale mentioned in the unit notes wins
+
+    unitnotes = datadict["unitnotes"].str.lower().fillna("")
+    factors = list(UNIT_FACTORS.items())[::-1]
+    datadict["unit_factor"] = np.select([unitnotes.str.contains(desc) for desc, _ in factors], [f for _, f in factors], default = 1.0)
+
+    return datadict
+
+def _build_fof_catalog(files):
+
+    import pandas as pd
+
+    catalog = pd.concat([_read_data_dictionary(file) for file in files], ignore_index = True)
+
+    catalog["line"] = pd.to_numeric(catalog["line"], errors = "coerce").astype("Int32")
+    catalog[CATALOG_CATEGORIES] = catalog[CATALOG_CATEGORIES].astype("category")
+
+    return catalog
+
+def _load_fof_catalog(fred_flowoffunds_dir, use_cache = True):
+
+    # every series of every table, from the data dictionary files. Built once into a
+    # parquet file in the `_cache` directory (until a data dictionary changes) and
+    # memoized per process
+
+    import os
+    import pandas as pd
+    from .cache import cache_dir, source_signature, is_fresh, write_manifest, atomic_path
+
+    files = _data_dictionary_files(fred_flowoffunds_dir)
+    signature = source_signature(files)
+
+    key = os.path.abspath(fred_flowoffunds_dir)
+    cached = _FOF_CATALOG_CACHE.get(key)
+    if use_cache and cached is not None and cached[0] == signature:
+        return cached[1], cached[2]
+
+    cache_file = cache_dir(fred_flowoffunds_dir) / "fof_catalog.parquet"
+
+    if use_cache and is_fresh(cache_file, signature):
+        catalog = pd.read_parquet(cache_file)
+    else:
+        catalog = _build_fof_catalog(files)
+        tmp = atomic_path(cache_file)
+        catalog.to_parquet(tmp, index = False, compression = "zstd")
+        os.replace(tmp, cache_file)
+        write_manifest(cache_file, signature)
+
+    # "code\ndescription" of each row, searched by FoF.search
+
+    search_text = (catalog["series"] + "\n" + catalog["description"].fillna("")).tolist()
+
+    _FOF_CATALOG_CACHE[key] = (signature, catalog, search_text)
+
+    return catalog, search_text
+
+def _resolve_series(catalog, series):
+
+    # catalog rows of the requested series (full names, or codes without the frequency
+    # suffix, quarterly first). Series found in several tables are read from the table
+    # that serves the most requested series, so each file is opened as few times as possible
+
+    import pandas as pd
+
+    requested = pd.unique(pd.Series(series, dtype = object))
+
+    catalog = catalog.astype({col : object for col in ["frequency", "table"]})
+
+    by_series = catalog[catalog["series"].isin(requested)]
+    codes = [s for s in requested if s not in set(by_series["series"])]
+
+    by_code = catalog[catalog["code"].isin(codes)]
+    rank = by_code["frequency"].map({f : i for i, f in enumerate(FREQ_ORDER)}).where(by_code["frequency"] != "Q", -1)
+    first = by_code.iloc[rank.to_numpy().argsort(kind = "stable")].drop_duplicates(subset = ["code"])
+    by_code = by_code[by_code["series"].isin(first["series"])]
+
+    candidates = pd.concat([by_series, by_code], ignore_index = True)
+
+    found = set(candidates["series"]) | set(candidates["code"])
+    not_found = [s for s in requested if s not in found]
+
+    # series in a single table fix the tables to read; series in several tables use one of
+    # those when possible, and the rest are assigned greedily
+
+    n_tables = candidates.groupby("series")["table"].transform("nunique")
+    selected = [candidates[n_tables == 1]]
+    tables = set(selected[0]["table"])
+
+    shared = candidates[n_tables > 1].sort_values("table", kind = "stable")
+    in_selected = shared[shared["table"].isin(tables)].drop_duplicates(subset = ["series"])
+    selected.append(in_selected)
+    pending = shared[~shared["series"].isin(in_selected["series"])]
+
+    while not pending.empty:
+        counts = pending.groupby("table")["series"].nunique()
+        rows = pending[pending["table"] == counts.idxmax()].drop_duplicates(subset = ["series"])
+        selected.append(rows)
+        pending = pending[~pending["series"].isin(rows["series"])]
+
+    resolved = pd.concat(selected, ignore_index = True)
+
+    return resolved, not_found
+
+def _parse_fof_dates(csv_path, dates, frequency):
+
+    # date column ("1945:Q4") of a table as periods, parsed once per table until its file
+    # changes
+
+    import os
+    import pandas as pd
+    from .cache import source_signature
+
+    key = (os.path.abspath(csv_path), frequency)
+    signature = source_signature(csv_path)
+
+    cached = _FOF_DATES_CACHE.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    periods = pd.PeriodIndex(pd.Index(dates).str.replace(":", ""), freq = frequency)
+    _FOF_DATES_CACHE[key] = (signature, periods)
+
+    return periods
+
+def _read_fof_table(csv_path, series, native_frequency, frequency):
+
+    # requested columns of one table, at `frequency`, in long layout (all dates of the
+    # first series, then the next one)
+
+    import numpy as np
+    import pandas as pd
+
+    data = pd.read_csv(csv_path, usecols = ["date"] + list(series), na_values = ["ND"])
+    values = data[list(series)]
+
+    not_numeric = values.columns[values.dtypes == object]
+    if len(not_numeric) > 0:
+        values = values.assign(**{col : pd.to_numeric(values[col], errors = "coerce") for col in not_numeric})
+
+    values.index = _parse_fof_dates(csv_path, data["date"], native_frequency)
+    values = values.sort_index(kind = "stable")
+
+    # last available observation of each period
+
+    if frequency != native_frequency:
+        values = values.groupby(values.index.asfreq(frequency, how = "end")).last()
+
+    n_dates, n_series = values.shape
+
+    return pd.DataFrame({
+        "date" : np.tile(values.index.to_timestamp(how = "end").normalize(), n_series),
+        "series" : np.repeat(values.columns.to_numpy(dtype = object), n_dates),
+        "value" : values.to_numpy(dtype = "float64").ravel(order = "F")
+    })
+
+#%%========== main functions ==========%%#
+
+def load_fof_series(series, frequency = "Q", n_jobs = -1):
+    """
+    Load any list of Z.1 series, reading only their columns, from all the tables they are in.
+
+    Parameters
+    ----------
+    series : str | list
+        Series names (e.g. "FL313161105.Q") or codes without the frequency suffix
+        (e.g. "FL313161105", the quarterly series is used when there are several).
+    frequency : str, default "Q"
+        Output frequency, one of "Q" or "Y" for quarterly series. Periods keep their last
+        available observation.
+    n_jobs : int, default -1
+        Number of threads reading the tables (joblib convention).
+
+    Returns
+    -------
+    pd.DataFrame
+        Long frame (date, series, table, value, description) sorted by series and date,
+        with values scaled by the unit factor of the data dictionary.
+
+    Raises
+    ------
+    ValueError
+        If a series is not in the data dictionaries, or `frequency` is higher than the
+        frequency of a series.
+    """
+
+    import os
+    import pandas as pd
+    from joblib import Parallel, delayed
+
+    fred_flowoffunds_dir = _fof_dir()
+
+    series = [series] if isinstance(series, str) else list(series)
+    catalog, _ = _load_fof_catalog(fred_flowoffunds_dir)
+
+    resolved, not_found = _resolve_series(catalog, series)
+
+    if not_found:
+        raise ValueError(f"Series not found in the Z.1 catalog: {', '.join(not_found)}. Use FoF.search to find series codes.")
+
+    lowest_possible_frequency = FREQ_ORDER[max(FREQ_ORDER.index(f) for f in resolved["frequency"])]
+
+    if FREQ_ORDER.index(frequency) < FREQ_ORDER.index(lowest_possible_frequency):
+        raise ValueError(
+            f"Required frequency '{frequency}' is lower resolution than lowest_possible_frequency '{lowest_possible_frequency}'."
+        )
+
+    tables = resolved.groupby(["table", "frequency"], sort = True)["series"].agg(list)
+
+    for table, _ in tables.index:
+        csv_path = fred_flowoffunds_dir / "csv" / f"{table}.csv"
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"The required file '{csv_path}' is missing.")
+
+    data = Parallel(n_jobs = 1 if len(tables) == 1 else n_jobs, prefer = "threads")(
+        delayed(_read_fof_table)(fred_flowoffunds_dir / "csv" / f"{table}.csv", table_series, native_frequency, frequency)
+        for (table, native_frequency), table_series in tables.items()
+    )
+
+    data = pd.concat(data, ignore_index = True)
+
+    # descriptions and unit factors in one join
+
+    data = data.merge(resolved[["series", "table", "description", "unit_factor"]], on = "series", how = "left", validate = "m:1")
+    data["value"] = data["value"] * data["unit_factor"]
+
+    data = data.sort_values(by = ["series", "date"], kind = "stable", ignore_index = True)
+
+    return data[["date", "series", "table", "value", "description"]]
+
 #%%========== data retriever ==========%%#
 
 class FoF:
@@ -83,121 +367,103 @@ class FoF:
         )
     
     @staticmethod
-    def get(series = None, frequency = "Q"):
+    def catalog(use_cache = True):
+        """
+        Catalog of every series in the Z.1 tables: series, code, frequency, table, line,
+        description, table_name, unitnotes and unit_factor (one row per series and table).
+        """
 
-        import pandas as pd
-        import numpy as np
-        import os
-        from ..basic import dupli_report
-        from .config import get_data_path
-
-        fred_flowoffunds_dir = get_data_path() / "fred_flowoffunds"
-        
-        if series is None:
-            raise ValueError("You must provide a list of series.")
-        
-        series = series if isinstance(series, list) else [series]
-        df_merge = []
-        upload_dict = fof_upload_dict()
-
-        if True not in [s_ in upload_dict.keys() for s_ in series]:
-            out_str = ""
-            for key in upload_dict.keys():
-                out_str += f"{key}\n"
-            raise ValueError(f"No provided series in upload_dict. Currently available series are:\n{out_str}")
-
-        for s in [s for s in series if s not in upload_dict.keys()]:
-            print(f"-> Series '{s}' not found in master download dict. Continuing without this series.")
-
-        upload_dict = {key : val for key, val in upload_dict.items() if key in series}
+        catalog, _ = _load_fof_catalog(_fof_dir(), use_cache = use_cache)
 
-        freq_order = ["D", "W", "M", "Q", "Y"]
-        freq_rank = {f : i for i, f in enumerate(freq_order)}
-
-        freqs = {val["frequency"] for val in upload_dict.values()}
-        lowest_possible_frequency = freq_order[max([freq_rank[freq] for freq in freqs])]
-
-        if freq_rank[frequency] < freq_rank[lowest_possible_frequency]:
-            raise ValueError(
-                f"Required frequency '{frequency}' is lower resolution than lowest_possible_frequency '{lowest_possible_frequency}'."
-            )
-
-        print(f"\n -> Clean series at frequency = {frequency}:")
+        return catalog.copy()
 
-        datatables = set([vals["table"] for vals in upload_dict.values()])
-
-        for table in datatables:
-            
-            # check if necessary files exist
-
-            csv_path = f"{fred_flowoffunds_dir}/csv/{table}.csv"
-            datadict_path = f"{fred_flowoffunds_dir}/data_dictionary/{table}.txt"
-
-            for path in [csv_path, datadict_path]:
-                if not os.path.exists(path):
-                    raise FileNotFoundError(f"The required file '{path}' is missing.")
-
-            # get series
-
-            get_series = {key : vals for key, vals in upload_dict.items() if vals["table"] == table}
+    @staticmethod
+    def search(pattern, regex = False, case = False, table = None):
+        """
+        Search the Z.1 catalog for series whose code or description match `pattern`.
+
+        Parameters
+        ----------
+        pattern : str
+            Substring (or regular expression if `regex`) to look for, e.g. "Treasury".
+        regex : bool, default False
+            If True, `pattern` is a regular expression.
+        case : bool, default False
+            If True, the search is case sensitive.
+        table : str | list, optional
+            Restrict the search to these tables (e.g. "l210").
+
+        Returns
+        -------
+        pd.DataFrame
+            Matching catalog rows.
+        """
+
+        import re
+        import numpy as np
 
-            data = pd.read_csv(f"{fred_flowoffunds_dir}/csv/{table}.csv")
+        catalog, search_text = _load_fof_catalog(_fof_dir())
 
-            get_cols = data.columns[data.columns.str.replace(r".Q$", "", regex = True).isin(get_series.keys())]
-            data = data[["date"] + list(get_cols)]
+        if regex:
+            compiled = re.compile(pattern, flags = 0 if case else re.IGNORECASE)
+            match = lambda text : compiled.search(text) is not None
+        elif case:
+            match = lambda text : pattern in text
+        else:
+            pattern = pattern.casefold()
+            match = lambda text : pattern in text.casefold()
 
-            # process datadict
-            
-            datadict = pd.read_table(f"{fred_flowoffunds_dir}/data_dictionary/{table}.txt", header = None)
-            datadict.columns = ["variable", "description", "line", "table", "unitnotes"]
-            datadict = datadict[["variable", "description", "unitnotes"]]
-            datadict = datadict[datadict["variable"].isin(get_cols)].drop_duplicates()
+        mask = np.fromiter((match(text) for text in search_text), dtype = bool, count = len(search_text))
 
-            datadict["unit_factor"] = np.nan
-            for factor, desc in zip([1e6, 1e9, 1e12], ["millions", "billions", "trillions"]):
-                mask = datadict["unitnotes"].str.contains(desc, case = False, na=False)
-                datadict["unit_factor"] = np.where(mask, factor, datadict["unit_factor"])
+        if table is not None:
+            mask &= catalog["table"].isin([table] if isinstance(table, str) else table).to_numpy()
 
-            datadict = datadict[["variable", "description", "unit_factor"]]
+        return catalog[mask].reset_index(drop = True)
 
-            # process main data
+    @staticmethod
+    def get(series = None, frequency = "Q", n_jobs = -1):
+        """
+        Z.1 series at `frequency`, in long format.
+
+        Parameters
+        ----------
+        series : str | list
+            Any series of the catalog (see FoF.search), with or without the frequency
+            suffix. Series of `fof_upload_dict` get their `variable` name.
+        frequency : str, default "Q"
+            Output frequency ("Q" or "Y").
+        n_jobs : int, default -1
+            Number of threads reading the tables.
+        """
 
-            data["date"] = pd.PeriodIndex(data["date"].str.replace(":", ""), freq = "Q").to_timestamp(how = "end").normalize()
+        import pandas as pd
 
-            data = data.melt(id_vars = "date")
-            data = pd.merge(data, datadict, on = "variable", how = "left", validate = "m:1")
+        if series is None:
+            raise ValueError("You must provide a list of series.")
+        
+        series = series if isinstance(series, list) else [series]
+        upload_dict = fof_upload_dict()
 
-            data["value"] = pd.to_numeric(data["value"], errors = "coerce") * data["unit_factor"]
+        catalog, _ = _load_fof_catalog(_fof_dir())
+        available = set(catalog["series"]) | set(catalog["code"])
 
-            # fix frequency
+        if True not in [s_ in available for s_ in series]:
+            raise ValueError("None of the provided series are in the Z.1 catalog. Use FoF.search to find series codes.")
 
-            data = data.sort_values(by = "date", ascending = True)
-            data["date"] = data["date"].dt.to_period(frequency).dt.to_timestamp(how = "end").dt.normalize() 
-            data = data.groupby(["variable", "date"]).agg({"description" : "last", "value" : "last"}).reset_index()
+        for s in [s for s in series if s not in available]:
+            print(f"-> Series '{s}' not found in the Z.1 catalog. Continuing without this series.")
 
-            if True in dupli_report(data[["date", "variable"]])["Duplicated"].values:
-                raise ValueError("Duplicated dates found")
-            
-            # rename vars
-            
-            data.rename(columns = {"variable" : "series"}, inplace = True)
-            data["variable"] = pd.Series(np.nan, index=data.index, dtype="string")
+        series = [s for s in series if s in available]
 
-            varname_dict = {key + ".Q" : val["varname"] for key, val in get_series.items()}
-            
-            for series, varname in varname_dict.items():
-                mask = (data["series"] == series)
-                data["variable"] = np.where(mask, varname, data["variable"])
+        print(f"\n -> Clean series at frequency = {frequency}:")
 
-            data = data[["date", "series", "variable", "value", "description"]]
+        data = load_fof_series(series, frequency = frequency, n_jobs = n_jobs)
 
-            data["quarterly"] = data["date"].dt.to_period("Q")
-            data = data[["quarterly"] + list(data.drop(columns = ["date", "quarterly"]).columns)] 
+        # rename vars
 
-            df_merge.append(data)
+        varname_dict = {key + ".Q" : val["varname"] for key, val in upload_dict.items()}
+        data["variable"] = data["series"].map(varname_dict)
 
-        df = pd.concat(df_merge, axis = 0) 
-        del df_merge
+        data["quarterly"] = data["date"].dt.to_period("Q")
 
-        return df
-# %%
+        return data[["quarterly", "series", "variable", "value", "description"]]
@@ -3,6 +3,110 @@
 # deprecated/active
 MODULE_STATUS = "deprecated"
 
+# process-wide memo of the meeting calendar: {file path : (signature, sorted meeting days)}
+_CALENDAR_CACHE = {}
+
+#%%========== helper functions ==========%%#
+
+def _calendar_days(dates):
+
+    # calendar days (datetime64[D]) of `dates`. Time-zone aware dates are floored in
+    # their own zone, not in UTC
+
+    import pandas as pd
+
+    dates = pd.DatetimeIndex(dates)
+
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+
+    return dates.to_numpy().astype("datetime64[D]")
+
+def _calendar_index(meeting_dates):
+
+    # sorted unique meeting days (datetime64[D]), the index searched by nearest_fomc_meetings
+
+    import numpy as np
+
+    days = _calendar_days(meeting_dates)
+
+    return np.unique(days[~np.isnat(days)])
+
+def _load_calendar():
+
+    import os
+    from .config import get_data_path
+    from .cache import source_signature
+
+    FOMCdates.check_status()
+
+    file_path = get_data_path() / "FOMC_meeting_dates" / "fomc_meeting_dates_2018_onward.csv"
+
+    if not os.path.exists(file_path):
+        return _calendar_index(FOMCdates.get_dates()["date"])
+
+    key = os.path.abspath(file_path)
+    signature = source_signature(file_path)
+
+    cached = _CALENDAR_CACHE.get(key)
+    if cached is None or cached[0] != signature:
+        _CALENDAR_CACHE[key] = (signature, _calendar_index(FOMCdates.get_dates()["date"]))
+
+    return _CALENDAR_CACHE[key][1]
+
+#%%========== main functions ==========%%#
+
+def nearest_fomc_meetings(dates, meeting_dates = None):
+    """
+    Closest FOMC meetings on or before and on or after each date, as plain arrays.
+
+    Dates are matched by calendar day (time of day is ignored, time-zone aware dates
+    are taken in their own zone) with a binary search
+    over the sorted meetings, in O(n log m), so it can be used on large tick-level
+    date vectors.
+
+    Parameters
+    ----------
+    dates : array-like of datetime64
+        Dates to annotate, naive or time-zone aware (NaT allowed).
+    meeting_dates : array-like of datetime64, optional
+        FOMC meeting dates. Defaults to `FOMCdates.get_dates()`.
+
+    Returns
+    -------
+    dict
+        Arrays aligned with `dates`:
+        "fomc_meeting" (int8, 1 on meeting days), "prev_meeting" and "next_meeting"
+        (datetime64[ns], NaT when there is none), "days_since_meeting" and
+        "days_to_meeting" (float64, NaN when there is none).
+    """
+
+    import numpy as np
+    import pandas as pd
+
+    calendar = _load_calendar() if meeting_dates is None else _calendar_index(meeting_dates)
+
+    days = _calendar_days(dates)
+    valid = ~np.isnat(days)
+
+    prev_pos = np.searchsorted(calendar, days, side = "right") - 1
+    next_pos = np.searchsorted(calendar, days, side = "left")
+
+    has_prev = valid & (prev_pos >= 0)
+    has_next = valid & (next_pos < len(calendar))
+
+    nat = np.datetime64("NaT", "D")
+    prev_meeting = np.where(has_prev, calendar[np.clip(prev_pos, 0, None)] if len(calendar) else nat, nat)
+    next_meeting = np.where(has_next, calendar[np.clip(next_pos, None, len(calendar) - 1)] if len(calendar) else nat, nat)
+
+    return {
+        "fomc_meeting" : (has_next & (next_meeting == days)).astype("int8"),
+        "prev_meeting" : prev_meeting.astype("datetime64[ns]"),
+        "next_meeting" : next_meeting.astype("datetime64[ns]"),
+        "days_since_meeting" : np.where(has_prev, (days - prev_meeting).astype("float64"), np.nan),
+        "days_to_meeting" : np.where(has_next, (next_meeting - days).astype("float64"), np.nan),
+    }
+
 #%%========== data retriever ==========%%#
 
 class FOMCdates:
@@ -72,58 +176,35 @@ class FOMCdates:
             raise RuntimeError("Error while loading FOMC meeting dates.") from e
 
     @staticmethod
-    def merge_fomc_meeting_dates(df, datevar):
-        
-        import numpy as np
+    def merge_fomc_meeting_dates(df, datevar, meetings = None):
+        """
+        Annotate each row of `df` with its closest FOMC meetings, before and after `datevar`.
+
+        Adds, after `datevar`: fomc_meeting (1 if `datevar` is a meeting day), prev_meeting
+        and next_meeting (closest meetings on or before / on or after), and
+        days_since_meeting / days_to_meeting. Rows and their order are kept; see
+        `nearest_fomc_meetings` for the array version.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Data with a date column.
+        datevar : str
+            Name of the date column.
+        meetings : array-like, optional
+            FOMC meeting dates. Defaults to `FOMCdates.get_dates()`.
+        """
+
         import pandas as pd
         
         print("Merging FOMC meeting dates to closest meeting, both before and after 'datevar'")
 
-        meetings = FOMCdates.get_dates()
-        meetings["fomc_meeting"] = 1
+        annotations = nearest_fomc_meetings(df[datevar], meetings)
+        annotations = pd.DataFrame(annotations, index = df.index)
 
         contentcols = df.drop(columns = datevar).columns.to_list()
-        
-        df = df.merge(meetings, 
-                    how = "outer",
-                    left_on = datevar, 
-                    right_on = "date",
-                    indicator = True)
-        
-        df["report_date"] = np.where(
-            df["_merge"] == "right_only", 
-            df["date"], 
-            df[datevar]
-        )
-
-        df = df[[datevar, "fomc_meeting"] + contentcols]
-        
-        df = df.sort_values(datevar).reset_index(drop = True)
-        df["fomc_meeting"] = df["fomc_meeting"].fillna(0).astype(int)
-        
-        df = df.sort_values('report_date').copy()
-        meetings = meetings.sort_values('date')
-
-        prev_merge = pd.merge_asof(
-            df[['report_date']],
-            meetings[["date"]].rename(columns={'date':'prev_meeting'}),
-            left_on='report_date', right_on='prev_meeting',
-            direction='backward'
-        )
-
-        next_merge = pd.merge_asof(
-            df[['report_date']],
-            meetings[["date"]].rename(columns={'date':'next_meeting'}),
-            left_on='report_date', right_on='next_meeting',
-            direction='forward'
-        )
-
-        df['prev_meeting'] = prev_merge['prev_meeting']
-        df['next_meeting'] = next_merge['next_meeting']
-
-        df = df[[datevar, "fomc_meeting", "prev_meeting", "next_meeting"]  + contentcols]
 
-        return df
+        return pd.concat([df[[datevar]], annotations, df[contentcols]], axis = 1)
 
 
 
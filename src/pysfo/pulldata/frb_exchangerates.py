@@ -1,152 +1,317 @@
+#%%========== module parameters ==========%%#
+
+# namespaces of the H.10 data file
+H10_NAMESPACES = {
+    'kf': 'http://www.federalreserve.gov/structure/compact/H10_H10',
+    'frb': 'http://www.federalreserve.gov/structure/compact/common',
+    'common': 'http://www.SDMX.org/resources/SDMXML/schemas/v1_0/common'
+}
+
+# series-level attributes of the long exchange-rate frame, and the XML attribute they come from
+SERIES_ATTRIBUTES = {
+    'series_name': 'SERIES_NAME',
+    'currency': 'CURRENCY',
+    'frequency': 'FREQ',
+    'fx': 'FX',
+    'unit': 'UNIT',
+    'unit_mult': 'UNIT_MULT'
+}
+
+# H.10 frequency code of business-day series
+BUSINESS_DAY_FREQ = 9
+
+# series no longer updated: dropped unless requested explicitly
+DISCONTINUED_SERIES = ["V0.JRXWTFB_N.B", "V0.JRXWTFN_N.B", "V0.JRXWTFO_N.B"]
+
+# rows per row group of the parquet cache (observations are stored series by series)
+ER_ROW_GROUP_SIZE = 50_000
+
+# quoting conventions of `get_panel`: units of currency per USD, or USD per unit of currency
+PANEL_QUOTES = ["per_usd", "usd_per"]
+
+# process-wide memo of filtered frames: {(file, signature, use_cache, filters) : df}
+_ER_CACHE = {}
+MAX_ER_CACHE_ENTRIES = 16
+
 #%%========== define helper functions ==========%%#
 
-def parse_er_xml(file_path):
+def _long_description(series):
 
-    import xml.etree.ElementTree as ET
+    namespaces = H10_NAMESPACES
 
-    # Parse the XML file
-    tree = ET.parse(file_path)
-    root = tree.getroot()
+    long_desc = None
 
-    # Namespace dictionary for prefix resolution
-    namespaces = {
-        'kf': 'http://www.federalreserve.gov/structure/compact/H10_H10',
-        'frb': 'http://www.federalreserve.gov/structure/compact/common',
-        'common': 'http://www.SDMX.org/resources/SDMXML/schemas/v1_0/common'
-    }
-    
-    # Initialize dictionary for datasets
-    datasets = {}
-
-    # Iterate over each kf:Series element
-    for series in root.findall('.//kf:Series', namespaces):
-        # Extract attributes
-        currency = series.attrib.get('CURRENCY', 'NaN')
-        frequency = series.attrib.get('FREQ', 'NaN')
-        fx = series.attrib.get('FX', 'NaN')
-        series_name = series.attrib.get('SERIES_NAME', 'NaN')
-        unit = series.attrib.get('UNIT', 'NaN')
-        unit_mult = series.attrib.get('UNIT_MULT', 'NaN')
-        
-        # Add to datasets dictionary
-        datasets[series_name] = {
-            'currency': currency,
-            'frequency': frequency,
-            'fx': fx,
-            'unit': unit,
-            'unit_mult': unit_mult,
-            'observations': []
-        }
-
-        # Extract long description from annotations
-        annotations = series.find('.//frb:Annotations', namespaces)
-        if annotations is not None:
-            for annotation in annotations.findall('.//common:Annotation', namespaces):
-                annotation_type = annotation.find('common:AnnotationType', namespaces).text
-                if annotation_type == 'Long Description':
-                    long_desc = annotation.find('common:AnnotationText', namespaces).text
-                    datasets[series_name]['long_description'] = long_desc
-
-
-        # Extract each observation
-        for obs in series.findall('./frb:Obs', namespaces):
-            obs_status = obs.attrib.get('OBS_STATUS', 'NaN')
-            obs_value = obs.attrib.get('OBS_VALUE', 'NaN')
-            time_period = obs.attrib.get('TIME_PERIOD', 'NaN')
-            
-            datasets[series_name]['observations'].append({
-                'status': obs_status,
-                'value': obs_value,
-                'time_period': time_period
-            })
-
-    return datasets
-
-def create_er_dataframe(er_data_dict):
+    annotations = series.find('.//frb:Annotations', namespaces)
+    if annotations is not None:
+        for annotation in annotations.findall('.//common:Annotation', namespaces):
+            if annotation.find('common:AnnotationType', namespaces).text == 'Long Description':
+                long_desc = annotation.find('common:AnnotationText', namespaces).text
+
+    return long_desc
+
+def _er_filters(series, frequency, start, end):
+
+    # normalized, hashable filters of `get`
 
     import pandas as pd
 
-    # Initialize a list to collect data for each row
-    rows = []
-
-    for series_name, series_data in er_data_dict.items():
-        # Iterate over observations
-        for obs in series_data['observations']:
-            # Each observation is a row in the DataFrame
-            row = {
-                'series_name': series_name,
-                'currency': series_data['currency'],
-                'frequency': series_data['frequency'],
-                'fx': series_data['fx'],
-                'unit': series_data['unit'],
-                'unit_mult': series_data['unit_mult'],
-                'long_description': series_data['long_description'],
-                'obs_status': obs['status'],
-                'obs_value': obs['value'],
-                'time_period': obs['time_period']
-            }
-            rows.append(row)
-
-    # Create DataFrame from list of dictionaries
-    df = pd.DataFrame(rows)
-    return df
+    def _as_tuple(x):
+        return None if x is None else (x,) if isinstance(x, (str, int)) else tuple(x)
+
+    series = _as_tuple(series)
+    frequency = _as_tuple(frequency)
+
+    return (
+        ("series", series),
+        ("exclude_series", tuple(DISCONTINUED_SERIES) if series is None else ()),
+        ("frequency", None if frequency is None else tuple(int(f) for f in frequency)),
+        ("obs_status", ("A",)),
+        ("start", None if start is None else pd.Timestamp(start)),
+        ("end", None if end is None else pd.Timestamp(end)),
+    )
+
+def _keep_series(filters):
+
+    # predicate on the kf:Series attributes (None if every series is kept)
+
+    filters = dict(filters)
+
+    series = None if filters["series"] is None else set(filters["series"])
+    exclude_series = set(filters["exclude_series"])
+    frequency = None if filters["frequency"] is None else {str(f) for f in filters["frequency"]}
+
+    if series is None and len(exclude_series) == 0 and frequency is None:
+        return None
+
+    def keep(attrs):
+        name = attrs.get('SERIES_NAME', 'NaN')
+        return (
+            (series is None or name in series)
+            and name not in exclude_series
+            and (frequency is None or attrs.get('FREQ', 'NaN') in frequency)
+        )
+
+    return keep
 
-def parse_datadict_xml(frequencies_file):
+def _parquet_filters(filters):
+
+    filters = dict(filters)
+
+    pq_filters = []
+    if filters["series"] is not None:
+        pq_filters.append(("series_name", "in", list(filters["series"])))
+    if len(filters["exclude_series"]):
+        pq_filters.append(("series_name", "not in", list(filters["exclude_series"])))
+    if filters["frequency"] is not None:
+        pq_filters.append(("frequency", "in", list(filters["frequency"])))
+    if filters["obs_status"] is not None:
+        pq_filters.append(("obs_status", "in", list(filters["obs_status"])))
+    if filters["start"] is not None:
+        pq_filters.append(("time_period", ">=", filters["start"]))
+    if filters["end"] is not None:
+        pq_filters.append(("time_period", "<=", filters["end"]))
+
+    return pq_filters or None
+
+def _iter_er_series(file_path, keep_series = None, obs_status = None):
+
+    # stream kf:Series elements: observations are collected (and cleared) as they are
+    # parsed, and each series is cleared once yielded. Series rejected by `keep_series`
+    # (checked on their opening tag) and observations not in `obs_status` are skipped.
 
     import xml.etree.ElementTree as ET
 
-     # Parse the XML file
-    tree = ET.parse(frequencies_file)
-    root = tree.getroot()
+    SERIES = f"{{{H10_NAMESPACES['kf']}}}Series"
+    OBS = f"{{{H10_NAMESPACES['frb']}}}Obs"
 
-    # Namespace dictionary for prefix resolution
-    namespaces = {
-        'xs': 'http://www.w3.org/2001/XMLSchema',
-    }
-    
-    # Initialize dictionary for datasets
-    datasets = {}
+    events = ("end",) if keep_series is None else ("start", "end")
+    obs_status = None if obs_status is None else set(obs_status)
 
-    # Iterate over each kf:Series element
-    for data in root.findall('.//xs:simpleType', namespaces):
-        # Extract attributes
-        name = data.attrib.get('name', 'NaN')
-        datasets[name] = {}
+    skip = False
+    status, values, periods = [], [], []
 
-        # Extract each observation
-        for item, docum in zip(data.findall('.//xs:enumeration', namespaces),
-                               data.findall('.//xs:documentation', namespaces)):
-            
-            value = item.attrib.get('value', 'NaN')
-            desc = docum.text
-            
-            datasets[name][value] = desc
+    for event, elem in ET.iterparse(file_path, events = events):
 
-    return datasets
+        if event == "start":
+            if elem.tag == SERIES:
+                skip = not keep_series(elem.attrib)
+            continue
 
-def create_datadict_dataframe(datadict_dict):
+        if elem.tag == OBS:
+            if not skip and (obs_status is None or elem.get('OBS_STATUS', 'NaN') in obs_status):
+                status.append(elem.get('OBS_STATUS', 'NaN'))
+                values.append(elem.get('OBS_VALUE', 'NaN'))
+                periods.append(elem.get('TIME_PERIOD', 'NaN'))
+            elem.clear()
 
+        elif elem.tag == SERIES:
+            if not skip:
+                yield dict(elem.attrib), _long_description(elem), status, values, periods
+            elem.clear()
+            skip = False
+            status, values, periods = [], [], []
+
+def read_er_xml(file_path, filters = None):
+    """
+    Read the FRB H.10 data file into a long frame, one row per observation.
+
+    The XML is streamed with `iterparse` (parsed elements are released as soon as they are
+    read) and observations go straight into typed column arrays, so memory scales with
+    the output rather than with the XML tree. `filters` (see `FRBExchangeRates.get`) are
+    applied while parsing: rejected series are skipped as soon as their opening tag is read.
+    """
+
+    import numpy as np
     import pandas as pd
 
-    # Initialize a list to collect data for each row
-    rows = []
+    keep_series = None if filters is None else _keep_series(filters)
+    obs_status = None if filters is None else dict(filters)["obs_status"]
+    start, end = (None, None) if filters is None else (dict(filters)["start"], dict(filters)["end"])
+
+    series_attrs = {col : [] for col in list(SERIES_ATTRIBUTES) + ['long_description']}
+    series_idx, obs_status_list, obs_value, time_period = [], [], [], []
+
+    for i, (attrs, long_desc, status, values, periods) in enumerate(_iter_er_series(file_path, keep_series, obs_status)):
+
+        for col, attr in SERIES_ATTRIBUTES.items():
+            series_attrs[col].append(attrs.get(attr, 'NaN'))
+        series_attrs['long_description'].append(long_desc)
+
+        status = np.array(status, dtype = object)
+        values = np.array(values, dtype = np.float64)
+        periods = pd.to_datetime(np.array(periods, dtype = object)).to_numpy()
 
-    for datapoint, values in datadict_dict.items():
+        if start is not None or end is not None:
+            keep = np.ones(len(periods), dtype = bool)
+            if start is not None:
+                keep &= periods >= start.to_datetime64()
+            if end is not None:
+                keep &= periods <= end.to_datetime64()
+            status, values, periods = status[keep], values[keep], periods[keep]
 
-        # Iterate over values
-        for val, desc in values.items():
-            # Each observation is a row in the DataFrame
-            row = {
-                'datapoint': datapoint,
-                'value': val,
-                'description': desc,
-            }
-            rows.append(row)
+        series_idx.append(np.full(len(status), i, dtype = np.int32))
+        obs_status_list.append(status)
+        obs_value.append(values)
+        time_period.append(periods)
+
+    if len(series_idx) == 0 and filters is None:
+        raise ValueError(f"No series found in '{file_path}'.")
+
+    series_idx = np.concatenate(series_idx) if len(series_idx) else np.array([], dtype = np.int32)
+
+    df = pd.DataFrame({
+        col : np.array(vals, dtype = object)[series_idx] for col, vals in series_attrs.items()
+    })
+    df['obs_status'] = np.concatenate(obs_status_list) if len(obs_status_list) else np.array([], dtype = object)
+    df['obs_value'] = np.concatenate(obs_value) if len(obs_value) else np.array([], dtype = np.float64)
+    df['time_period'] = np.concatenate(time_period) if len(time_period) else np.array([], dtype = "datetime64[ns]")
+
+    df['frequency'] = pd.to_numeric(df['frequency']).astype("int64")
 
-    # Create DataFrame from list of dictionaries
-    df = pd.DataFrame(rows)
     return df
 
+def _load_er_data(FRB_H10_dir, file_path, use_cache, filters = None):
+
+    # long frame of the selected series. With use_cache, every series is parsed once into
+    # a parquet cache (until H10_data.xml changes) and filters are applied on its row groups
+
+    import os
+    import pandas as pd
+    from .cache import cache_dir, source_signature, is_fresh, write_manifest, atomic_path
+
+    if not use_cache:
+        return read_er_xml(file_path, filters)
+
+    cache_file = cache_dir(FRB_H10_dir) / "H10_data.parquet"
+    signature = source_signature(file_path)
+
+    if not is_fresh(cache_file, signature):
+
+        df = read_er_xml(file_path)
+
+        tmp = atomic_path(cache_file)
+        df.to_parquet(tmp, index = False, compression = "zstd", row_group_size = ER_ROW_GROUP_SIZE)
+        os.replace(tmp, cache_file)
+        write_manifest(cache_file, signature)
+
+    return pd.read_parquet(cache_file, filters = None if filters is None else _parquet_filters(filters))
+
+def _unit_quote(unit, fx):
+
+    # direction of a USD rate from the denominator of its unit: "Currency:_Per_USD" ->
+    # "per_usd"; "USD:_Per_EUR" or "Currency:_Per_EUR" (with FX="EUR") -> "usd_per".
+    # None if not a USD rate of the `fx` currency
+
+    parts = str(unit).split(":_Per_")
+
+    if len(parts) != 2:
+        return None
+    if parts[1] == "USD":
+        return "per_usd"
+    if parts[1] == fx:
+        return "usd_per"
+
+    return None
+
+def _build_er_panel(FRB_H10_dir, file_path, use_cache):
+
+    # business-day panel of every USD exchange rate, quoted as in the H.10 table. Columns
+    # are keyed on the FX attribute (CURRENCY is "USD" for rates quoted in USD)
+
+    import numpy as np
+    import pandas as pd
+
+    df = _load_er_data(FRB_H10_dir, file_path, use_cache, _er_filters(None, BUSINESS_DAY_FREQ, None, None))
+
+    series = df[["series_name", "fx", "unit"]].drop_duplicates().reset_index(drop = True)
+    series["quote"] = [_unit_quote(unit, fx) for unit, fx in zip(series["unit"], series["fx"])]
+    series = series.dropna(subset = ["quote"])
+
+    duplicated = series.loc[series["fx"].duplicated(keep = False), "series_name"].to_list()
+    if len(duplicated):
+        raise ValueError(f"More than one business-day exchange rate per currency: {duplicated}")
+
+    df = df.loc[df["series_name"].isin(series["series_name"]), :]
+
+    wide = df.pivot(index = "time_period", columns = "series_name", values = "obs_value")
+    wide = wide.reindex(index = pd.bdate_range(wide.index.min(), wide.index.max()), columns = series["series_name"])
+
+    return {
+        "dates" : wide.index.to_numpy(dtype = "datetime64[ns]"),
+        "values" : wide.to_numpy(dtype = np.float64),
+        "currencies" : series["fx"].to_numpy(dtype = str),
+        "series" : series["series_name"].to_numpy(dtype = str),
+        "usd_per" : (series["quote"] == "usd_per").to_numpy()
+    }
+
+def _load_er_panel(FRB_H10_dir, file_path, use_cache):
+
+    # arrays of the panel, stored as .npz until H10_data.xml changes
+
+    import os
+    import numpy as np
+    from .cache import cache_dir, source_signature, is_fresh, write_manifest, atomic_path
+
+    if not use_cache:
+        return _build_er_panel(FRB_H10_dir, file_path, use_cache)
+
+    cache_file = cache_dir(FRB_H10_dir) / "H10_panel.npz"
+    signature = source_signature(file_path)
+
+    if is_fresh(cache_file, signature, currency = "fx"):
+        with np.load(cache_file) as store:
+            return {key : store[key] for key in store.files}
+
+    panel = _build_er_panel(FRB_H10_dir, file_path, use_cache)
+
+    tmp = atomic_path(cache_file)
+    with open(tmp, "wb") as f:
+        np.savez(f, **panel)
+    os.replace(tmp, cache_file)
+    write_manifest(cache_file, signature, currency = "fx")
+
+    return panel
+
 #%%========== get data ==========%%#
 
 
@@ -176,68 +341,154 @@ class FRBExchangeRates:
         )
     
     @staticmethod
-    def get(check_ER = False):
+    def get(check_ER = False, *, series = None, start = None, end = None, frequency = BUSINESS_DAY_FREQ, use_cache = True):
+        """
+        Exchange rates of the FRB H.10 table, one row per (series, date) with status "A".
+
+        Parameters
+        ----------
+        check_ER : bool, default False
+            If True, write a summary of the selected series to `check.csv`.
+        series : str | list, optional
+            H.10 series names (e.g. "RXI_N.B.JA"). Defaults to every series still updated.
+        start, end : str | pd.Timestamp, optional
+            Date window of the observations.
+        frequency : int | list, default BUSINESS_DAY_FREQ
+            H.10 frequency codes kept (9 is business day). None keeps every frequency.
+        use_cache : bool, default True
+            Read the parquet cache of the XML (built on first use). If False, filters are
+            applied while streaming the XML.
+
+        The filters are keyword-only, so `get(True)` still writes the check file.
+        Filters are applied while reading (skipping unwanted series and row groups), and
+        results are memoized per filter set until `H10_data.xml` changes. Callers receive
+        a copy.
+        """
 
         import os
         import pandas as pd
         from .config import get_data_path
+        from .cache import source_signature
 
         print("Exchange rates extracted from FRB H10 table.\n")
 
         FRB_H10_dir = get_data_path() / "FRB_H10/FRB_H10"
 
-        # Define file paths
+        # Define file path (the data dictionary frb_common.xsd is not needed)
         file_path = f'{FRB_H10_dir}/H10_data.xml'
-        datadict_path = f'{FRB_H10_dir}/frb_common.xsd'
 
-        # Check if files exist
-        for path in [file_path, datadict_path]:
-            if not os.path.exists(path):
-                raise FileNotFoundError(f"The required file '{path}' is missing.")
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"The required file '{file_path}' is missing.")
         
-        # Get data
-        datasets = parse_er_xml(file_path)
-        df = create_er_dataframe(datasets)
-
-        datadict = parse_datadict_xml(datadict_path)
-        datadict = create_datadict_dataframe(datadict)
+        # keep business day ER and normal, and take out series no longer updated
 
-        # fix general formats
+        filters = _er_filters(series, frequency, start, end)
 
-        df[["frequency", "obs_value"]] = df[["frequency", "obs_value"]].apply(lambda x : pd.to_numeric(x))
-        df["time_period"] = pd.to_datetime(df["time_period"]) 
+        key = (os.path.abspath(file_path), str(source_signature(file_path)), use_cache, filters)
 
-        # keep business day ER and normal
-
-        df = df[df["frequency"] == 9]
-        df = df[df["obs_status"] == "A"]
+        if key in _ER_CACHE:
+            df = _ER_CACHE[key]
+        else:
+            # Get data (typed, streamed from the XML or read from the parquet cache)
+            df = _load_er_data(FRB_H10_dir, file_path, use_cache, filters).reset_index(drop = True)
+            _ER_CACHE[key] = df
+            while len(_ER_CACHE) > MAX_ER_CACHE_ENTRIES:
+                del _ER_CACHE[next(iter(_ER_CACHE))]
 
         # fix ER names (everything looks kind of nice)
 
         # Note: This is for checks
         # statatab(df["series_name"])
-        
-        h_tmp = (
-            df
-            .groupby(["long_description", "series_name", "frequency", "unit", "obs_status"])
-            .agg(max_date = ("time_period", "max"),
-                min_date = ("time_period", "min"),
-                nobs = ("obs_value", "count"))
-            .reset_index()
-            .drop_duplicates()
-            .sort_values(by = "long_description")
-        )
 
         if check_ER:
-            h_tmp.to_csv(f"{FRB_H10_dir}/check.csv")
 
-        # take out series no longer updated
+            h_tmp = (
+                df
+                .groupby(["long_description", "series_name", "frequency", "unit", "obs_status"])
+                .agg(max_date = ("time_period", "max"),
+                    min_date = ("time_period", "min"),
+                    nobs = ("obs_value", "count"))
+                .reset_index()
+                .drop_duplicates()
+                .sort_values(by = "long_description")
+            )
 
-        mask = df["series_name"].isin(["V0.JRXWTFB_N.B", "V0.JRXWTFN_N.B", "V0.JRXWTFO_N.B"])
-        df = df.loc[~mask, :]
+            h_tmp.to_csv(f"{FRB_H10_dir}/check.csv")
 
         # save fx data
 
-        return df
+        return df.copy()
+
+    @staticmethod
+    def get_panel(currencies = None, start = None, end = None, quote = "per_usd", ffill_limit = None, use_cache = True):
+        """
+        Business-day panel of USD exchange rates, one float32 column per currency.
+
+        Parameters
+        ----------
+        currencies : str | list, optional
+            Currency codes (the `FX` attribute of the H.10 series). Defaults to all.
+        start, end : str | pd.Timestamp, optional
+            Date window of the panel.
+        quote : str, default "per_usd"
+            "per_usd" (units of currency per USD) or "usd_per" (USD per unit of currency).
+            Series are converted according to the denominator of their H.10 `unit` attribute.
+        ffill_limit : int, optional
+            If given, forward-fill missing business days, at most `ffill_limit` days in a row.
+        use_cache : bool, default True
+            Read the panel arrays cached next to the H.10 files (built on first use).
+
+        Returns
+        -------
+        pd.DataFrame
+            Date x currency float32 panel on a business-day index.
+        """
+
+        import os
+        import numpy as np
+        import pandas as pd
+        from .config import get_data_path
+
+        if quote not in PANEL_QUOTES:
+            raise ValueError(f"quote must be one of {PANEL_QUOTES}. Got: {quote}")
+
+        FRB_H10_dir = get_data_path() / "FRB_H10/FRB_H10"
+        file_path = f'{FRB_H10_dir}/H10_data.xml'
+
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"The required file '{file_path}' is missing.")
+
+        panel = _load_er_panel(FRB_H10_dir, file_path, use_cache)
+
+        # select currencies
+
+        if currencies is None:
+            cols = np.arange(len(panel["currencies"]))
+        else:
+            currencies = [currencies] if isinstance(currencies, str) else list(currencies)
+            missing = [cur for cur in currencies if cur not in panel["currencies"]]
+            if len(missing):
+                raise ValueError(f"Currencies not found in the H.10 business-day rates: {missing}")
+            cols = np.array([np.flatnonzero(panel["currencies"] == cur)[0] for cur in currencies], dtype = int)
+
+        values = panel["values"][:, cols]
+
+        # consistent quoting
+
+        invert = panel["usd_per"][cols] if quote == "per_usd" else ~panel["usd_per"][cols]
+        values = np.where(invert, 1 / values, values)
+
+        df = pd.DataFrame(
+            values.astype(np.float32),
+            index = pd.DatetimeIndex(panel["dates"], name = "date", freq = "B"),
+            columns = pd.Index(panel["currencies"][cols], name = "currency")
+        )
+
+        # fill before trimming, so the first days of the window use earlier quotes
+
+        if ffill_limit is not None:
+            df = df.ffill(limit = ffill_limit)
+
+        return df.loc[start:end]
 
 # %%
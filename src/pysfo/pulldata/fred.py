@@ -1,18 +1,174 @@
 #%%========== dict of currently available cleaned datasets ==========%%#
 
+# each dataset declares its FRED series, in output order, as
+# SERIESID : {"column" : output column, "transform" : key of TRANSFORMS}
+
 available_datasets = {
     "yieldseries" : {
         "desc" : "Bunch of very useful daily yield series retrieved from FRED.",
-        "needs" : [            
-            "FEDFUNDS", "EFFR", "DGS1MO", "DGS3MO", "DGS1",
-            "DGS3", "DGS5", "DGS7", "DGS10", "DGS20",
-            "DGS30", "SOFR", "RIFSPPFAAD30NB", "SOFR30DAYAVG",
-            "RIFSPPFAAD90NB", "SOFR90DAYAVG", "RRPONTSYAWARD",
-            "BAMLC0A3CA", "BAMLH0A0HYM2"
-        ]
+        "series" : {
+            "FEDFUNDS" : {"column" : "fedfunds", "transform" : "percent"},
+            "EFFR" : {"column" : "effr", "transform" : "percent"},
+            "DGS1MO" : {"column" : "y008", "transform" : "percent"},
+            "DGS3MO" : {"column" : "y025", "transform" : "percent"},
+            "DGS1" : {"column" : "y1", "transform" : "percent"},
+            "DGS2" : {"column" : "y2", "transform" : "percent"},
+            "DGS3" : {"column" : "y3", "transform" : "percent"},
+            "DGS5" : {"column" : "y5", "transform" : "percent"},
+            "DGS7" : {"column" : "y7", "transform" : "percent"},
+            "DGS10" : {"column" : "y10", "transform" : "percent"},
+            "DGS20" : {"column" : "y20", "transform" : "percent"},
+            "DGS30" : {"column" : "y30", "transform" : "percent"},
+            "BAMLC0A3CA" : {"column" : "ig", "transform" : "percent"},
+            "BAMLH0A0HYM2" : {"column" : "hy", "transform" : "percent"},
+            "RIFSPPFAAD90NB" : {"column" : "cp90d", "transform" : "percent"},
+            "SOFR90DAYAVG" : {"column" : "sofr90d", "transform" : "percent"},
+            "RIFSPPFAAD30NB" : {"column" : "cp30d", "transform" : "percent"},
+            "SOFR30DAYAVG" : {"column" : "sofr30d", "transform" : "percent"},
+            "SOFR" : {"column" : "sofr", "transform" : "percent"},
+            "RRPONTSYAWARD" : {"column" : "rrp", "transform" : "percent"},
+        }
     }
 }
 
+# "needs": FRED series ids to download for each dataset (fred_api/<SERIESID>.csv)
+for _dataset in available_datasets.values():
+    _dataset["needs"] = list(_dataset["series"])
+del _dataset
+
+#%%========== module parameters ==========%%#
+
+from collections import OrderedDict
+
+# transforms applied to each series before alignment
+TRANSFORMS = {
+    "level" : lambda x : x,
+    "percent" : lambda x : x / 100,
+}
+
+# process-wide memo of the assembled panels: {(fred_api dir, dataset, sorted series) : (signature, panel)}
+_PANEL_CACHE = OrderedDict()
+
+# panels kept in memory (least recently used are dropped first)
+MAX_PANEL_CACHE_ENTRIES = 16
+
+#%%========== helper functions ==========%%#
+
+def _read_fred_csv(file_path):
+
+    # one FRED series (date, <SERIESID>) as a float Series on a DatetimeIndex
+
+    import pandas as pd
+
+    df = pd.read_csv(file_path, index_col = 0)
+
+    series = pd.to_numeric(df.iloc[:, 0], errors = "coerce")
+    series.index = pd.to_datetime(series.index)
+
+    return series
+
+def _select_series(dataset, columns):
+
+    # {SERIESID : spec} of the requested output columns (all of them if None), in the
+    # requested order
+
+    if dataset not in available_datasets:
+        raise ValueError(f"Unknown dataset '{dataset}'. Available datasets are: {', '.join(available_datasets)}")
+
+    declared = available_datasets[dataset]["series"]
+
+    if columns is None:
+        return dict(declared)
+
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    by_column = {spec["column"] : series_id for series_id, spec in declared.items()}
+
+    unknown = [col for col in columns if col not in by_column]
+    if unknown:
+        raise ValueError(f"Unknown columns for dataset '{dataset}': {', '.join(unknown)}. Available columns are: {', '.join(by_column)}")
+
+    return {by_column[col] : declared[by_column[col]] for col in dict.fromkeys(columns)}
+
+def _read_fred_series(file_path, transform):
+
+    return TRANSFORMS[transform](_read_fred_csv(file_path))
+
+def _assemble_fred_panel(fred_api_dir, series, n_jobs = -1):
+
+    # daily panel of the declared series: files are read concurrently and aligned with one
+    # concat on the union of their dates, then forward-filled on a daily calendar
+
+    import pandas as pd
+    from joblib import Parallel, delayed
+
+    data = Parallel(n_jobs = 1 if len(series) == 1 else n_jobs, prefer = "threads")(
+        delayed(_read_fred_series)(fred_api_dir / f"{series_id}.csv", spec["transform"]) for series_id, spec in series.items()
+    )
+
+    panel = pd.concat(data, axis = 1, keys = [spec["column"] for spec in series.values()], sort = True)
+    panel = panel.ffill()
+
+    full_date_range = pd.date_range(start = panel.index.min(), end = panel.index.max(), freq = "D")
+    panel = panel.reindex(full_date_range).ffill()
+
+    return panel.rename_axis("date").astype("float32")
+
+def _load_fred_panel(fred_api_dir, dataset, series, use_cache = True, n_jobs = -1):
+
+    # assembled panel of `series`, cached as parquet in the `_cache` directory (until any
+    # of its source files changes) and memoized per process. Only the files of `series`
+    # are read: column subsets of a dataset are cached separately from the full panel.
+    # Cache entries are keyed on the set of series; columns are put in the requested
+    # order on return
+
+    import os
+    import hashlib
+    import pandas as pd
+    from .cache import cache_dir, source_signature, is_fresh, write_manifest, atomic_path
+
+    files = [fred_api_dir / f"{series_id}.csv" for series_id in series.keys()]
+    missing_files = [file.name for file in files if not os.path.exists(file)]
+
+    if missing_files:
+        raise FileNotFoundError(f"The following required files are missing in '{fred_api_dir}': {', '.join(missing_files)}")
+
+    columns = [spec["column"] for spec in series.values()]
+
+    # stored in the declared order of the dataset
+    declared = available_datasets[dataset]["series"]
+    stored = {series_id : spec for series_id, spec in declared.items() if series_id in series}
+
+    signature = source_signature(sorted(files))
+    params = {"series" : stored}
+
+    key = (os.path.abspath(fred_api_dir), dataset, tuple(sorted(series)))
+    cached = _PANEL_CACHE.get(key)
+    if use_cache and cached is not None and cached[0] == (signature, params):
+        _PANEL_CACHE.move_to_end(key)
+        return cached[1][columns]
+
+    if len(stored) == len(declared):
+        cache_file = cache_dir(fred_api_dir) / f"{dataset}.parquet"
+    else:
+        subset = hashlib.md5(",".join(sorted(series)).encode()).hexdigest()[:10]
+        cache_file = cache_dir(fred_api_dir) / f"{dataset}_{subset}.parquet"
+
+    if use_cache and is_fresh(cache_file, signature, **params):
+        panel = pd.read_parquet(cache_file)
+    else:
+        panel = _assemble_fred_panel(fred_api_dir, stored, n_jobs = n_jobs)
+        tmp = atomic_path(cache_file)
+        panel.to_parquet(tmp, compression = "zstd")
+        os.replace(tmp, cache_file)
+        write_manifest(cache_file, signature, **params)
+
+    _PANEL_CACHE[key] = ((signature, params), panel)
+    _PANEL_CACHE.move_to_end(key)
+    while len(_PANEL_CACHE) > MAX_PANEL_CACHE_ENTRIES:
+        _PANEL_CACHE.popitem(last = False)
+
+    return panel[columns]
+
 #%%========== aggregate yield series ==========%%#
 
 class FREDcleaned:
@@ -47,84 +203,45 @@ class FREDcleaned:
         return available_datasets
 
     class _Getter:
-        
-        @staticmethod
-        def yieldseries():
 
-            import os
-            import pandas as pd
-            from functools import reduce
+        def __call__(self, dataset, columns = None, use_cache = True):
+            """
+            Daily panel of a cleaned dataset (see `available_datasets`), forward-filled
+            over calendar days, as float32.
+
+            Parameters
+            ----------
+            dataset : str
+                Name of the dataset, e.g. "yieldseries".
+            columns : str | list, optional
+                Output columns to load (e.g. ["y2", "y10"]). Only their source files are
+                read, and the calendar spans their observations. Defaults to all columns.
+            use_cache : bool, default True
+                If False, rebuild the panel from the CSV files.
+
+            Examples
+            --------
+            FREDcleaned.get("yieldseries", columns = ["y2", "y10"])
+            """
+
             from .config import get_data_path
 
             # set path
             fred_api_dir = get_data_path() / "fred_api"
 
-            # List of required CSV files
-            required_files = [
-                series + ".csv"
-                for series in
-                available_datasets["yieldseries"]["needs"]
-            ]
-            
-            # Check for the existence of each required CSV file
-            missing_files = [file for file in required_files if not os.path.exists(f"{fred_api_dir}/{file}")]
-
-            if missing_files:
-                raise FileNotFoundError(f"The following required files are missing in '{fred_api_dir}': {', '.join(missing_files)}")
-
-            # treasuries and monetary policy
-
-            fedfunds = pd.read_csv(f"{fred_api_dir}/FEDFUNDS.csv")
-            effr = pd.read_csv(f"{fred_api_dir}/EFFR.csv")
-            y008 = pd.read_csv(f"{fred_api_dir}/DGS1MO.csv")
-            y025 = pd.read_csv(f"{fred_api_dir}/DGS3MO.csv")
-            y1 = pd.read_csv(f"{fred_api_dir}/DGS1.csv")
-            y2 = pd.read_csv(f"{fred_api_dir}/DGS2.csv")
-            y3 = pd.read_csv(f"{fred_api_dir}/DGS3.csv")
-            y5 = pd.read_csv(f"{fred_api_dir}/DGS5.csv")
-            y7 = pd.read_csv(f"{fred_api_dir}/DGS7.csv")
-            y10 = pd.read_csv(f"{fred_api_dir}/DGS10.csv")
-            y20 = pd.read_csv(f"{fred_api_dir}/DGS20.csv")
-            y30 = pd.read_csv(f"{fred_api_dir}/DGS30.csv")
-            sofr = pd.read_csv(f"{fred_api_dir}/SOFR.csv")
-            cp30d = pd.read_csv(f"{fred_api_dir}/RIFSPPFAAD30NB.csv")
-            sofr30d = pd.read_csv(f"{fred_api_dir}/SOFR30DAYAVG.csv")
-            cp90d = pd.read_csv(f"{fred_api_dir}/RIFSPPFAAD90NB.csv")
-            sofr90d = pd.read_csv(f"{fred_api_dir}/SOFR90DAYAVG.csv")
-            rrp = pd.read_csv(f"{fred_api_dir}/RRPONTSYAWARD.csv")
-
-            # ig
-            
-            ig = pd.read_csv(f"{fred_api_dir}/BAMLC0A3CA.csv")
-
-            # hy
-
-            hy = pd.read_csv(f"{fred_api_dir}/BAMLH0A0HYM2.csv")
-
-            # consolidate
-
-            dfs = [fedfunds, effr, y008, y025, y1, y2, y3, y5, y7, y10, y20, y30, ig, hy, cp90d, 
-                sofr90d, cp30d, sofr30d, sofr, rrp]
-            names = ["fedfunds", 'effr', 'y008', 'y025', 'y1', 'y2', 'y3', 'y5', 'y7', 'y10', 'y20', 'y30', 'ig', 'hy', "cp90d", 
-                    "sofr90d", "cp30d", "sofr30d", "sofr", "rrp"]
-
-            for df, name in zip(dfs, names):
-                df.columns = ['date', name.lower()]
-
-                if not pd.api.types.is_datetime64_any_dtype(df["date"]):
-                    df["date"] = pd.to_datetime(df["date"])
-
-            df = reduce(lambda left, right: pd.merge(left, right, on='date', how='outer'), dfs)
-            df = df.sort_values("date").ffill()
-            df[names] = df[names] / 100
-
-            # Create a complete date range from the min to max date in the DataFrame
-            full_date_range = pd.date_range(start=df["date"].min(), end =  df["date"].max(), freq='D')
-            df = df.set_index("date").reindex(full_date_range).rename_axis("date").reset_index()
-            df.sort_values("date", inplace=True)
-            df = df.ffill()
-
-            return df
+            series = _select_series(dataset, columns)
+
+            panel = _load_fred_panel(fred_api_dir, dataset, series, use_cache = use_cache)
+
+            return panel.reset_index()
+        
+        def yieldseries(self, use_cache = True):
+            """
+            Daily panel of FRED policy rates, Treasury yields and credit spreads, in
+            decimals (float32), forward-filled over calendar days.
+            """
+
+            return self("yieldseries", use_cache = use_cache)
         
     get = _Getter()
     
@@ -0,0 +1,299 @@
+"""
+Local vintage (ALFRED) store for FRED series.
+Every observation is kept with the date it became known (realtime_start), in an
+append-only directory of parquet parts per series (merged into one part once there are
+too many), so the values of a series as of any past date can be rebuilt without API calls.
+"""
+
+#%%========== module parameters ==========%%#
+
+from .fetch_fred_api import FRED_REQUESTS_PER_MINUTE, DEFAULT_WORKERS, DEFAULT_RETRIES
+
+VINTAGE_COLUMNS = ["date", "realtime_start", "value"]
+
+# parts of a series store merged into one file when exceeded
+MAX_VINTAGE_PARTS = 16
+
+# listings of a series store read before giving up, when parts are removed while reading
+READ_ATTEMPTS = 5
+
+# process-wide memo of the loaded stores: {series dir : (signature, store)}
+_VINTAGE_CACHE = {}
+
+#%%========== helper functions ==========%%#
+
+def _vintage_dir(series, save_dir):
+
+    from pathlib import Path
+    from .config import get_data_path
+
+    save_dir = get_data_path() / "fred_api" / "vintages" if save_dir is None else Path(save_dir)
+
+    return save_dir / series
+
+def _vintage_parts(series_dir):
+
+    return sorted(series_dir.glob("part-*.parquet")) if series_dir.exists() else []
+
+def _read_vintages(series_dir):
+
+    # all (date, realtime_start, value) rows of a series, sorted by date and realtime_start
+
+    import os
+    import pandas as pd
+    from .cache import source_signature
+
+    key = os.path.abspath(series_dir)
+
+    for attempt in range(READ_ATTEMPTS):
+
+        parts = _vintage_parts(series_dir)
+
+        if len(parts) == 0:
+            return pd.DataFrame({
+                "date" : pd.Series(dtype = "datetime64[ns]"),
+                "realtime_start" : pd.Series(dtype = "datetime64[ns]"),
+                "value" : pd.Series(dtype = "float64")
+            })
+
+        # a part removed by a concurrent compaction: its rows are in the merged part,
+        # found by listing the parts again
+
+        try:
+            signature = source_signature(parts)
+
+            cached = _VINTAGE_CACHE.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+            store = pd.concat([pd.read_parquet(part) for part in parts], ignore_index = True)
+            break
+
+        except FileNotFoundError:
+            if attempt == READ_ATTEMPTS - 1:
+                raise
+
+    # a listing taken during compaction holds both the merged part and the old parts
+
+    store = store.sort_values(["date", "realtime_start"], kind = "stable", ignore_index = True)
+    store = store.drop_duplicates(subset = ["date", "realtime_start"], keep = "last", ignore_index = True)
+
+    _VINTAGE_CACHE[key] = (signature, store)
+
+    return store
+
+def _write_part(series_dir, df):
+
+    import os
+    import time
+    from .cache import atomic_path
+
+    series_dir.mkdir(parents = True, exist_ok = True)
+
+    # part names sort in write order
+    target = series_dir / f"part-{time.time_ns()}-{os.getpid()}.parquet"
+    tmp = atomic_path(target)
+    df.to_parquet(tmp, index = False, compression = "zstd")
+    os.replace(tmp, target)
+
+def _compact(series_dir, store):
+
+    # merge the parts of a series into one file (same rows). Readers listing both the
+    # new file and the old parts drop the duplicated keys, and list again if an old
+    # part is removed while they read it (see _read_vintages)
+
+    import os
+
+    parts = _vintage_parts(series_dir)
+
+    _write_part(series_dir, store)
+
+    for part in parts:
+        os.remove(part)
+
+def _new_vintages(store, releases):
+
+    # rows of `releases` that are not in the store yet. Rows that only repeat the value
+    # known before (ALFRED restates current values at the start of the requested window)
+    # are dropped
+
+    import pandas as pd
+
+    if len(releases) == 0:
+        return store.iloc[0:0]
+
+    releases = pd.DataFrame({
+        "date" : pd.to_datetime(releases["date"]),
+        "realtime_start" : pd.to_datetime(releases["realtime_start"]),
+        "value" : pd.to_numeric(releases["value"], errors = "coerce").astype("float64")
+    })
+
+    releases = releases.drop_duplicates(subset = ["date", "realtime_start"], keep = "last")
+
+    combined = pd.concat([store.assign(_new = False), releases.assign(_new = True)], ignore_index = True)
+    combined = combined.drop_duplicates(subset = ["date", "realtime_start"], keep = "first")
+    combined = combined.sort_values(["date", "realtime_start"], kind = "stable", ignore_index = True)
+
+    previous = combined.groupby("date")["value"].shift(1)
+    same_date = combined["date"].duplicated()
+    unchanged = same_date & ((combined["value"] == previous) | (combined["value"].isna() & previous.isna()))
+
+    return combined.loc[combined["_new"].to_numpy() & ~unchanged.to_numpy(), VINTAGE_COLUMNS].reset_index(drop = True)
+
+def _fetch_one(client, series, save_dir, limiter, retries):
+
+    import time
+    import pandas as pd
+    from .fetch_fred_api import BACKOFF_SECONDS, _is_retryable
+
+    series_dir = _vintage_dir(series, save_dir)
+    store = _read_vintages(series_dir)
+
+    kwargs = {}
+    if len(store) > 0:
+        kwargs["realtime_start"] = (store["realtime_start"].max() + pd.Timedelta(days = 1)).strftime("%Y-%m-%d")
+
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            releases = client.get_series_all_releases(series, **kwargs)
+            break
+        except Exception as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            time.sleep(BACKOFF_SECONDS * 2 ** attempt)
+
+    new = _new_vintages(store, releases)
+
+    if len(new) > 0:
+        _write_part(series_dir, new)
+        if len(_vintage_parts(series_dir)) > MAX_VINTAGE_PARTS:
+            _compact(series_dir, _read_vintages(series_dir))
+
+    return {"series" : series, "n_new" : len(new), "last_vintage" : pd.concat([store, new])["realtime_start"].max()}
+
+#%%========== main functions ==========%%#
+
+def fetch_fred_vintages(series_list, save_dir = None, client = None, max_workers = DEFAULT_WORKERS, requests_per_minute = FRED_REQUESTS_PER_MINUTE, retries = DEFAULT_RETRIES, silent = False):
+    """
+    Add the new vintages of FRED series to the local store.
+
+    The first call downloads every release of a series (ALFRED). Later calls request
+    only the vintages after the last stored realtime_start and append them as a new
+    parquet part; stored rows are never modified.
+
+    Parameters
+    ----------
+    series_list : str | list
+        FRED series ids.
+    save_dir : str, optional
+        Directory of the store. Defaults to <data path>/fred_api/vintages.
+    client : object, optional
+        Client with a fredapi-like `get_series_all_releases(series_id, realtime_start = None)`
+        returning (realtime_start, date, value) rows. Defaults to `fetch_fred_api.get_client()`.
+    max_workers, requests_per_minute, retries :
+        As in `fetch_fred_api.fetch_fred_series_list`.
+    silent : bool, default False
+        If True, do not print progress.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per series: status, number of new rows, last stored vintage and error.
+    """
+
+    import pandas as pd
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from . import fetch_fred_api
+
+    series_list = [series_list] if isinstance(series_list, str) else list(series_list)
+    client = fetch_fred_api.get_client() if client is None else client
+
+    limiter = fetch_fred_api._RateLimiter(requests_per_minute)
+
+    results = {}
+
+    with ThreadPoolExecutor(max_workers = max_workers) as pool:
+
+        futures = {
+            pool.submit(_fetch_one, client, series, save_dir, limiter, retries) : series
+            for series in dict.fromkeys(series_list)
+        }
+
+        for future in as_completed(futures):
+            series = futures[future]
+            try:
+                results[series] = {**future.result(), "status" : "ok"}
+            except Exception as e:
+                results[series] = {"series" : series, "status" : "failed", "n_new" : 0, "last_vintage" : None, "error" : str(e)}
+            if not silent:
+                print(f"{series}: {results[series]['status']} ({results[series]['n_new']} new vintage rows)")
+
+    return pd.DataFrame([results[series] for series in dict.fromkeys(series_list)], columns = ["series", "status", "n_new", "last_vintage", "error"])
+
+def get_vintages(series, save_dir = None):
+    """
+    Every stored (date, realtime_start, value) row of a series, sorted by date and realtime_start.
+    """
+
+    return _read_vintages(_vintage_dir(series, save_dir)).copy()
+
+def get_asof(series, vintage_date, save_dir = None):
+    """
+    Values of FRED series as they were known on `vintage_date`, from the local store.
+
+    For each observation date, the value with the latest realtime_start on or before
+    `vintage_date` is kept; observations first released after `vintage_date` are absent.
+
+    Parameters
+    ----------
+    series : str | list
+        FRED series id, or list of ids.
+    vintage_date : str | pd.Timestamp
+        Point in time of the query.
+    save_dir : str, optional
+        Directory of the store. Defaults to <data path>/fred_api/vintages.
+
+    Returns
+    -------
+    pd.Series | pd.DataFrame
+        Series indexed by date for one id; DataFrame with one column per id (aligned on
+        the union of their dates) for a list.
+
+    Raises
+    ------
+    FileNotFoundError
+        If a series has no stored vintages.
+    """
+
+    import pandas as pd
+
+    vintage_date = pd.Timestamp(vintage_date)
+    series_list = [series] if isinstance(series, str) else list(series)
+
+    out = {}
+
+    for series_id in series_list:
+
+        store = _read_vintages(_vintage_dir(series_id, save_dir))
+
+        if len(store) == 0:
+            raise FileNotFoundError(f"No stored vintages for series '{series_id}'. Use fetch_fred_vintages first.")
+
+        # rows are sorted by (date, realtime_start): the last known row of each date wins
+
+        known = store[store["realtime_start"].to_numpy() <= vintage_date.to_datetime64()]
+        known = known.drop_duplicates(subset = ["date"], keep = "last")
+
+        out[series_id] = pd.Series(known["value"].to_numpy(), index = pd.DatetimeIndex(known["date"], name = "date"), name = series_id)
+
+    if isinstance(series, str):
+        return out[series]
+
+    return pd.concat(out, axis = 1, sort = True)
+
+__all__ = [
+    "fetch_fred_vintages",
+    "get_vintages",
+    "get_asof"
+]
@@ -61,8 +61,12 @@ class imfBOP:
         pass
 
     @staticmethod
-    def get(subdata, INDICATOR, FREQ, silent = False):
-        return master_upload.get(subdata, INDICATOR, FREQ, silent)
+    def get(subdata, INDICATOR, FREQ, silent = False, use_cache = True, REF_AREA = None, period = None):
+        return master_upload.get(subdata, INDICATOR, FREQ, silent, use_cache, REF_AREA, period)
+
+    @staticmethod
+    def get_many(requests, as_dict = False, n_jobs = -1, silent = False, use_cache = True):
+        return master_upload.get_many(requests, as_dict, n_jobs, silent, use_cache)
     
     @staticmethod
     def check_reporting(
@@ -112,6 +116,31 @@ class imfBOP:
 
         return report_tables
 
+    @staticmethod
+    def scan_reporting(
+        subdata = None,
+        FREQ = None,
+        start_date = None,
+        end_date = None,
+        n_jobs = -1,
+        use_cache = True,
+        silent = False
+    ):
+
+        from pysfo.pulldata.dbnomicstools import dbTools
+
+        return dbTools.scan_reporting(
+            provider = "IMF",
+            dataset = "BOP",
+            subdata = subdata,
+            freq = FREQ,
+            start_date = start_date,
+            end_date = end_date,
+            n_jobs = n_jobs,
+            use_cache = use_cache,
+            silent = silent
+        )
+
 __all__ = [
     "imfBOP"
 ]
\ No newline at end of file
@@ -3,31 +3,38 @@
 def _decompose_indicator_df():
 
     import os
-    from pysfo.pulldata.dbnomicstools.config import get_filters
-    import re
+    from pysfo.pulldata.dbnomicstools.config import get_filters, customization_file
 
-    current_dir = os.path.dirname(__file__)
-    file = [file for file in os.listdir(current_dir) if re.findall(".customization", file)][0]
-    json_metadata_path = os.path.join(current_dir, file)
+    json_metadata_path = customization_file(os.path.dirname(__file__))
     
     indicator_df = get_filters(json_metadata_path, filter = "INDICATOR")
 
     DESC = indicator_df["DESCRIPTION_TEXT"].str.split(",", expand = True)
-    DESC = DESC.apply(lambda col : col.str.strip(), axis = 1)
+    DESC = DESC.apply(lambda col : col.str.strip())
 
     indicator_df[[f"DESCRIPTION_TEXT_{i}" for i, _ in enumerate(DESC, start = 1)]] = DESC
 
     return indicator_df
 
-def _fetch_and_save_series_by_subdata(subdata, save_dir, force_fetch = False):
+def _fetch_and_save_series_by_subdata(subdata, save_dir, force_fetch = False, resume = True, update = False, backend = "joblib"):
 
     import pandas as pd
     import dbnomics as db
     import os
-    from joblib import Parallel, delayed
     from functools import partial
-    from pysfo.pulldata.dbnomicstools.config import get_filters
-    import re
+    from pysfo.pulldata.dbnomicstools.config import get_filters, customization_file
+    from pysfo.pulldata.dbnomicstools.download import (
+        fetch_batches_checkpointed,
+        clear_checkpoints,
+        fetch_series_stamps,
+        update_stored_series,
+        record_series_stamps,
+        plan_batches,
+        read_plan,
+        read_latency
+    )
+    from pysfo.pulldata.dbnomicstools.async_fetch import AsyncFetcher
+    from pysfo.pulldata.dbnomicstools.storage import subdata_file, write_subdata
 
     # import pysfo.pulldata as pysfo_pulldata
     # pysfo_pulldata.set_data_path("D:/Dropbox/80_data/raw")
@@ -36,37 +43,21 @@ def _fetch_and_save_series_by_subdata(subdata, save_dir, force_fetch = False):
     
     #---- helper functions
 
-    def chunk_dimensions_dict(mydict, n):
-
-        not_series_dimensions = {key : val for key, val in mydict.items() if key != "INDICATOR"}
-
-        series = mydict["INDICATOR"]
-
-        chunked = []
-        for i in range(0, len(series), n):
-            chunked.append(series[i:i+n])
-
-        chunked = [{"INDICATOR" : chunk} for chunk in chunked]
-        if len(not_series_dimensions) > 0 :
-            chunked = [
-                {**chunk, **not_series_dimensions}
-            for chunk in chunked]
-
-        return chunked
-
     fetch_partial = partial(
         db.fetch_series,
         provider_code = "IMF",
-        dataset_code = "BOP"
+        dataset_code = "BOP",
+        timeout = 60
     )
 
+    if backend == "async":
+        fetch_partial = AsyncFetcher("IMF", "BOP", timeout = 60)
+
     #---- fetch series main code
 
     subdata_list = [subdata] if isinstance(subdata, str) else subdata
 
-    current_dir = os.path.dirname(__file__)
-    file = [file for file in os.listdir(current_dir) if re.findall(".customization", file)][0]
-    json_metadata_path = os.path.join(current_dir, file)
+    json_metadata_path = customization_file(os.path.dirname(__file__))
 
     frequency_df = get_filters(json_metadata_path, filter = "FREQ")
     ref_area_df = get_filters(json_metadata_path, filter = "REF_AREA")
@@ -82,13 +73,18 @@ def _fetch_and_save_series_by_subdata(subdata, save_dir, force_fetch = False):
     if check:
         raise ValueError("'subdata' not found in the list of available sub-datasets. Please check main series documentation to see what can be retrieved.")
 
+    if not os.path.isdir(save_dir):
+        raise FileNotFoundError(f"Directory to save data does not exist: {save_dir}")
+
     for subdata_ in subdata_list:
 
         dataname = subdata_.replace(" ", "_")
 
-        if os.path.exists(f"{save_dir}/{dataname}.csv") and not force_fetch:
+        exists = subdata_file(save_dir, dataname).exists()
+
+        if exists and not force_fetch and not update:
             
-            print(f"\nData for {dataname} already fetched. Please add flag force_fetch = True if you want new fetch and overwrite current file.")
+            print(f"\nData for {dataname} already fetched. Please add flag force_fetch = True if you want new fetch and overwrite current file, or update = True to fetch only the series updated since.")
 
         else:
             
@@ -107,72 +103,72 @@ def _fetch_and_save_series_by_subdata(subdata, save_dir, force_fetch = False):
             fetch_frequencies = frequency_df.loc[:, "VALUE"].to_list()
             fetch_ref_areas = ref_area_df.loc[:, "VALUE"].to_list()
             
-            get_dimensions = {
-                "INDICATOR" : fetch_indicators,
-            }
-
             max_nb_series_fetched = (
                 len(fetch_ref_areas) 
                 * len(fetch_frequencies) 
                 * len(fetch_indicators)
             )
 
-            try :
-                
-                if max_nb_series_fetched <= 40000:
-                    
-                    df = db.fetch_series(
-                        'IMF', 'IFS',
-                        dimensions = get_dimensions,
-                        max_nb_series = (
-                            len(fetch_ref_areas) 
-                            * len(fetch_frequencies) 
-                            * len(fetch_indicators)
-                        ),
-                        timeout = 60
-                    )
-
-                else :
-                    
-                    # recall n is size of each individual batch.
-
-                    if subdata_ == "Assets":
-                        n = 1
-                    else:
-                        n = 1 # int(len(fetch_indicators) / 10)
-                    dimension_batches = chunk_dimensions_dict(get_dimensions, n)
-                    max_nb_series_batches = [
-                        len(batch["INDICATOR"]) 
-                        * len(fetch_frequencies) 
-                        * len(fetch_indicators)
-                        for batch in dimension_batches
-                    ]
-
-                    batch_job_size = len(dimension_batches)
-
-                    print(f". Running batch job with: {batch_job_size}")
-
-                    results = Parallel(n_jobs = -1, verbose=10)(
-                        delayed(fetch_partial)(
-                            dimensions = dim_batch,
-                            max_nb_series = max_nb_s
-                        ) 
-                        for dim_batch, max_nb_s in zip(dimension_batches, max_nb_series_batches)
-                    )
-
-                    df = pd.concat(results, axis = 0)
-                
-            except Exception as e:
-                
-                df = pd.DataFrame([e])
-                dataname = dataname + "_ERROR"
-
-            df.to_csv(f"{save_dir}/{dataname}.csv")
+            # batches of indicators sized against the max number of series per request;
+            # an interrupted download keeps its plan so that its checkpoints are reused
+
+            plan = read_plan(save_dir, dataname) if resume else None
+
+            if plan is not None:
+
+                dimension_batches, max_nb_series_batches = plan
+
+            else:
+
+                series_per_indicator = len(fetch_ref_areas) * len(fetch_frequencies)
+                indicator_batches = plan_batches(
+                    fetch_indicators,
+                    series_per_value = series_per_indicator,
+                    seconds_per_series = read_latency(save_dir, dataname)
+                )
+                dimension_batches = [{"INDICATOR" : batch} for batch in indicator_batches]
+                max_nb_series_batches = [len(batch) * series_per_indicator for batch in indicator_batches]
+
+            # last-update stamps of all series, only needed here to update the stored file
+
+            stamps = None
+
+            if exists and update and not force_fetch:
+                stamps = fetch_series_stamps("IMF", "BOP", dimension_batches, max_nb_series_batches)
+                if update_stored_series("IMF", "BOP", save_dir, dataname, stamps, backend = backend, partition_cols = ["INDICATOR", "FREQ"]):
+                    continue
+
+            # completed batches are checkpointed: a rerun only fetches the missing or failed ones
+
+            df, errors = fetch_batches_checkpointed(
+                fetch_partial,
+                dimension_batches,
+                max_nb_series_batches,
+                save_dir,
+                dataname,
+                resume = resume,
+                backend = backend
+            )
+
+            if df is None:
+
+                print(f". {len(errors)} batches failed for '{subdata_}'. Run again to fetch only the failed batches.")
+                errors.to_csv(f"{save_dir}/{dataname}_ERROR.csv")
+
+            else:
+
+                write_subdata(df, f"{save_dir}/{dataname}.parquet", partition_cols = ["INDICATOR", "FREQ"])
+                record_series_stamps("IMF", "BOP", save_dir, dataname, dimension_batches, max_nb_series_batches, stamps = stamps)
+                clear_checkpoints(save_dir, dataname)
+
+                if os.path.exists(f"{save_dir}/{dataname}_ERROR.csv"):
+                    os.remove(f"{save_dir}/{dataname}_ERROR.csv")
 
 def _subdata_documentation_fullstr(subdata, base_dir):
 
     import pandas as pd
     import io
+    from pysfo.pulldata.dbnomicstools.storage import read_subdata, subdata_file
 
     #---- helper functions
     
@@ -181,7 +177,13 @@ def _subdata_documentation_fullstr(subdata, base_dir):
 
     #---- main
 
-    df = pd.read_csv(f"{base_dir}/{subdata}.csv", dtype=str)
+    df = read_subdata(
+        subdata_file(base_dir, subdata),
+        partition_cols = ["INDICATOR", "FREQ"],
+        silent = True,
+        columns = ["INDICATOR", "Indicator", "FREQ"]
+    )
+    df = df.drop_duplicates().reset_index(drop = True)
     df = _rename_dataset(df)
     df.columns = df.columns.str.lower()
 
@@ -293,9 +295,9 @@ class dbDownload:
 
         return documentation_string
 
-    def fetch_and_save_series_by_subdata(self, subdata, save_dir, force_fetch = False):
+    def fetch_and_save_series_by_subdata(self, subdata, save_dir, force_fetch = False, resume = True, update = False, backend = "joblib"):
         
-        _fetch_and_save_series_by_subdata(subdata, save_dir, force_fetch)
+        _fetch_and_save_series_by_subdata(subdata, save_dir, force_fetch, resume, update, backend)
     
     def example_code(self):
         
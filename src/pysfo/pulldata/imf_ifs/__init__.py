@@ -61,19 +61,20 @@ class imfIFS:
         pass
 
     @staticmethod
-    def get(subdata, INDICATOR, FREQ, silent = False):
-        return master_upload.get(subdata, INDICATOR, FREQ, silent)
+    def get(subdata, INDICATOR, FREQ, silent = False, use_cache = True, REF_AREA = None, period = None):
+        return master_upload.get(subdata, INDICATOR, FREQ, silent, use_cache, REF_AREA, period)
+
+    @staticmethod
+    def get_many(requests, as_dict = False, n_jobs = -1, silent = False, use_cache = True):
+        return master_upload.get_many(requests, as_dict, n_jobs, silent, use_cache)
     
     @staticmethod
     def get_dbnomics_filters(filter = None):
 
         import os
-        import re
-        from pysfo.pulldata.dbnomicstools import get_filters
+        from pysfo.pulldata.dbnomicstools.config import get_filters, customization_file
 
-        current_dir = os.path.dirname(__file__)
-        file = [file for file in os.listdir(current_dir) if re.findall(".customization", file)][0]
-        json_metadata_path = os.path.join(current_dir, file)
+        json_metadata_path = customization_file(os.path.dirname(__file__))
 
         df_filters = get_filters(json_metadata_path, filter)
 
@@ -122,6 +123,31 @@ class imfIFS:
 
         return report_tables
 
+    @staticmethod
+    def scan_reporting(
+        subdata = None,
+        FREQ = None,
+        start_date = None,
+        end_date = None,
+        n_jobs = -1,
+        use_cache = True,
+        silent = False
+    ):
+
+        from pysfo.pulldata.dbnomicstools import dbTools
+
+        return dbTools.scan_reporting(
+            provider = "IMF",
+            dataset = "IFS",
+            subdata = subdata,
+            freq = FREQ,
+            start_date = start_date,
+            end_date = end_date,
+            n_jobs = n_jobs,
+            use_cache = use_cache,
+            silent = silent
+        )
+
 __all__ = [
     "imfIFS"
 ]
\ No newline at end of file
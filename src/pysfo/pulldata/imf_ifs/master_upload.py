@@ -37,17 +37,16 @@ def _fix_country_identifiers():
 
 #%%========== data retriever ==========%%#
 
-def get(subdata, INDICATOR, FREQ, silent = False):
+def get(subdata, INDICATOR, FREQ, silent = False, use_cache = True, REF_AREA = None, period = None):
 
     import pandas as pd
-    import country_converter as coco
     import numpy as np
     import pysfo.pulldata as pysfo_pull
-    from pysfo.basic import silent_call
+    from pysfo.pulldata.dbnomicstools.storage import read_subdata, subdata_file
+    from pysfo.pulldata.country_ids import resolve_country_ids
     
     # pysfo_pull.set_data_path("D:/Dropbox/80_data/raw")
     
-    cc = coco.CountryConverter()
     imf_ifs_dir = pysfo_pull.get_data_path() / "imf_ifs"
     
     INDICATOR = [INDICATOR] if type(INDICATOR) == str else INDICATOR
@@ -56,7 +55,14 @@ def get(subdata, INDICATOR, FREQ, silent = False):
 
     subdata = subdata.replace(" ", "_")
 
-    df = pd.read_csv(f"{imf_ifs_dir}/{subdata}.csv", dtype = str)
+    df = read_subdata(
+        subdata_file(imf_ifs_dir, subdata),
+        filters = {"INDICATOR" : INDICATOR, "FREQ" : FREQ, "REF_AREA" : REF_AREA},
+        partition_cols = ["INDICATOR", "FREQ"],
+        use_cache = use_cache,
+        silent = silent,
+        period = period
+    )
     df = _rename_dataset(df)
     df.columns = df.columns.str.lower()
     df.columns = df.columns.str.replace(" ", "_")
@@ -145,13 +151,19 @@ def get(subdata, INDICATOR, FREQ, silent = False):
     for old, new in rename_ctyname_to_iso2.items():
         df["cty_iso2"] = np.where(df["country_label"] == old, new, df["cty_iso2"])
 
-    df["cty_iso3"] = silent_call(cc.pandas_convert, series=df["cty_name"], to='ISO3', verbose = not silent)
-    
-    for old, new in rename_ctyname_to_iso3.items():
-        df["cty_iso3"] = np.where(df["cty_name"] == old, new, df["cty_iso3"])
+    # iso3 and short names are resolved once per unique name, with overrides folded in
 
-    for old, new in rename_ctyname_long_to_short.items():
-        df["cty_name"] = np.where(df["cty_name"] == old, new, df["cty_name"])
+    cty_ids = resolve_country_ids(
+        df["cty_name"],
+        to = ["ISO3", "name"],
+        overrides = {
+            "ISO3" : rename_ctyname_to_iso3,
+            "name" : rename_ctyname_long_to_short
+        },
+        silent = silent
+    )
+    df["cty_iso3"] = cty_ids["ISO3"]
+    df["cty_name"] = cty_ids["name"]
 
     # Leave this as future check.
     # df[["reference_area", "cty_name", "cty_iso2", "cty_iso3"]].drop_duplicates().sort_values(by = ["reference_area"]).to_csv(f"{temp}/check.csv")
@@ -190,13 +202,19 @@ def get(subdata, INDICATOR, FREQ, silent = False):
     if True in df[["period", "ref_area", "indicator"]].duplicated().values:
         raise ValueError(f"Duplicates found while cleaning {subdata}. Please check.")
 
-    # set final formats
+    return df
 
-    df["value"] = pd.to_numeric(df["value"], errors = "coerce")
-    df["period"] = pd.to_datetime(df["period"], errors = "coerce")
+def get_many(requests, as_dict = False, n_jobs = -1, silent = False, use_cache = True):
+    """
+    Load several (subdata, INDICATOR, FREQ) requests with one read per subdata file and FREQ list.
+    See `pysfo.pulldata.dbnomicstools.batch.get_many`.
+    """
 
-    return df
+    from pysfo.pulldata.dbnomicstools.batch import get_many as _get_many
+
+    return _get_many(get, requests, as_dict, n_jobs, silent, use_cache)
 
 __all__ = [
-    "get"
+    "get",
+    "get_many"
 ]
\ No newline at end of file
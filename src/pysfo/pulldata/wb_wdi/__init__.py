@@ -61,8 +61,8 @@ class wbWDI:
         pass
 
     @staticmethod
-    def get(indicator, frequency = None, silent = False):
-        return master_upload.get(indicator, frequency, silent)
+    def get(indicator, frequency = None, silent = False, use_cache = True, country = None, period = None):
+        return master_upload.get(indicator, frequency, silent, use_cache, country, period)
 
 __all__ = [
     "wbWDI"
@@ -38,22 +38,28 @@ def _fix_country_identifiers():
 
 #%%========== data retriever ==========%%#
 
-def get(indicator, frequency = None, silent = False):
+def get(indicator, frequency = None, silent = False, use_cache = True, country = None, period = None):
 
     import pandas as pd
-    import country_converter as coco
     import numpy as np
     import pysfo.pulldata as pysfo_pull
-    from pysfo.basic import silent_call
+    from pysfo.pulldata.dbnomicstools.storage import read_subdata, subdata_file
+    from pysfo.pulldata.country_ids import resolve_country_ids
 
     # pysfo_pull.set_data_path("D:/Dropbox/80_data/raw")
     
-    cc = coco.CountryConverter()
     wb_wdi_dir = pysfo_pull.get_data_path() / "wb_wdi"
 
     # subdata = subdata.replace(" ", "_")
 
-    df = pd.read_csv(f"{wb_wdi_dir}/{indicator}.csv", dtype = str)
+    df = read_subdata(
+        subdata_file(wb_wdi_dir, indicator),
+        filters = {"indicator" : indicator, "frequency" : frequency, "country" : country},
+        partition_cols = ["indicator", "frequency"],
+        use_cache = use_cache,
+        silent = silent,
+        period = period
+    )
     df = _rename_dataset(df)
     df.columns = df.columns.str.lower()
     df.columns = df.columns.str.replace(" ", "_")
@@ -148,10 +154,14 @@ def get(indicator, frequency = None, silent = False):
         mask = df["country_label"] == old
         df["country_label"] = np.where(mask, new, df["country_label"])
 
-    df["cty_iso2"] = silent_call(cc.pandas_convert, series=df["country_label"], to='ISO2', verbose = not silent)
+    # iso2 is resolved once per unique name, with overrides folded in
 
-    for old, new in rename_ctyname_to_iso2.items():
-        df["cty_iso2"] = np.where(df["country_label"] == old, new, df["cty_iso2"])
+    df["cty_iso2"] = resolve_country_ids(
+        df["country_label"],
+        to = "ISO2",
+        overrides = {"ISO2" : rename_ctyname_to_iso2},
+        silent = silent
+    )
 
     for old, new in rename_ctyname_to_iso3.items():
         df["cty_iso3"] = np.where(df["country_label"] == old, new, df["cty_iso3"])
@@ -194,11 +204,6 @@ def get(indicator, frequency = None, silent = False):
     if True in df[["period", "country", "indicator"]].duplicated().values:
         raise ValueError(f"Duplicates found while cleaning {indicator}. Please check.")
 
-    # set final formats
-
-    df["value"] = pd.to_numeric(df["value"], errors = "coerce")
-    df["period"] = pd.to_datetime(df["period"], errors = "coerce")
-
     return df
 
 __all__ = [
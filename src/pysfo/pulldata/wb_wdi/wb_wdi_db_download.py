@@ -3,48 +3,53 @@
 def _decompose_indicator_df():
 
     import os
-    from pysfo.pulldata.dbnomicstools.config import get_filters
-    import re
+    from pysfo.pulldata.dbnomicstools.config import get_filters, customization_file
 
-    current_dir = os.path.dirname(__file__)
-    file = [file for file in os.listdir(current_dir) if re.findall(".customization", file)][0]
-    json_metadata_path = os.path.join(current_dir, file)
+    json_metadata_path = customization_file(os.path.dirname(__file__))
     
     indicator_df = get_filters(json_metadata_path, filter = "indicator")
 
     DESC = indicator_df["DESCRIPTION_TEXT"].str.split(",", expand = True)
-    DESC = DESC.apply(lambda col : col.str.strip(), axis = 1)
+    DESC = DESC.apply(lambda col : col.str.strip())
 
     indicator_df[[f"DESCRIPTION_TEXT_{i}" for i, _ in enumerate(DESC, start = 1)]] = DESC
 
     return indicator_df
 
-def _fetch_and_save_series_all_ctys(indicator_list, save_dir, force_fetch = False):
+def _fetch_and_save_series_all_ctys(indicator_list, save_dir, force_fetch = False, update = False, backend = "joblib"):
 
     import pandas as pd
     import dbnomics as db
     import os
     from joblib import Parallel, delayed
     from functools import partial
-    from pysfo.pulldata.dbnomicstools.config import get_filters
+    from pysfo.pulldata.dbnomicstools.config import get_filters, customization_file
     from pysfo.basic import flatten_list
+    from pysfo.pulldata.dbnomicstools.download import (
+        fetch_series_stamps,
+        update_stored_series,
+        write_stamps,
+        plan_batches,
+        report_latency,
+        _check_backend
+    )
+    from pysfo.pulldata.dbnomicstools.async_fetch import AsyncFetcher
+    from pysfo.pulldata.dbnomicstools.storage import subdata_file, write_subdata
     import re
 
     # set arguments
 
+    _check_backend(backend)
+
     indicator_list = [indicator_list] if isinstance(indicator_list, str) else indicator_list
     
     #---- helper functions
 
-    def chunk_series_to_fetch_list(list_of_series_to_fetch, n):
-
-        chunked = []
-        for i in range(0, len(list_of_series_to_fetch), n):
-            chunked.append(list_of_series_to_fetch[i:i+n])
+    def _fetch_wb_wdi(series_list):
 
-        return chunked
+        import time
 
-    def _fetch_wb_wdi(series_list):
+        start = time.perf_counter()
         
         fetched_list = []
         for series in series_list:
@@ -58,13 +63,11 @@ def _fetch_and_save_series_all_ctys(indicator_list, save_dir, force_fetch = Fals
 
         fetched_list = {k: v for d in fetched_list for k, v in d.items()}
             
-        return fetched_list
+        return fetched_list, time.perf_counter() - start
 
     #---- fetch series main code
 
-    current_dir = os.path.dirname(__file__)
-    file = [file for file in os.listdir(current_dir) if re.findall(".customization", file)][0]
-    json_metadata_path = os.path.join(current_dir, file)
+    json_metadata_path = customization_file(os.path.dirname(__file__))
 
     frequency_df = get_filters(json_metadata_path, filter = "frequency")
     ref_area_df = get_filters(json_metadata_path, filter = "country")
@@ -73,12 +76,33 @@ def _fetch_and_save_series_all_ctys(indicator_list, save_dir, force_fetch = Fals
     fetch_ref_areas = ref_area_df.loc[:, "VALUE"].to_list()
 
     check_existence = [
-        os.path.exists(f"{save_dir}/{indicator}.csv") and not force_fetch for indicator in indicator_list
+        subdata_file(save_dir, indicator).exists() and not force_fetch for indicator in indicator_list
     ]
 
+    # last-update stamps of all series: used to update stored files, and recorded after a full fetch
+
+    try :
+
+        stamps_by_ind = {
+            ind : fetch_series_stamps(
+                'WB', 'WDI',
+                [{"indicator" : [ind]}],
+                [len(fetch_frequencies) * len(fetch_ref_areas)]
+            )
+            for exists, ind in zip(check_existence, indicator_list) if update or not exists
+        }
+
+    except Exception as e:
+
+        raise ValueError(f"Error fetching last-update stamps of series {indicator_list}") from e
+
     for exists, _ind in zip(check_existence, indicator_list):
-        if exists:
-            print(f"\nData for {_ind} already fetched. Removing from final fetch list. Please add flag force_fetch = True if you want new fetch and overwrite current file.")
+        if exists and update:
+            print(f"\nUpdating series '{_ind}'")
+            if update_stored_series('WB', 'WDI', save_dir, _ind, stamps_by_ind[_ind], values_as_str = True, backend = backend, partition_cols = ["indicator", "frequency"]):
+                indicator_list = [ind for ind in indicator_list if ind != _ind]
+        elif exists:
+            print(f"\nData for {_ind} already fetched. Removing from final fetch list. Please add flag force_fetch = True if you want new fetch and overwrite current file, or update = True to fetch only the series updated since.")
             indicator_list = [ind for ind in indicator_list if ind != _ind]
 
     if len(indicator_list) == 0:
@@ -107,15 +131,38 @@ def _fetch_and_save_series_all_ctys(indicator_list, save_dir, force_fetch = Fals
 
     try :
 
-        n = int(len(list_of_series_to_fetch) / 100)
-        batches = chunk_series_to_fetch_list(list_of_series_to_fetch, n)
+        if backend == "async":
 
-        results = Parallel(n_jobs = -1, verbose=10)(
-            delayed(_fetch_wb_wdi)(batch) 
-            for batch in batches
-        )
+            # one request per series, all sharing a pooled session
+
+            latencies = []
+
+            results = AsyncFetcher('WB', 'WDI', timeout = 60).fetch_many(
+                [{"series_code" : series} for series in list_of_series_to_fetch],
+                on_result = lambda i, result, seconds : latencies.append((list_of_series_to_fetch[i], seconds, 1))
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+
+            report_latency(latencies, label = "series")
+
+            final_dict = dict(zip(list_of_series_to_fetch, results))
+
+        else:
+
+            # series are fetched one by one: batches only need to balance work across workers
+
+            batches = plan_batches(list_of_series_to_fetch, min_nb_series = 1)
+
+            results = Parallel(n_jobs = -1, verbose=10)(
+                delayed(_fetch_wb_wdi)(batch) 
+                for batch in batches
+            )
+
+            report_latency([(i, seconds, len(batch)) for i, (batch, (_, seconds)) in enumerate(zip(batches, results))])
 
-        final_dict = {k: v for d in results for k, v in d.items()}
+            final_dict = {k: v for d, _ in results for k, v in d.items()}
 
         data_by_series = {
             ind : {
@@ -126,10 +173,11 @@ def _fetch_and_save_series_all_ctys(indicator_list, save_dir, force_fetch = Fals
 
         for series, data_dict in data_by_series.items():
 
-            data_df_list = [df.astype(str) for df in data_dict.values()]
+            data_df_list = [df for df in data_dict.values() if len(df) > 0]
             data_df = pd.concat(data_df_list, axis = 0)
 
-            data_df = data_df.to_csv(f"{save_dir}/{series}.csv")
+            write_subdata(data_df, f"{save_dir}/{series}.parquet", partition_cols = ["indicator", "frequency"])
+            write_stamps(save_dir, series, stamps_by_ind[series])
     
     except Exception as e:
         
@@ -175,9 +223,9 @@ class dbDownload:
 
         return result_str
     
-    def fetch_and_save_series_all_ctys(self, indicator_list, save_dir, force_fetch = False):
+    def fetch_and_save_series_all_ctys(self, indicator_list, save_dir, force_fetch = False, update = False, backend = "joblib"):
         
-        _fetch_and_save_series_all_ctys(indicator_list, save_dir, force_fetch)
+        _fetch_and_save_series_all_ctys(indicator_list, save_dir, force_fetch, update, backend)
     
     def example_code(self):
 
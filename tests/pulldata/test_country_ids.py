@@ -0,0 +1,31 @@
+import pytest
+import pysfo.pulldata as pysfo_pull
+
+#--- country identifiers resolved once per unique name
+
+def test_resolve_country_ids(tmp_path, monkeypatch):
+
+    print("\n#===== Try country ids resolution =====#\n")
+
+    import pandas as pd
+    import country_converter as coco
+    from pysfo.pulldata import config, country_ids
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(country_ids, "_LOOKUP", None)
+
+    names = pd.Series(["Germany", "France", None, "Foo land", "Germany", "Eurozone"] * 3)
+
+    resolved = pysfo_pull.country_ids.resolve_country_ids(
+        names,
+        to = ["ISO3", "name"],
+        overrides = {"ISO3" : {"Eurozone" : "EMU"}},
+        silent = True
+    )
+    expected = coco.CountryConverter().pandas_convert(series = names, to = "ISO3")
+    expected[names == "Eurozone"] = "EMU"
+
+    assert resolved["ISO3"].tolist() == expected.tolist()
+    assert resolved["name"].equals(names.astype(object))
+    assert (tmp_path / "_cache" / "country_ids.parquet").exists()
+    print(resolved.head(4))
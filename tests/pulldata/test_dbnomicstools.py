@@ -0,0 +1,801 @@
+#%%========== packages ==========%%#
+
+import pandas as pd
+import pytest
+import pysfo.pulldata as pysfo_pull
+
+#%%========== helper functions ==========%%#
+
+def _fake_subdata_csv(path):
+
+    periods = pd.date_range("2000-01-01", periods = 8, freq = "QS").strftime("%Y-%m-%d")
+    rows = [
+        {
+            "FREQ" : freq,
+            "REF_AREA" : cty,
+            "INDICATOR" : ind,
+            "Reference Area" : cty_name,
+            "Indicator" : f"Fake subdata, {ind}",
+            "period" : period,
+            "value" : str(i),
+        }
+        for ind in ["IND_A", "IND_B", "IND_C"]
+        for freq in ["A", "Q"]
+        for cty, cty_name in [("US", "United States"), ("DE", "Germany")]
+        for i, period in enumerate(periods)
+    ]
+    pd.DataFrame(rows).to_csv(path)
+
+#%%========== tests ==========%%#
+
+#--- dbnomics subdata parquet cache
+
+def test_read_subdata_cache(tmp_path):
+    test_message = "TRY DBNOMICS SUBDATA CACHE"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    csv_path = tmp_path / "Fake_Subdata.csv"
+    _fake_subdata_csv(csv_path)
+
+    filters = {"INDICATOR" : ["IND_B"], "FREQ" : "Q"}
+
+    from_csv = pysfo_pull.dbnomicstools.read_subdata(csv_path, filters, use_cache = False)
+    from_cache = pysfo_pull.dbnomicstools.read_subdata(csv_path, filters)
+
+    assert (tmp_path / "_cache" / "Fake_Subdata.parquet").exists()
+    assert len(from_cache) == 16
+    assert set(from_cache["INDICATOR"]) == {"IND_B"}
+    assert from_cache["value"].dtype == "float64"
+    pd.testing.assert_frame_equal(
+        from_cache.sort_values(["REF_AREA", "period"]).reset_index(drop = True),
+        from_csv.sort_values(["REF_AREA", "period"]).reset_index(drop = True),
+        check_dtype = False
+    )
+
+    # cache is rebuilt when the source file changes
+
+    pd.read_csv(csv_path, index_col = 0).head(4).to_csv(csv_path)
+    from_cache = pysfo_pull.dbnomicstools.read_subdata(csv_path, {"INDICATOR" : "IND_A"})
+
+    assert len(from_cache) == 4
+    print(from_cache.head(4))
+
+#--- memoized .customization filters
+
+def test_get_filters_memoized():
+    test_message = "TRY MEMOIZED DBNOMICS FILTERS"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    import os
+    from pysfo.pulldata.dbnomicstools.config import _extract_filters_from_json
+
+    json_metadata_path = pysfo_pull.dbnomicstools.customization_file(
+        os.path.dirname(pysfo_pull.imf_ifs.__file__)
+    )
+
+    ref_areas = pysfo_pull.dbnomicstools.get_filters(json_metadata_path, filter = "REF_AREA")
+    ref_areas["VALUE"] = "modified by caller"
+
+    parsed = _extract_filters_from_json(json_metadata_path)
+    pd.testing.assert_frame_equal(
+        pysfo_pull.dbnomicstools.get_filters(json_metadata_path, filter = "REF_AREA"),
+        parsed.loc[parsed["ID"] == "REF_AREA", :]
+    )
+    print(ref_areas.head(4))
+
+#--- dbnomics subdata streaming reader with predicates
+
+def test_read_subdata_predicates(tmp_path):
+    test_message = "TRY DBNOMICS SUBDATA PREDICATE PUSHDOWN"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    csv_path = tmp_path / "Fake_Subdata.csv"
+    _fake_subdata_csv(csv_path)
+
+    filters = {"INDICATOR" : ["IND_A", "IND_C"], "FREQ" : "A", "REF_AREA" : "DE"}
+    period = ("2000-07-01", "2001-03-31")
+
+    streamed = pysfo_pull.dbnomicstools.read_subdata(csv_path, filters, use_cache = False, period = period)
+    from_cache = pysfo_pull.dbnomicstools.read_subdata(csv_path, filters, use_cache = True, period = period)
+
+    assert len(streamed) == 6
+    assert set(streamed["REF_AREA"]) == {"DE"}
+    assert streamed["period"].between(*pd.to_datetime(period)).all()
+    pd.testing.assert_frame_equal(
+        streamed.sort_values(["INDICATOR", "period"]).reset_index(drop = True),
+        from_cache.sort_values(["INDICATOR", "period"]).reset_index(drop = True),
+        check_dtype = False
+    )
+    print(streamed.head(4))
+
+#--- typed compact parquet written by the downloaders
+
+def test_write_subdata(tmp_path):
+    test_message = "TRY DBNOMICS TYPED PARQUET STORAGE"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    csv_path = tmp_path / "Fake_Subdata.csv"
+    _fake_subdata_csv(csv_path)
+
+    downloaded = pd.read_csv(csv_path, index_col = 0)
+    pysfo_pull.dbnomicstools.write_subdata(downloaded, tmp_path / "Fake_Subdata.parquet", partition_cols = ["INDICATOR", "FREQ"])
+
+    stored = pysfo_pull.dbnomicstools.subdata_file(tmp_path, "Fake_Subdata")
+    assert stored.suffix == ".parquet"
+    assert stored.stat().st_size < csv_path.stat().st_size
+
+    filters = {"INDICATOR" : "IND_C", "FREQ" : "Q"}
+    from_parquet = pysfo_pull.dbnomicstools.read_subdata(stored, filters, period = ("2000-07-01", None))
+    from_csv = pysfo_pull.dbnomicstools.read_subdata(csv_path, filters, use_cache = False, period = ("2000-07-01", None))
+
+    assert not (tmp_path / "_cache").exists()
+    assert len(from_parquet) == 12
+    assert from_parquet["value"].dtype == "float64"
+    assert pd.api.types.is_datetime64_any_dtype(from_parquet["period"])
+    pd.testing.assert_frame_equal(
+        from_parquet.sort_values(["REF_AREA", "period"]).reset_index(drop = True),
+        from_csv.sort_values(["REF_AREA", "period"]).reset_index(drop = True),
+        check_dtype = False
+    )
+
+    labels = pysfo_pull.dbnomicstools.read_subdata(stored, columns = ["INDICATOR", "Indicator"]).drop_duplicates()
+    assert len(labels) == 3
+    print(from_parquet.head(4))
+
+#--- batch loader over several subdata files
+
+def _fake_get(subdata, INDICATOR, FREQ, silent = False, use_cache = True):
+
+    import pysfo.pulldata as pysfo_pull
+
+    df = pysfo_pull.dbnomicstools.read_subdata(
+        pysfo_pull.get_data_path() / f"{subdata}.csv",
+        filters = {"INDICATOR" : INDICATOR, "FREQ" : FREQ},
+        use_cache = use_cache,
+        silent = silent
+    )
+    df = df.drop(columns = ["Indicator"])
+    df.columns = df.columns.str.lower()
+
+    return df
+
+def test_get_many(tmp_path, monkeypatch):
+    test_message = "TRY DBNOMICS BATCH LOADER"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    from pysfo.pulldata import config
+    from pysfo.pulldata.dbnomicstools.batch import get_many
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+
+    _fake_subdata_csv(tmp_path / "Fake_Subdata.csv")
+    _fake_subdata_csv(tmp_path / "Other_Subdata.csv")
+
+    requests = [
+        ("Fake Subdata", ["IND_A", "IND_B"], "Q"),
+        ("Other Subdata", "IND_C", ["A", "Q"]),
+        ("Fake Subdata", "IND_B", "Q"),
+    ]
+
+    by_request = get_many(_fake_get, requests, as_dict = True, n_jobs = 2, silent = True)
+
+    assert list(by_request.keys()) == [
+        ("Fake Subdata", ("IND_A", "IND_B"), "Q"),
+        ("Other Subdata", "IND_C", ("A", "Q")),
+        ("Fake Subdata", "IND_B", "Q"),
+    ]
+    for (subdata, INDICATOR, FREQ), df in by_request.items():
+        expected = _fake_get(subdata.replace(" ", "_"), list(INDICATOR) if isinstance(INDICATOR, tuple) else [INDICATOR], list(FREQ) if isinstance(FREQ, tuple) else [FREQ])
+        assert len(df) == len(expected)
+        assert set(df["indicator"]) == set(expected["indicator"])
+
+    long = get_many(_fake_get, requests, n_jobs = 2, silent = True)
+
+    assert len(long) == 32 + 32
+    assert set(long["subdata"]) == {"Fake Subdata", "Other Subdata"}
+    print(long.groupby(["subdata", "indicator", "freq"]).size())
+
+#--- checkpointed batch downloads
+
+def _fake_fetch(dimensions, max_nb_series, log_path = None, fail = ()):
+
+    with open(log_path, "a") as f:
+        f.write(f"{dimensions['INDICATOR'][0]}\n")
+
+    if dimensions["INDICATOR"][0] in fail:
+        raise ConnectionError("transient error")
+
+    return pd.DataFrame({"INDICATOR" : dimensions["INDICATOR"], "value" : range(len(dimensions["INDICATOR"]))})
+
+def test_fetch_batches_checkpointed(tmp_path):
+    test_message = "TRY CHECKPOINTED DBNOMICS DOWNLOADS"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    from functools import partial
+    from pysfo.pulldata.dbnomicstools.download import fetch_batches_checkpointed, clear_checkpoints, checkpoint_dir
+
+    log_path = tmp_path / "calls.log"
+    batches = [{"INDICATOR" : [f"IND_{i}", f"IND_{i}_X"]} for i in range(4)]
+    max_nb_series = [2] * 4
+
+    df, errors = fetch_batches_checkpointed(
+        partial(_fake_fetch, log_path = log_path, fail = ("IND_2",)),
+        batches, max_nb_series, tmp_path, "Fake_Subdata", n_jobs = 1
+    )
+
+    assert df is None
+    assert errors["batch"].tolist() == [list(checkpoint_dir(tmp_path, "Fake_Subdata").glob("*.error"))[0].stem]
+
+    # rerun only fetches the failed batch
+
+    df, errors = fetch_batches_checkpointed(
+        partial(_fake_fetch, log_path = log_path),
+        batches, max_nb_series, tmp_path, "Fake_Subdata", n_jobs = 1
+    )
+
+    assert log_path.read_text().split() == ["IND_0", "IND_1", "IND_2", "IND_3", "IND_2"]
+    assert len(errors) == 0
+    assert df["INDICATOR"].tolist() == [ind for batch in batches for ind in batch["INDICATOR"]]
+
+    clear_checkpoints(tmp_path, "Fake_Subdata")
+    assert not (tmp_path / "_checkpoints").exists()
+    print(df)
+
+#--- delta refresh of stored series
+
+def test_update_stored_series(tmp_path, monkeypatch):
+    test_message = "TRY DBNOMICS DELTA REFRESH"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    from pysfo.pulldata.dbnomicstools import download
+
+    stored = pd.DataFrame({
+        "series_code" : ["A.US.X", "A.US.X", "A.DE.X", "A.FR.X"],
+        "period" : ["2000-01-01", "2001-01-01", "2000-01-01", "2000-01-01"],
+        "value" : ["1.0", "NA", "2.0", "3.0"],
+    })
+    stored.to_csv(tmp_path / "Fake_Subdata.csv")
+
+    old_stamps = pd.DataFrame({"series_code" : ["A.US.X", "A.DE.X", "A.FR.X"], "indexed_at" : ["t0", "t0", "t0"]})
+    download.write_stamps(tmp_path, "Fake_Subdata", old_stamps)
+
+    fetched_ids = []
+
+    def _fake_fetch_series_ids(series_ids, timeout = 60):
+        fetched_ids.extend(series_ids)
+        return pd.DataFrame({
+            "series_code" : [series_id.split("/")[-1] for series_id in series_ids],
+            "period" : "2000-01-01",
+            "value" : 9.0,
+        })
+
+    monkeypatch.setattr(download, "_fetch_series_ids", _fake_fetch_series_ids)
+
+    # A.DE.X updated, A.JP.X new, A.FR.X removed, A.US.X unchanged
+
+    new_stamps = pd.DataFrame({"series_code" : ["A.US.X", "A.DE.X", "A.JP.X"], "indexed_at" : ["t0", "t1", "t1"]})
+    assert download.update_stored_series("IMF", "IFS", tmp_path, "Fake_Subdata", new_stamps, n_jobs = 1)
+
+    updated = pd.read_csv(tmp_path / "Fake_Subdata.csv", index_col = 0, keep_default_na = False)
+
+    assert fetched_ids == ["IMF/IFS/A.DE.X", "IMF/IFS/A.JP.X"]
+    assert updated["series_code"].tolist() == ["A.US.X", "A.US.X", "A.DE.X", "A.JP.X"]
+    assert updated["value"].tolist() == ["1.0", "NA", "9.0", "9.0"]
+    assert download.read_stamps(tmp_path, "Fake_Subdata") == {"A.US.X" : "t0", "A.DE.X" : "t1", "A.JP.X" : "t1"}
+
+    # nothing to fetch when stamps are unchanged
+
+    fetched_ids.clear()
+    assert download.update_stored_series("IMF", "IFS", tmp_path, "Fake_Subdata", new_stamps, n_jobs = 1)
+    assert fetched_ids == []
+    print(updated)
+
+    # stamps of a full fetch are recorded best-effort: a failing metadata pass keeps the data
+
+    def _failing_stamps(*args, **kwargs):
+        raise OSError("connection reset")
+
+    monkeypatch.setattr(download, "fetch_series_stamps", _failing_stamps)
+
+    assert download.record_series_stamps("IMF", "IFS", tmp_path, "Other_Subdata", [{"INDICATOR" : ["X"]}], [1]) is None
+    assert download.read_stamps(tmp_path, "Other_Subdata") is None
+
+    download.record_series_stamps("IMF", "IFS", tmp_path, "Other_Subdata", [{"INDICATOR" : ["X"]}], [1], stamps = new_stamps)
+    assert download.read_stamps(tmp_path, "Other_Subdata") == {"A.US.X" : "t0", "A.DE.X" : "t1", "A.JP.X" : "t1"}
+
+#--- batch planner
+
+def test_plan_batches():
+    test_message = "TRY DBNOMICS BATCH PLANNER"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    from pysfo.pulldata.dbnomicstools.download import plan_batches
+
+    indicators = [f"IND_{i}" for i in range(1000)]
+
+    # each indicator expands to 800 series: at most 50 indicators per 40000-series request
+
+    batches = plan_batches(indicators, series_per_value = 800, n_jobs = 1)
+    assert [ind for batch in batches for ind in batch] == indicators
+    assert max(len(batch) for batch in batches) * 800 <= 40_000
+    assert max(len(batch) for batch in batches) - min(len(batch) for batch in batches) <= 1
+
+    # small lists never give empty batches, and are split across workers
+
+    assert plan_batches(["IND_0", "IND_1"], series_per_value = 10, n_jobs = 1) == [["IND_0", "IND_1"]]
+    assert len(plan_batches(indicators[:40], min_nb_series = 1, n_jobs = 2)) == 8
+
+    # slow series (from previous runs) give smaller batches
+
+    slow = plan_batches(indicators, series_per_value = 800, n_jobs = 1, seconds_per_series = 0.05)
+    assert max(len(batch) for batch in slow) * 800 * 0.05 <= 300
+    print([len(batch) for batch in batches], [len(batch) for batch in slow])
+
+#--- async fetch backend against a local dbnomics stub
+
+def _stub_dbnomics_server(fail_first = 0):
+
+    import json
+    import threading
+    import urllib.parse
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    # replay of a dbnomics /series answer (IMF/IFS, pages of 2 series)
+
+    dataset = {
+        "code" : "IFS",
+        "name" : "International Financial Statistics",
+        "dimensions_codes_order" : ["FREQ", "REF_AREA", "INDICATOR"],
+        "dimensions_labels" : {"FREQ" : "Frequency", "REF_AREA" : "Reference Area", "INDICATOR" : "Indicator"},
+        "dimensions_values_labels" : {
+            "FREQ" : {"A" : "Annual"},
+            "REF_AREA" : {"US" : "United States", "DE" : "Germany", "FR" : "France"},
+            "INDICATOR" : {"IND_A" : "Fake subdata, IND_A"},
+        },
+    }
+    docs = [
+        {
+            "@frequency" : "annual",
+            "provider_code" : "IMF",
+            "dataset_code" : "IFS",
+            "dataset_name" : "International Financial Statistics",
+            "series_code" : f"A.{cty}.IND_A",
+            "series_name" : f"Annual - {cty} - IND_A",
+            "period" : ["2000", "2001", "2002"],
+            "period_start_day" : ["2000-01-01", "2001-01-01", "2002-01-01"],
+            "value" : [1.5, "NA", 2.5],
+            "dimensions" : {"FREQ" : "A", "REF_AREA" : cty, "INDICATOR" : "IND_A"},
+            "indexed_at" : "2024-01-01T00:00:00Z",
+        }
+        for cty in ["US", "DE", "FR"]
+    ]
+    calls = {"n" : 0}
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            calls["n"] += 1
+            if calls["n"] <= fail_first:
+                self.send_response(503)
+                self.end_headers()
+                return
+            offset = int(urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query).get("offset", ["0"])[0])
+            body = json.dumps({
+                "dataset" : dataset,
+                "series" : {"num_found" : len(docs), "offset" : offset, "limit" : 2, "docs" : docs[offset:offset + 2]},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v22/", calls
+
+def test_async_fetcher(monkeypatch):
+    test_message = "TRY DBNOMICS ASYNC FETCH BACKEND"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    import dbnomics as db
+    from pysfo.pulldata.dbnomicstools import async_fetch
+
+    monkeypatch.setattr(async_fetch, "BACKOFF_SECONDS", 0.01)
+
+    server, api_base_url, calls = _stub_dbnomics_server(fail_first = 2)
+
+    try:
+        fetcher = async_fetch.AsyncFetcher("IMF", "IFS", concurrency = 4, api_base_url = api_base_url)
+        dimensions = {"INDICATOR" : ["IND_A"]}
+
+        # the first two answers are 503: retried with backoff
+
+        results = fetcher.fetch_many([{"dimensions" : dimensions, "max_nb_series" : 10}] * 3)
+        expected = db.fetch_series("IMF", "IFS", dimensions = dimensions, max_nb_series = 10, api_base_url = api_base_url)
+
+        for df in results:
+            pd.testing.assert_frame_equal(df, expected)
+
+        # max_nb_series truncates as in dbnomics
+
+        assert len(fetcher(dimensions = dimensions, max_nb_series = 1)) == 3
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # errors are returned per request
+
+    import requests
+
+    fetcher = async_fetch.AsyncFetcher("IMF", "IFS", retries = 0, api_base_url = api_base_url)
+    assert isinstance(fetcher.fetch_many([{"dimensions" : dimensions, "max_nb_series" : 10}])[0], requests.ConnectionError)
+    print(expected)
+
+#--- cached GDP skeleton of reporting checks
+
+def _fake_wdi_gdp(wb_wdi_dir):
+
+    import os
+    import country_converter as coco
+
+    ref_areas = pysfo_pull.dbnomicstools.get_filters(
+        pysfo_pull.dbnomicstools.customization_file(os.path.dirname(pysfo_pull.imf_ifs.__file__)),
+        filter = "REF_AREA"
+    )
+    ref_areas = ref_areas[ref_areas["VALUE"].str.fullmatch("[A-Z]{2}")]
+    ref_areas["iso3"] = coco.convert(ref_areas["VALUE"].to_list(), src = "ISO2", to = "ISO3", not_found = None)
+    ref_areas = ref_areas[ref_areas["iso3"].map(lambda x : isinstance(x, str))]
+    ref_areas = ref_areas.drop_duplicates(subset = "iso3").drop_duplicates(subset = "DESCRIPTION_TEXT")
+
+    rows = [
+        {
+            "series_code" : f"A-NY.GDP.MKTP.CD-{iso3}",
+            "period" : f"{year}-01-01",
+            "value" : float(i + year),
+            "frequency" : "A",
+            "country" : iso3,
+            "indicator" : "NY.GDP.MKTP.CD",
+            "country (label)" : name,
+            "indicator (label)" : "GDP (current US$)",
+        }
+        for i, (iso3, name) in enumerate(zip(ref_areas["iso3"], ref_areas["DESCRIPTION_TEXT"]))
+        for year in [2019, 2020]
+    ]
+
+    wb_wdi_dir.mkdir()
+    pysfo_pull.dbnomicstools.write_subdata(pd.DataFrame(rows), wb_wdi_dir / "NY.GDP.MKTP.CD.parquet", partition_cols = ["indicator", "frequency"])
+
+def test_gdp_skeleton_cache(tmp_path, monkeypatch):
+    test_message = "TRY CACHED GDP SKELETON OF REPORTING CHECKS"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    import os
+    from pysfo.pulldata import config, country_ids
+    from pysfo.pulldata.dbnomicstools.check_timeseries_reporting import create_report
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(country_ids, "_LOOKUP", None)
+    monkeypatch.setattr(create_report, "_SIZE_ORDERER_CACHE", {})
+    monkeypatch.setattr(create_report, "_SKELETON_CACHE", create_report.OrderedDict())
+
+    reporter = create_report.checkReporting("IMF", "IFS", "Exchange Rates", "IND_A", "Q", False, 1, None, None, False)
+    all_periods = pd.date_range("2000-01-01", periods = 8, freq = "QS")
+
+    with pytest.raises(ValueError):
+        reporter._generate_gdp_skeleton(all_periods)
+
+    _fake_wdi_gdp(tmp_path / "wb_wdi")
+
+    skeleton = reporter._generate_gdp_skeleton(all_periods)
+    skeleton["last_gdp"] = 0
+
+    # cached skeleton is reused, and callers cannot modify it
+
+    assert len(create_report._SKELETON_CACHE) == 1
+    cached = reporter._generate_gdp_skeleton(all_periods)
+    assert len(cached) == len(skeleton)
+    assert (cached["last_gdp"] > 0).any()
+
+    # other period ranges share the size orderer
+
+    reporter._generate_gdp_skeleton(all_periods[:4])
+    assert len(create_report._SKELETON_CACHE) == 2
+    assert len(create_report._SIZE_ORDERER_CACHE) == 1
+
+    # a new GDP download invalidates the caches
+
+    gdp_path = tmp_path / "wb_wdi" / "NY.GDP.MKTP.CD.parquet"
+    gdp = pd.read_parquet(gdp_path)
+    gdp["value"] = gdp["value"] * 2
+    pysfo_pull.dbnomicstools.write_subdata(gdp, gdp_path, partition_cols = ["indicator", "frequency"])
+    os.utime(gdp_path, ns = (0, 0))
+
+    rebuilt = reporter._generate_gdp_skeleton(all_periods)
+    pd.testing.assert_series_equal(rebuilt["last_gdp"], cached["last_gdp"] * 2)
+    print(rebuilt.head(4))
+
+#--- vectorized reporting engine over all indicators
+
+def _reference_report(reporter, df_series, skeleton_w_gdp):
+
+    # report of one indicator by merging, grouping and pivoting it against the skeleton
+    # (the per-indicator path replaced by `_check_reporting_for_all_indicators`)
+
+    import pandas as pd
+    from pysfo.basic import statatab, silent_call
+    import numpy as np
+    import textwrap
+    import country_converter as coco
+
+    cc = coco.CountryConverter()
+
+    SERIES = df_series[reporter.series_key].unique()
+
+    if len(SERIES) > 1:
+        raise ValueError(f"df_series should only contain one series. Please check construction.")
+
+    # merge df_series and skeleton_w_gdp
+
+    try:
+        h_df = df_series.merge(skeleton_w_gdp, how = "outer", on = [reporter.period_key, reporter.country_key], indicator = True, validate = "1:1")
+    except pd.errors.MergeError as e:
+        raise pd.errors.MergeError(
+            f"MergeError in subdata={reporter.subdata}, {reporter.series_key}={SERIES}, {reporter.freq_key}={reporter.freq}: \n {e}"
+        ) from e
+
+    _merge_results = statatab(h_df["_merge"])
+    if "left_only" in [col["Value"] for _, col in _merge_results.iterrows() if col["Count"] != 0]:
+        raise ValueError(f"Error constructing reporter_check for {SERIES} ({reporter.freq}). Please check construction.")
+
+    h_df["_merge"] = np.where(h_df["_merge"] == "both", 1, 0)
+    h_df["decade"] = (h_df[reporter.period_key].dt.year // 10) * 10
+    h_df = h_df.sort_values(by = [reporter.country_key, reporter.period_key])
+
+    if reporter.freq == "A":
+        to_year = 1
+    elif reporter.freq == "Q":
+        to_year = 4
+    elif reporter.freq == "M":
+        to_year = 12
+
+    # check country ids (from full-sized skeleton) are non-missing before collapsing
+
+    if True in ((h_df[reporter.country_key].isna()) | (h_df[reporter.period_key].isna())):
+        raise ValueError(f"Error constructing reporter_check for {SERIES} ({reporter.freq}). Please check construction.")
+
+    # collapse at decade and find number of years reporting
+
+    not_to_pivot = ["gdp_last_available_period", "last_gdp", "gdp_available"]
+    meta = h_df[[reporter.country_key, reporter.country_key_desc] + not_to_pivot].drop_duplicates()
+
+    h_df = (
+        h_df
+        .groupby([reporter.country_key, reporter.country_key_desc, "decade"])
+        .agg(
+            merged_years = ("_merge", lambda x : x.sum() / to_year),
+            gdp_last_available_period = ("gdp_last_available_period", "first"),
+            last_gdp = ("last_gdp", "first"),
+        )
+        .reset_index()
+        .pivot_table(
+            index = [reporter.country_key, reporter.country_key_desc],
+            columns = "decade",
+            values = "merged_years",
+        ).reset_index()
+    )
+    h_df = h_df.merge(meta, on = [reporter.country_key, reporter.country_key_desc], how = "outer", validate = "1:1", indicator = True)
+
+    _merge_results = statatab(h_df["_merge"])
+    h_df["drop_for_table"] = (h_df["_merge"] == "right_only").astype(int)
+    h_df.drop(columns = "_merge", inplace = True)
+
+
+    decadevars = h_df.filter(regex = r"^\d{4}$").columns
+    h_df = h_df[list(h_df.drop(columns = decadevars).columns) + list(decadevars)]
+
+    h_df[decadevars] = h_df[decadevars].apply(lambda x : x.fillna(0))
+    h_df[decadevars] = h_df[decadevars].round(2)
+
+    h_df["perc_reported"] = h_df[decadevars].sum(axis=1) / h_df[decadevars].sum(axis=1).max()
+    h_df = pd.concat([
+        h_df.drop(columns = decadevars),
+        h_df[decadevars]
+    ], axis = 1)
+    h_df["perc_reported"] = h_df["perc_reported"].round(2)
+
+    if reporter.report_percen is not None:
+        drop = h_df["perc_reported"] > reporter.report_percen
+        h_df = h_df[~drop]
+
+    # merge iso3 if available, and cty_name for missing if available
+
+    all_country_keys = h_df[reporter.country_key].unique()
+
+    to_iso = "ISO2" if reporter.country_key_iso == "ISO3" else "ISO3"
+    to_iso_label = "cty_iso2" if reporter.country_key_iso == "ISO3" else "cty_iso3"
+
+    add_iso = silent_call(cc.convert, all_country_keys, src = reporter.country_key_iso, to = to_iso, verbose = False) 
+    add_iso = pd.DataFrame({reporter.country_key : all_country_keys, to_iso_label : add_iso})
+
+    cty_name = silent_call(cc.convert, all_country_keys, src = reporter.country_key_iso, to = "name_short", verbose = False)
+    cty_name = pd.DataFrame({reporter.country_key : all_country_keys, "cty_name" : cty_name})
+
+    h_df = h_df.merge(add_iso, on = reporter.country_key, how = "left", validate = "1:1")
+    h_df = h_df[["cty_iso3"] + list(h_df.drop(columns = "cty_iso3").columns)]
+    h_df[reporter.country_key_desc] = np.where(h_df[reporter.country_key_desc].isna(), cty_name["cty_name"], h_df[reporter.country_key_desc])
+
+    # final formats
+
+    h_df = h_df.sort_values(by = "last_gdp", ascending = False).reset_index(drop = True)
+    h_df.columns.name = None
+    h_df["last_gdp"] = h_df["last_gdp"] / 1e9
+    h_df["last_gdp"] = h_df["last_gdp"].round(2)
+    h_df["gdp_last_available_period"] = h_df["gdp_last_available_period"].dt.year
+
+    # rename and output
+
+    h_df.rename(columns = {
+        "gdp_last_available_period" : "GDP Last Reporting Year",
+        "last_gdp" : "Last GDP Reported (USD Billion)",
+        "perc_reported" : "Percentage of Periods Reported"
+    }, inplace = True)
+
+    h_df.drop(columns = "drop_for_table", inplace = True)
+
+    # if summarized = False, print final sample selection
+
+    if not reporter.summarized:
+
+        if reporter.REF_AREA_all == False:
+            _message = textwrap.dedent("""\
+            \n Reporting REF_AREA with GDP available in WB WDI. To see all possible 
+            REF_AREA, please set flag REF_AREA_all = True.
+            """)
+            print(_message)
+            h_df = h_df.loc[h_df["gdp_available"] == 1, :]
+
+        h_df = h_df.drop(columns = "gdp_available")
+
+        return h_df
+
+    # if summarized = True, give sufficient stat on world reporting
+
+    if reporter.summarized:
+
+        size_orderer = skeleton_w_gdp.groupby(reporter.country_key).agg({"last_gdp" : "max"})
+
+        total_last_gdp_bn = size_orderer["last_gdp"].sum() / 1e9
+
+        avail_percen = h_df["Percentage of Periods Reported"]
+
+        w = h_df["Last GDP Reported (USD Billion)"] / total_last_gdp_bn
+
+        report_summary = {
+            "mean_report" : float(np.dot(avail_percen, w)),
+            "n_countries_summarized" : len(h_df),
+            "n_countries_reporting" : int((avail_percen > 0).sum())
+        }
+
+        return report_summary
+
+
+def test_check_reporting_all_indicators(tmp_path, monkeypatch):
+    test_message = "TRY VECTORIZED REPORTING ENGINE"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    import numpy as np
+    from pysfo.basic import silent_call
+    from pysfo.pulldata import config, country_ids
+    from pysfo.pulldata.dbnomicstools.check_timeseries_reporting import create_report
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(country_ids, "_LOOKUP", None)
+
+    _fake_wdi_gdp(tmp_path / "wb_wdi")
+
+    all_periods = pd.date_range("1995-01-01", "2012-10-01", freq = "QS")
+    skeleton = create_report.checkReporting("IMF", "IFS", "Exchange Rates", "IND_A", "Q", False, 1, None, None, False)._generate_gdp_skeleton(all_periods)
+
+    # indicators reported by random countries over random periods
+
+    rng = np.random.default_rng(0)
+    countries = skeleton["ref_area"].unique()
+    df = pd.concat([
+        pd.DataFrame({"indicator" : ind, "ref_area" : cty, "period" : all_periods[rng.random(len(all_periods)) < rng.random()]})
+        for ind in ["IND_A", "IND_B", "IND_C"]
+        for cty in rng.choice(countries, size = 40, replace = False)
+    ], ignore_index = True)
+
+    for summarized, report_percen, REF_AREA_all in [(False, 1, False), (False, 0.5, True), (True, 1, False)]:
+
+        reporter = create_report.checkReporting("IMF", "IFS", "Exchange Rates", ["IND_A", "IND_B", "IND_C"], "Q", summarized, report_percen, None, None, REF_AREA_all)
+
+        by_indicator = {
+            ind : silent_call(_reference_report, reporter, ind_df, skeleton, verbose = False)
+            for ind, ind_df in df.groupby("indicator")
+        }
+        all_at_once = reporter._check_reporting_for_all_indicators(df, skeleton)
+
+        assert list(all_at_once) == list(by_indicator)
+        for ind, report in by_indicator.items():
+            if summarized:
+                assert all_at_once[ind] == report
+            else:
+                pd.testing.assert_frame_equal(all_at_once[ind], report)
+
+    # observations outside the skeleton are rejected
+
+    with pytest.raises(ValueError):
+        reporter._check_reporting_for_all_indicators(pd.concat([df, df.head(1).assign(ref_area = "XX_NOT_A_COUNTRY")]), skeleton)
+
+    print(all_at_once)
+
+#--- bulk reporting scan with persisted coverage matrix
+
+def test_scan_reporting(tmp_path, monkeypatch):
+    test_message = "TRY BULK REPORTING SCAN"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    from pysfo.pulldata import config, country_ids
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(country_ids, "_LOOKUP", None)
+
+    _fake_wdi_gdp(tmp_path / "wb_wdi")
+    (tmp_path / "imf_ifs").mkdir()
+    _fake_subdata_csv(tmp_path / "imf_ifs" / "Fake_Subdata.csv")
+    _fake_subdata_csv(tmp_path / "imf_ifs" / "Other_Subdata.csv")
+
+    coverage = pysfo_pull.dbnomicstools.dbTools.scan_reporting("IMF", "IFS", n_jobs = 2, silent = True)
+
+    assert coverage.shape == (6, 6)
+    assert set(coverage.columns.get_level_values("freq")) == {"A", "Q"}
+    assert (coverage["n_countries_reporting"] == 2).all().all()
+
+    # same as the summarized single-subdata check
+
+    expected = pysfo_pull.dbnomicstools.dbTools.check_reporting("IMF", "IFS", "Fake Subdata", ["IND_A", "IND_B", "IND_C"], "Q", summarized = True)
+    for ind, summary in expected.items():
+        assert coverage.loc[("Fake_Subdata", ind), ("mean_report", "Q")] == summary["mean_report"]
+
+    # persisted coverage is read back, and rebuilt when a subdata changes
+
+    coverage_dir = tmp_path / "imf_ifs" / "_cache" / "reporting_coverage"
+    assert sorted(p.name for p in coverage_dir.glob("*.parquet")) == ["Fake_Subdata.parquet", "Other_Subdata.parquet"]
+
+    pd.testing.assert_frame_equal(pysfo_pull.dbnomicstools.dbTools.scan_reporting("IMF", "IFS", silent = True), coverage)
+
+    df = pd.read_csv(tmp_path / "imf_ifs" / "Other_Subdata.csv", index_col = 0)
+    df.loc[df["INDICATOR"] != "IND_C", :].to_csv(tmp_path / "imf_ifs" / "Other_Subdata.csv")
+
+    rescanned = pysfo_pull.imfIFS.scan_reporting("Other Subdata", silent = True)
+    assert rescanned.index.get_level_values("indicator").tolist() == ["IND_A", "IND_B"]
+    print(coverage)
@@ -18,3 +18,75 @@ def test_efa_row(level):
 
     except FileNotFoundError:
         pytest.skip(f"EFA row level {level} missing.")
+
+def _fake_efa_row_dir(root):
+
+    from pysfo.pulldata.efa_row import efa_tables
+
+    efa_row_dir = root / "efa_row"
+    efa_row_dir.mkdir()
+
+    header = 'Date,Worldwide,Europe,Europe; Germany; Germany,Europe; Eurozone; ,International/Regional Organizations; ;,Country Unknown; ;,"Asia; Korea, South; Korea"'
+    for i, tab in enumerate(efa_tables.keys()):
+        rows = [f"2020-0{m}-28," + ",".join(str(i + m + k / 10) for k in range(7)) for m in range(1, 4)]
+        (efa_row_dir / f"international-portfolio-investment-{tab}-historical.csv").write_text("\n".join([header] + rows) + "\n")
+
+    return efa_row_dir
+
+#--- single-pass typed store, levels as views
+
+def test_efa_row_store(tmp_path, monkeypatch):
+    print("\n#===== Try EFA ROW typed store =====#\n")
+
+    import pandas as pd
+    from pysfo.pulldata import config, efa_row
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(efa_row, "_EFA_CACHE", {})
+    efa_row_dir = _fake_efa_row_dir(tmp_path)
+
+    agg = pysfo_pull.EFARow.get("agg")
+    regions = pysfo_pull.EFARow.get("regions")
+    disagg = pysfo_pull.EFARow.get("disagg")
+
+    assert (efa_row_dir / "_cache" / "efa_row.parquet").exists()
+    assert len(agg) == 9 * 3 and (agg["country"] == "Worldwide").all()
+    assert set(regions["region"]) == {"Worldwide", "Europe", "Int. Org."}
+    assert set(disagg["cty_iso3"]) == {"DEU", "EMU", "INT_ORG", "UNKNOWN", "KOR"}
+    assert set(disagg["country"]) == {"Germany", "Eurozone", "Int. Org.", "Unknown", "Korea, South"}
+    assert agg["value"].iloc[0] == 1e9 and str(agg["monthly"].dtype) == "period[M]"
+
+    for level, df in [("agg", agg), ("regions", regions), ("disagg", disagg)]:
+        pd.testing.assert_frame_equal(pysfo_pull.EFARow.get(level, use_cache = False), df)
+
+    monkeypatch.setattr(efa_row, "_EFA_CACHE", {})
+    pd.testing.assert_frame_equal(pysfo_pull.EFARow.get("disagg"), disagg)
+    print(disagg.head(4))
+
+#--- zone labels materialized next to the store
+
+def test_efa_zone_labels(tmp_path, monkeypatch):
+    print("\n#===== Try EFA ROW zone labels =====#\n")
+
+    from pysfo.pulldata import config, efa_row
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(efa_row, "_EFA_CACHE", {})
+    monkeypatch.setattr(efa_row, "_ZONE_LABELS_CACHE", {})
+    efa_row_dir = _fake_efa_row_dir(tmp_path)
+
+    zone_labels = pysfo_pull.EFARow.efa_zone_labels()
+
+    disagg = pysfo_pull.EFARow.get("disagg")[["cty_iso3", "country", "region"]].drop_duplicates()
+    expected = {row.cty_iso3 : {"label" : row.country, "region" : row.region} for row in disagg.itertuples()}
+
+    assert zone_labels == expected and list(zone_labels) == list(expected)
+    assert (efa_row_dir / "_cache" / "efa_row_zone_labels.json").exists()
+
+    zone_labels["DEU"]["label"] = "changed"
+    monkeypatch.setattr(efa_row, "_ZONE_LABELS_CACHE", {})
+    assert pysfo_pull.EFARow.efa_zone_labels() == expected
+    assert isinstance(pysfo_pull.EFARow.efa_zone_labels("agg"), str)
+    with pytest.raises(ValueError):
+        pysfo_pull.EFARow.efa_zone_labels("countries")
+    print(expected)
@@ -16,4 +16,110 @@ def test_fetch_fred_api(temp_path):
         assert not fred_pull.empty
 
     except Exception:
-        pytest.skip("fetch_fred_api not working or data unavailable.")
\ No newline at end of file
+        pytest.skip("fetch_fred_api not working or data unavailable.")
+
+class _FakeFredClient:
+    """Local stand-in for fredapi.Fred, serving fixed daily series.
+
+    `failures` maps series ids to HTTP status codes answered before the data, one per
+    request. Like fredapi, HTTP errors are re-raised as ValueError(<API message>).
+    """
+
+    def __init__(self, data, failures = None):
+
+        import threading
+
+        self.data = data
+        self.failures = {} if failures is None else {key : list(val) for key, val in failures.items()}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _http_error(self, code, message):
+
+        import urllib.error
+
+        try:
+            raise urllib.error.HTTPError("https://api.stlouisfed.org/fred/series/observations", code, message, None, None)
+        except urllib.error.HTTPError:
+            raise ValueError(message)
+
+    def get_series(self, series_id, observation_start = None):
+
+        with self.lock:
+            self.calls.append((series_id, observation_start))
+            failures = self.failures.get(series_id, [])
+            code = failures.pop(0) if failures else None
+
+        if code is not None:
+            self._http_error(code, f"Error {code}.")
+
+        if series_id not in self.data:
+            self._http_error(400, "Bad Request.  The series does not exist.")
+
+        data = self.data[series_id]
+        if observation_start is not None:
+            data = data[data.index >= pd.Timestamp(observation_start)]
+
+        return data
+
+#--- concurrent, incremental downloads with a fake client
+
+def test_fetch_fred_incremental(tmp_path):
+
+    print("\n#===== Try FRED incremental downloader =====#\n")
+
+    dates = pd.date_range("2024-01-01", periods = 10, freq = "D")
+    history = {
+        "DGS1" : pd.Series(range(10), index = dates, dtype = float),
+        "DGS2" : pd.Series(range(10, 20), index = dates, dtype = float),
+    }
+
+    client = _FakeFredClient({key : val.iloc[:6] for key, val in history.items()})
+    summary = pysfo_pull.fetch_fred_api.fetch_fred_series_list(["DGS1", "DGS2", "NOPE"], str(tmp_path), client = client, requests_per_minute = None)
+
+    assert summary["status"].tolist() == ["created", "created", "failed"]
+    assert set(client.calls) == {("DGS1", None), ("DGS2", None), ("NOPE", None)}
+
+    # new observations are requested after the last stored date and appended
+    client = _FakeFredClient(history)
+    summary = pysfo_pull.fetch_fred_api.fetch_fred_series_list(["DGS1", "DGS2"], str(tmp_path), client = client, requests_per_minute = None)
+
+    assert summary["status"].tolist() == ["appended", "appended"] and summary["n_new"].tolist() == [4, 4]
+    assert set(client.calls) == {("DGS1", "2024-01-07"), ("DGS2", "2024-01-07")}
+
+    stored = pd.read_csv(tmp_path / "DGS2.csv", parse_dates = ["date"])
+    assert stored.columns.tolist() == ["date", "DGS2"]
+    pd.testing.assert_series_equal(stored.set_index("date")["DGS2"], history["DGS2"].rename("DGS2"), check_names = False, check_freq = False)
+
+    summary = pysfo_pull.fetch_fred_api.fetch_fred_series_list("DGS1", str(tmp_path), client = client, requests_per_minute = None)
+    assert summary["status"].tolist() == ["up to date"]
+    print(summary)
+
+#--- rate limits and server errors are retried, from the HTTP status
+
+def test_fetch_fred_retries(tmp_path, monkeypatch):
+
+    print("\n#===== Try FRED downloader retries =====#\n")
+
+    from pysfo.pulldata import fetch_fred_api
+
+    monkeypatch.setattr(fetch_fred_api, "BACKOFF_SECONDS", 0)
+
+    dates = pd.date_range("2024-01-01", periods = 3, freq = "D")
+    client = _FakeFredClient({"DGS1" : pd.Series([1.0, 2.0, 3.0], index = dates)}, failures = {"DGS1" : [429, 503], "NOPE" : [429]})
+
+    summary = fetch_fred_api.fetch_fred_series_list(["DGS1", "NOPE"], str(tmp_path), client = client, requests_per_minute = None, silent = True)
+
+    assert summary["status"].tolist() == ["created", "failed"]
+    assert [call[0] for call in client.calls].count("DGS1") == 3
+
+    # a 400 (bad series id) is not retried
+    assert [call[0] for call in client.calls].count("NOPE") == 2
+    assert "does not exist" in summary["error"].iloc[1]
+
+    # retries are bounded
+    client = _FakeFredClient({}, failures = {"DGS1" : [429] * 5})
+    exhausted = fetch_fred_api.fetch_fred_series_list("DGS1", str(tmp_path), client = client, requests_per_minute = None, retries = 1, silent = True)
+
+    assert exhausted["status"].tolist() == ["failed"] and len(client.calls) == 2
+    print(summary)
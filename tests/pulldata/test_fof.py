@@ -22,4 +22,104 @@ def test_fof():
         assert not fof.empty
 
     except FileNotFoundError:
-        pytest.skip("FOF data missing.")
\ No newline at end of file
+        pytest.skip("FOF data missing.")
+
+def _fake_fof_dir(root):
+
+    fof_dir = root / "fred_flowoffunds"
+    (fof_dir / "csv").mkdir(parents = True)
+    (fof_dir / "data_dictionary").mkdir()
+
+    dates = [f"2020:Q{q}" for q in range(1, 5)] + [f"2021:Q{q}" for q in range(1, 5)]
+    tables = {
+        "l210" : {"FL313161105.Q" : "Millions of dollars", "FL313161110.Q" : "Millions of dollars", "LM713061103.Q" : "Billions of dollars"},
+        "l224" : {"LM893064105.Q" : "Millions of dollars", "LM883164115.Q" : "Millions of dollars", "FL313161105.Q" : "Millions of dollars"},
+        "l300" : {"FL003066005.Q" : "Percent"},
+    }
+
+    for table, series in tables.items():
+        header = ",".join(["date"] + list(series))
+        rows = [",".join([date] + [("ND" if i == 0 else str(i + j)) for j in range(len(series))]) for i, date in enumerate(dates)]
+        (fof_dir / "csv" / f"{table}.csv").write_text("\n".join([header] + rows) + "\n")
+        lines = [f"{s}\t{table} series {s}\t{i + 1}\t{table.upper()}\t{unit}; not seasonally adjusted" for i, (s, unit) in enumerate(series.items())]
+        (fof_dir / "data_dictionary" / f"{table}.txt").write_text("\n".join(lines) + "\n")
+
+    return fof_dir
+
+#--- Z.1 engine: any series, one join for factors and names
+
+def test_fof_engine(tmp_path, monkeypatch):
+
+    print("\n#===== Try FoF Z.1 engine =====#\n")
+
+    import os
+    import pandas as pd
+    from pysfo.pulldata import config, fof
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(fof, "_FOF_CATALOG_CACHE", {})
+    monkeypatch.setattr(fof, "_FOF_DATES_CACHE", {})
+    _fake_fof_dir(tmp_path)
+
+    data = fof.load_fof_series(["FL313161105", "LM713061103.Q", "LM893064105", "FL003066005"])
+
+    # the shared series is read from a table that is read anyway
+    assert data.groupby("series")["table"].first().to_dict() == {
+        "FL003066005.Q" : "l300", "FL313161105.Q" : "l210", "LM713061103.Q" : "l210", "LM893064105.Q" : "l224"
+    }
+    assert len(data) == 4 * 8 and data["value"].isna().sum() == 4
+    assert data.loc[data["series"] == "LM713061103.Q", "value"].iloc[1] == 3e9
+    assert data.loc[data["series"] == "FL003066005.Q", "value"].iloc[1] == 1.0
+
+    # date columns are parsed once per table
+    assert sorted(os.path.basename(path) for path, _ in fof._FOF_DATES_CACHE) == ["l210.csv", "l224.csv", "l300.csv"]
+
+    annual = fof.load_fof_series(["LM713061103"], frequency = "Y")
+    assert annual["date"].tolist() == [pd.Timestamp("2020-12-31"), pd.Timestamp("2021-12-31")]
+    assert annual["value"].tolist() == [5e9, 9e9]
+
+    with pytest.raises(ValueError):
+        fof.load_fof_series(["NOT_A_SERIES"])
+    with pytest.raises(ValueError):
+        fof.load_fof_series(["LM713061103"], frequency = "M")
+
+    fof_get = pysfo_pull.FoF.get(["FL313161105", "LM893064105"])
+    assert fof_get.columns.tolist() == ["quarterly", "series", "variable", "value", "description"]
+    assert fof_get["variable"].unique().tolist() == ["market_tsy_liab_tot", "corp_equities_asset"]
+    print(fof_get.head(4))
+
+#--- persistent catalog, search, and get for any catalog series
+
+def test_fof_catalog(tmp_path, monkeypatch):
+
+    print("\n#===== Try FoF Z.1 catalog =====#\n")
+
+    from pysfo.pulldata import config, fof
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(fof, "_FOF_CATALOG_CACHE", {})
+    fof_dir = _fake_fof_dir(tmp_path)
+
+    catalog = pysfo_pull.FoF.catalog()
+
+    assert (fof_dir / "_cache" / "fof_catalog.parquet").exists()
+    assert len(catalog) == 7 and catalog["line"].tolist() == [1, 2, 3, 1, 2, 3, 1]
+    assert catalog.set_index("series")["unit_factor"].to_dict()["LM713061103.Q"] == 1e9
+    assert str(catalog["table"].dtype) == "category"
+
+    monkeypatch.setattr(fof, "_FOF_CATALOG_CACHE", {})
+    assert pysfo_pull.FoF.catalog().equals(catalog)
+
+    assert pysfo_pull.FoF.search("FL3131611")["series"].tolist() == ["FL313161105.Q", "FL313161110.Q", "FL313161105.Q"]
+    assert pysfo_pull.FoF.search("L224 SERIES")["table"].tolist() == ["l224"] * 3
+    assert pysfo_pull.FoF.search("L224 SERIES", case = True).empty
+    assert pysfo_pull.FoF.search(r"^LM\d+", regex = True)["code"].tolist() == ["LM713061103", "LM893064105", "LM883164115"]
+    assert pysfo_pull.FoF.search("FL313161105", table = "l224")["table"].tolist() == ["l224"]
+
+    data = pysfo_pull.FoF.get(["FL003066005", "LM713061103", "NOT_A_SERIES"])
+    assert data["series"].unique().tolist() == ["FL003066005.Q", "LM713061103.Q"]
+    assert data.groupby("series")["variable"].first().isna().tolist() == [True, False]
+
+    with pytest.raises(ValueError):
+        pysfo_pull.FoF.get(["NOT_A_SERIES"])
+    print(pysfo_pull.FoF.search("Treasury|bills", regex = True))
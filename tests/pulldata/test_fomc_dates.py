@@ -26,4 +26,45 @@ def test_fomc_dates():
         return
 
     except FileNotFoundError:
-        pytest.skip("FOMC meeting dates missing.")
\ No newline at end of file
+        pytest.skip("FOMC meeting dates missing.")
+
+#--- nearest meetings with a binary search over the calendar
+
+def test_fomc_nearest_meetings():
+
+    print("\n#===== Try FOMC nearest meetings =====#\n")
+
+    import numpy as np
+    import pandas as pd
+    from pysfo.pulldata.fomc_dates import nearest_fomc_meetings
+
+    meetings = pd.to_datetime(["2024-03-20", "2024-01-31", "2024-05-01"])
+    dates = pd.to_datetime(["2024-01-15 00:00", "2024-01-31 14:00", "2024-02-10 00:00", "2024-06-01 00:00", None])
+
+    out = nearest_fomc_meetings(dates, meetings)
+
+    assert out["fomc_meeting"].tolist() == [0, 1, 0, 0, 0]
+    np.testing.assert_array_equal(out["prev_meeting"], pd.to_datetime([None, "2024-01-31", "2024-01-31", "2024-05-01", None]).to_numpy())
+    np.testing.assert_array_equal(out["next_meeting"], pd.to_datetime(["2024-01-31", "2024-01-31", "2024-03-20", None, None]).to_numpy())
+    np.testing.assert_array_equal(out["days_since_meeting"], [np.nan, 0, 10, 31, np.nan])
+    np.testing.assert_array_equal(out["days_to_meeting"], [16, 0, 39, np.nan, np.nan])
+
+    # time-zone aware dates are floored in their own zone (03:00 UTC on Feb 1)
+
+    eastern = pd.to_datetime(["2024-01-31 22:00-05:00", "2024-01-30 23:00-05:00"], utc = True).tz_convert("America/New_York")
+    tz_out = nearest_fomc_meetings(eastern, meetings)
+
+    assert tz_out["fomc_meeting"].tolist() == [1, 0]
+    np.testing.assert_array_equal(tz_out["days_since_meeting"], [0, np.nan])
+    np.testing.assert_array_equal(tz_out["days_to_meeting"], [0, 1])
+
+    tz_merged = pysfo_pull.FOMCdates.merge_fomc_meeting_dates(pd.DataFrame({"day" : eastern}), "day", meetings = meetings)
+    assert tz_merged["fomc_meeting"].tolist() == [1, 0]
+
+    df = pd.DataFrame({"x" : [1, 2, 3, 4, 5], "day" : dates}, index = list("edcba"))
+    merged = pysfo_pull.FOMCdates.merge_fomc_meeting_dates(df, "day", meetings = meetings)
+
+    assert merged.columns.tolist() == ["day", "fomc_meeting", "prev_meeting", "next_meeting", "days_since_meeting", "days_to_meeting", "x"]
+    assert merged.index.tolist() == list("edcba") and merged["x"].tolist() == [1, 2, 3, 4, 5]
+    assert merged["next_meeting"].iloc[2] == pd.Timestamp("2024-03-20")
+    print(merged)
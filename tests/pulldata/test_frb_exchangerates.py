@@ -17,3 +17,156 @@ def test_exchangerates():
         
     except FileNotFoundError:
         pytest.skip("FRB H10 Exchange rates missing.")
+
+#--- streaming H10 parser and parquet cache
+
+def _fake_h10_dir(root):
+
+    # excerpt in the layout of the published H10_data.xml: rates quoted in USD per unit of
+    # currency have CURRENCY="USD", the foreign currency is in FX and the unit denominator
+
+    FRB_H10_dir = root / "FRB_H10" / "FRB_H10"
+    FRB_H10_dir.mkdir(parents = True)
+
+    def _series(attrs, short_desc, long_desc, obs):
+        return (
+            f'\n  <kf:Series {attrs}>'
+            '\n    <frb:Annotations>'
+            f'\n      <common:Annotation><common:AnnotationType>Short Description</common:AnnotationType><common:AnnotationText>{short_desc}</common:AnnotationText></common:Annotation>'
+            f'\n      <common:Annotation><common:AnnotationType>Long Description</common:AnnotationType><common:AnnotationText>{long_desc}</common:AnnotationText></common:Annotation>'
+            '\n    </frb:Annotations>'
+            + "".join(f'\n    <frb:Obs OBS_STATUS="{status}" OBS_VALUE="{value}" TIME_PERIOD="{period}" />' for period, value, status in obs)
+            + '\n  </kf:Series>'
+        )
+
+    daily = [("2024-01-02", "1.1", "A"), ("2024-01-03", "-9999", "ND"), ("2024-01-04", "1.2", "A")]
+
+    (FRB_H10_dir / "H10_data.xml").write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '\n<message:MessageGroup xmlns:message="http://www.SDMX.org/resources/SDMXML/schemas/v1_0/message" '
+        'xmlns:common="http://www.SDMX.org/resources/SDMXML/schemas/v1_0/common" '
+        'xmlns:frb="http://www.federalreserve.gov/structure/compact/common" '
+        'xmlns:kf="http://www.federalreserve.gov/structure/compact/H10_H10">'
+        '\n<message:Header><message:ID>H10</message:ID><message:Test>false</message:Test>'
+        '<message:Name>H.10 Foreign Exchange Rates</message:Name><message:Prepared>2024-01-08T15:00:00</message:Prepared>'
+        '<message:Sender id="FRB"><message:Name>Federal Reserve Board</message:Name></message:Sender></message:Header>'
+        '\n<frb:DataSet id="H10" xmlns:kf="http://www.federalreserve.gov/structure/compact/H10_H10">'
+        + _series('CURRENCY="USD" FREQ="9" FX="EUR" SERIES_NAME="RXI$US_N.B.EU" UNIT="Currency:_Per_EUR" UNIT_MULT="1"',
+            "SPOT EXCHANGE RATE - EURO AREA", "U.S. Dollars to One Euro", daily)
+        + _series('CURRENCY="JPY" FREQ="9" FX="JPY" SERIES_NAME="RXI_N.B.JA" UNIT="Currency:_Per_USD" UNIT_MULT="1"',
+            "SPOT EXCHANGE RATE - JAPAN", "Japanese Yen to One U.S. Dollar", [(p, "140.5", s) for p, _, s in daily])
+        + _series('CURRENCY="JPY" FREQ="129" FX="JPY" SERIES_NAME="RXI_N.M.JA" UNIT="Currency:_Per_USD" UNIT_MULT="1"',
+            "JAPAN -- SPOT EXCHANGE RATE, YEN/US$", "Japanese Yen to One U.S. Dollar", [("2024-01-01", "141.0", "A")])
+        + _series('CURRENCY="USD" FREQ="9" FX="GBP" SERIES_NAME="RXI$US_N.B.UK" UNIT="Currency:_Per_GBP" UNIT_MULT="1"',
+            "SPOT EXCHANGE RATE - UNITED KINGDOM", "U.S. Dollars to One British Pound", [(p, "1.25", s) for p, _, s in daily])
+        + _series('CURRENCY="NA" FREQ="9" FX="VAR" SERIES_NAME="V0.JRXWTFN_N.B" UNIT="Index:_Jan_2006_100" UNIT_MULT="1"',
+            "NOMINAL BROAD DOLLAR INDEX", "Nominal Broad Dollar Index", daily)
+        + '\n</frb:DataSet>\n</message:MessageGroup>\n'
+    )
+
+    return FRB_H10_dir
+
+def test_exchangerates_streaming(tmp_path, monkeypatch):
+    print("\n#===== Try FRB H10 streaming parser =====#\n")
+
+    import pandas as pd
+    from pysfo.pulldata import config, frb_exchangerates
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    FRB_H10_dir = _fake_h10_dir(tmp_path)
+
+    streamed = frb_exchangerates.read_er_xml(FRB_H10_dir / "H10_data.xml")
+
+    assert streamed.columns.tolist() == list(frb_exchangerates.SERIES_ATTRIBUTES) + ["long_description", "obs_status", "obs_value", "time_period"]
+    assert len(streamed) == 13
+    assert streamed.dtypes[["frequency", "obs_value", "time_period"]].tolist() == ["int64", "float64", "datetime64[ns]"]
+    assert streamed.iloc[1].to_dict() == {
+        "series_name" : "RXI$US_N.B.EU", "currency" : "USD", "frequency" : 9, "fx" : "EUR",
+        "unit" : "Currency:_Per_EUR", "unit_mult" : "1", "long_description" : "U.S. Dollars to One Euro",
+        "obs_status" : "ND", "obs_value" : -9999.0, "time_period" : pd.Timestamp("2024-01-03")
+    }
+
+    er = pysfo_pull.FRBExchangeRates.get()
+
+    assert (FRB_H10_dir / "_cache" / "H10_data.parquet").exists()
+    assert er["series_name"].unique().tolist() == ["RXI$US_N.B.EU", "RXI_N.B.JA", "RXI$US_N.B.UK"]
+    assert (er["obs_status"] == "A").all()
+    pd.testing.assert_frame_equal(pysfo_pull.FRBExchangeRates.get(), er)
+    pd.testing.assert_frame_equal(pysfo_pull.FRBExchangeRates.get(use_cache = False), er)
+    print(er.head(4))
+
+#--- filters pushed into parsing, memoized per filter set
+
+def test_exchangerates_filters(tmp_path, monkeypatch):
+    print("\n#===== Try FRB H10 filtered get =====#\n")
+
+    import pandas as pd
+    from pysfo.pulldata import config, frb_exchangerates
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(frb_exchangerates, "_ER_CACHE", {})
+    FRB_H10_dir = _fake_h10_dir(tmp_path)
+
+    every_series = pysfo_pull.FRBExchangeRates.get(frequency = None)
+
+    for use_cache in [False, True]:
+
+        jpy = pysfo_pull.FRBExchangeRates.get(series = "RXI_N.B.JA", start = "2024-01-03", use_cache = use_cache)
+        assert jpy["time_period"].tolist() == [pd.Timestamp("2024-01-04")]
+
+        monthly = pysfo_pull.FRBExchangeRates.get(frequency = 129, use_cache = use_cache)
+        assert monthly["series_name"].tolist() == ["RXI_N.M.JA"]
+
+        # discontinued series are only returned when requested
+
+        discontinued = pysfo_pull.FRBExchangeRates.get(series = ["V0.JRXWTFN_N.B"], use_cache = use_cache)
+        assert len(discontinued) == 2
+
+    assert set(every_series["series_name"]) == {"RXI$US_N.B.EU", "RXI_N.B.JA", "RXI_N.M.JA", "RXI$US_N.B.UK"}
+
+    # memoized frames are not modified by callers
+
+    jpy["obs_value"] = 0
+    assert (pysfo_pull.FRBExchangeRates.get(series = "RXI_N.B.JA")["obs_value"] == 140.5).all()
+    print(jpy)
+
+    # check_ER stays the first positional argument, filters are keyword-only
+
+    pysfo_pull.FRBExchangeRates.get(True)
+    assert (FRB_H10_dir / "check.csv").exists()
+
+    with pytest.raises(TypeError):
+        pysfo_pull.FRBExchangeRates.get(False, "RXI_N.B.JA")
+
+#--- wide business-day panel
+
+def test_exchangerates_panel(tmp_path, monkeypatch):
+    print("\n#===== Try FRB H10 exchange rate panel =====#\n")
+
+    import numpy as np
+    import pandas as pd
+    from pysfo.pulldata import config, frb_exchangerates
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(frb_exchangerates, "_ER_CACHE", {})
+    FRB_H10_dir = _fake_h10_dir(tmp_path)
+
+    panel = pysfo_pull.FRBExchangeRates.get_panel()
+
+    assert (FRB_H10_dir / "_cache" / "H10_panel.npz").exists()
+    assert panel.columns.tolist() == ["EUR", "JPY", "GBP"]
+    assert (panel.dtypes == np.float32).all()
+    assert panel.index.tolist() == list(pd.bdate_range("2024-01-02", "2024-01-04"))
+
+    # EUR and GBP are quoted in USD per unit in H.10 (CURRENCY="USD", unit per EUR/GBP):
+    # keyed on FX and inverted to units per USD
+
+    np.testing.assert_allclose(panel["EUR"].dropna(), [1 / 1.1, 1 / 1.2], rtol = 1e-6)
+    np.testing.assert_allclose(panel["GBP"].dropna(), [1 / 1.25] * 2, rtol = 1e-6)
+    assert panel["EUR"].isna().sum() == 1
+
+    usd_per = pysfo_pull.FRBExchangeRates.get_panel("JPY", start = "2024-01-03", quote = "usd_per", ffill_limit = 1)
+    np.testing.assert_allclose(usd_per["JPY"], [1 / 140.5] * 2, rtol = 1e-6)
+
+    pd.testing.assert_frame_equal(pysfo_pull.FRBExchangeRates.get_panel(use_cache = False), panel)
+    print(panel)
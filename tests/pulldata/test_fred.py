@@ -21,4 +21,106 @@ def test_fred_yields():
         print(yields.tail(4))
         assert not yields.empty
     except FileNotFoundError:
-        pytest.skip("FRED yieldseries missing.")
\ No newline at end of file
+        pytest.skip("FRED yieldseries missing.")
+
+#--- fake fred_api directory of <series>.csv files
+
+def _fake_fred_api_dir(root, series_ids):
+
+    fred_api_dir = root / "fred_api"
+    fred_api_dir.mkdir(exist_ok = True)
+
+    for i, series_id in enumerate(series_ids):
+        rows = [f"2024-01-0{d},{'' if (d == 3 and i % 2) else i + d}" for d in [2, 3, 5]]
+        (fred_api_dir / f"{series_id}.csv").write_text("\n".join([f"date,{series_id}"] + rows) + "\n")
+
+    return fred_api_dir
+
+#--- cached float32 panel, aligned with one concat
+
+def test_fred_yields_panel(tmp_path, monkeypatch):
+
+    print("\n#===== Try FRED yieldseries panel =====#\n")
+
+    import os
+    import pandas as pd
+    from collections import OrderedDict
+    from pysfo.pulldata import config, fred
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(fred, "_PANEL_CACHE", OrderedDict())
+    fred_api_dir = _fake_fred_api_dir(tmp_path, fred.available_datasets["yieldseries"]["series"].keys())
+
+    yields = pysfo_pull.FREDcleaned.get.yieldseries()
+
+    assert yields.columns.tolist() == ["date"] + [spec["column"] for spec in fred.available_datasets["yieldseries"]["series"].values()]
+    assert yields["date"].tolist() == list(pd.date_range("2024-01-02", "2024-01-05"))
+    assert (yields.dtypes.iloc[1:] == "float32").all()
+    assert yields["effr"].tolist() == pytest.approx([0.03, 0.03, 0.03, 0.06])
+    assert yields["fedfunds"].tolist() == pytest.approx([0.02, 0.03, 0.03, 0.05])
+    assert (fred_api_dir / "_cache" / "yieldseries.parquet").exists()
+
+    monkeypatch.setattr(fred, "_PANEL_CACHE", OrderedDict())
+    pd.testing.assert_frame_equal(pysfo_pull.FREDcleaned.get.yieldseries(), yields, check_freq = False)
+
+    # rebuilt when a source file changes
+    (fred_api_dir / "EFFR.csv").write_text("date,EFFR\n2024-01-02,10\n")
+    os.utime(fred_api_dir / "EFFR.csv", ns = (0, 0))
+    assert pysfo_pull.FREDcleaned.get.yieldseries()["effr"].tolist() == pytest.approx([0.1] * 4)
+
+    os.remove(fred_api_dir / "DGS2.csv")
+    with pytest.raises(FileNotFoundError):
+        pysfo_pull.FREDcleaned.get.yieldseries()
+    print(yields.head(4))
+
+#--- declared datasets, loading only the requested columns
+
+def test_fred_registry_columns(tmp_path, monkeypatch):
+
+    print("\n#===== Try FRED registry column subsets =====#\n")
+
+    import pandas as pd
+    from collections import OrderedDict
+    from pysfo.pulldata import config, fred
+
+    monkeypatch.setattr(config, "_data_path", tmp_path)
+    monkeypatch.setattr(fred, "_PANEL_CACHE", OrderedDict())
+
+    # only the files of the requested tenors exist
+    _fake_fred_api_dir(tmp_path, ["DGS10", "DGS2"])
+
+    tenors = pysfo_pull.FREDcleaned.get("yieldseries", columns = ["y10", "y2"])
+
+    assert tenors.columns.tolist() == ["date", "y10", "y2"]
+    assert tenors["y10"].tolist() == pytest.approx([0.02, 0.03, 0.03, 0.05])
+    assert tenors["y2"].tolist() == pytest.approx([0.03, 0.03, 0.03, 0.06])
+    pd.testing.assert_frame_equal(pysfo_pull.FREDcleaned.get("yieldseries", columns = "y2"), tenors[["date", "y2"]], check_freq = False)
+
+    # the same columns in another order share the memo entry and the cache file
+    cache_files = sorted((tmp_path / "fred_api" / "_cache").glob("*.parquet"))
+    reordered = pysfo_pull.FREDcleaned.get("yieldseries", columns = ["y2", "y10"])
+
+    pd.testing.assert_frame_equal(reordered, tenors[["date", "y2", "y10"]], check_freq = False)
+    assert sorted((tmp_path / "fred_api" / "_cache").glob("*.parquet")) == cache_files
+    assert len(fred._PANEL_CACHE) == 2
+
+    # memoized panels are bounded
+    monkeypatch.setattr(fred, "MAX_PANEL_CACHE_ENTRIES", 1)
+    pysfo_pull.FREDcleaned.get("yieldseries", columns = "y10")
+    assert list(fred._PANEL_CACHE) == [(str(tmp_path / "fred_api"), "yieldseries", ("DGS10",))]
+
+    with pytest.raises(FileNotFoundError):
+        pysfo_pull.FREDcleaned.get("yieldseries")
+    with pytest.raises(ValueError):
+        pysfo_pull.FREDcleaned.get("yieldseries", columns = ["y4"])
+    with pytest.raises(ValueError):
+        pysfo_pull.FREDcleaned.get("not_a_dataset")
+
+    # series to download, derived from the declaration
+    assert fred.available_datasets["yieldseries"]["needs"] == list(fred.available_datasets["yieldseries"]["series"])
+    assert "DGS2" in fred.available_datasets["yieldseries"]["needs"]
+
+    # a custom dataset is just a declaration
+    monkeypatch.setitem(fred.available_datasets, "tens", {"desc" : "10y", "series" : {"DGS10" : {"column" : "ten", "transform" : "level"}}})
+    assert pysfo_pull.FREDcleaned.get("tens")["ten"].tolist() == pytest.approx([2, 3, 3, 5])
+    print(tenors)
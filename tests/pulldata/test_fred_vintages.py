@@ -0,0 +1,109 @@
+import pytest
+import pandas as pd
+import pysfo.pulldata as pysfo_pull
+
+
+class _FakeAlfredClient:
+    """Local stand-in for fredapi.Fred serving ALFRED releases known up to `today`."""
+
+    def __init__(self, releases, today):
+
+        self.releases = releases
+        self.today = pd.Timestamp(today)
+        self.calls = []
+
+    def get_series_all_releases(self, series_id, realtime_start = None):
+
+        self.calls.append((series_id, realtime_start))
+        df = self.releases[series_id]
+        df = df[df["realtime_start"] <= self.today].copy()
+
+        # like ALFRED, values still current at the window start are restated at that date
+        if realtime_start is not None:
+            start = pd.Timestamp(realtime_start)
+            current = df[df["realtime_start"] < start].sort_values("realtime_start").drop_duplicates("date", keep = "last")
+            df = pd.concat([current.assign(realtime_start = start), df[df["realtime_start"] >= start]])
+
+        return df[["realtime_start", "date", "value"]].astype(object)
+
+#--- append-only vintage store and as-of queries
+
+def test_fred_vintages(tmp_path):
+
+    print("\n#===== Try FRED vintage store =====#\n")
+
+    T = pd.Timestamp
+    releases = {"GDP" : pd.DataFrame({
+        "date" : [T("2024-01-01"), T("2024-01-01"), T("2024-04-01"), T("2024-01-01"), T("2024-04-01")],
+        "realtime_start" : [T("2024-04-25"), T("2024-05-30"), T("2024-07-25"), T("2024-09-26"), T("2024-09-26")],
+        "value" : [100.0, 101.0, 102.0, 100.5, 103.0],
+    })}
+
+    client = _FakeAlfredClient(releases, "2024-08-01")
+    summary = pysfo_pull.fred_vintages.fetch_fred_vintages("GDP", save_dir = tmp_path, client = client, requests_per_minute = None)
+    assert summary["n_new"].tolist() == [3]
+
+    # incremental: only vintages after the last stored one, appended as a new part
+    client.today = T("2024-12-31")
+    summary = pysfo_pull.fred_vintages.fetch_fred_vintages("GDP", save_dir = tmp_path, client = client, requests_per_minute = None)
+    assert client.calls[-1] == ("GDP", "2024-07-26")
+    assert summary["n_new"].tolist() == [2]
+    assert len(list((tmp_path / "GDP").glob("part-*.parquet"))) == 2
+
+    vintages = pysfo_pull.fred_vintages.get_vintages("GDP", save_dir = tmp_path)
+    pd.testing.assert_frame_equal(vintages, releases["GDP"].sort_values(["date", "realtime_start"], ignore_index = True)[vintages.columns])
+
+    asof = pysfo_pull.fred_vintages.get_asof
+    assert asof("GDP", "2024-04-30", save_dir = tmp_path).tolist() == [100.0]
+    assert asof("GDP", "2024-08-01", save_dir = tmp_path).tolist() == [101.0, 102.0]
+    assert asof("GDP", "2024-12-31", save_dir = tmp_path).tolist() == [100.5, 103.0]
+    assert asof("GDP", "2024-01-01", save_dir = tmp_path).empty
+
+    panel = asof(["GDP", "GDP"], "2024-08-01", save_dir = tmp_path)
+    assert panel.columns.tolist() == ["GDP"] and panel["GDP"].tolist() == [101.0, 102.0]
+
+    with pytest.raises(FileNotFoundError):
+        asof("NOPE", "2024-08-01", save_dir = tmp_path)
+    print(vintages)
+
+#--- reads concurrent with a compaction
+
+def test_fred_vintages_compaction(tmp_path, monkeypatch):
+
+    print("\n#===== Try FRED vintage store compaction =====#\n")
+
+    from pysfo.pulldata import fred_vintages
+
+    T = pd.Timestamp
+    releases = {"GDP" : pd.DataFrame({
+        "date" : [T("2024-01-01"), T("2024-01-01"), T("2024-04-01")],
+        "realtime_start" : [T("2024-04-25"), T("2024-05-30"), T("2024-07-25")],
+        "value" : [100.0, 101.0, 102.0],
+    })}
+
+    client = _FakeAlfredClient(releases, "2024-05-01")
+    fred_vintages.fetch_fred_vintages("GDP", save_dir = tmp_path, client = client, requests_per_minute = None, silent = True)
+    client.today = T("2024-12-31")
+    fred_vintages.fetch_fred_vintages("GDP", save_dir = tmp_path, client = client, requests_per_minute = None, silent = True)
+
+    series_dir = tmp_path / "GDP"
+    expected = fred_vintages.get_vintages("GDP", save_dir = tmp_path)
+    old_parts = fred_vintages._vintage_parts(series_dir)
+
+    # merged part written, old parts not removed yet: no duplicated keys
+
+    fred_vintages._write_part(series_dir, expected)
+    pd.testing.assert_frame_equal(fred_vintages.get_vintages("GDP", save_dir = tmp_path), expected)
+
+    # old parts removed after they were listed: the parts are listed again
+
+    stale_listing = [fred_vintages._vintage_parts(series_dir)]
+    for part in old_parts:
+        part.unlink()
+
+    list_parts = fred_vintages._vintage_parts
+    monkeypatch.setattr(fred_vintages, "_vintage_parts", lambda d : stale_listing.pop() if stale_listing else list_parts(d))
+    monkeypatch.setattr(fred_vintages, "_VINTAGE_CACHE", {})
+
+    pd.testing.assert_frame_equal(fred_vintages.get_vintages("GDP", save_dir = tmp_path), expected)
+    assert stale_listing == []
@@ -62,4 +62,36 @@ def test_imf_ifs_upload():
     except FileNotFoundError:
         pytest.skip("WB WDI data missing.")
 
+#--- wb_wdi backend validated before any request
 
+def test_wb_wdi_backend_check(tmp_path):
+    test_message = "TRY WB WDI BACKEND CHECK"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    from pysfo.pulldata.wb_wdi.wb_wdi_db_download import _fetch_and_save_series_all_ctys
+
+    with pytest.raises(ValueError, match = "backend"):
+        _fetch_and_save_series_all_ctys(["NY.GDP.MKTP.CD"], tmp_path, backend = "asyncio")
+
+#--- wb_wdi errors keep their cause
+
+def test_wb_wdi_stamps_error(tmp_path, monkeypatch):
+    test_message = "TRY WB WDI STAMPS ERROR"
+    print("\n\n")
+    print("_"*len(test_message))
+    print(f"{test_message}\n\n")
+
+    from pysfo.pulldata.dbnomicstools import download
+    from pysfo.pulldata.wb_wdi.wb_wdi_db_download import _fetch_and_save_series_all_ctys
+
+    def _failing_stamps(*args, **kwargs):
+        raise OSError("connection reset")
+
+    monkeypatch.setattr(download, "fetch_series_stamps", _failing_stamps)
+
+    with pytest.raises(ValueError, match = "last-update stamps") as excinfo:
+        _fetch_and_save_series_all_ctys(["NY.GDP.MKTP.CD"], tmp_path)
+
+    assert isinstance(excinfo.value.__cause__, OSError)